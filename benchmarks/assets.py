@@ -0,0 +1,63 @@
+"""
+assets.py
+---------
+Static asset bytes per page view, before and after `flask assets build`.
+
+Builds the fingerprinted assets into a copy of website/static/, then for
+each page lists the stylesheets it links and reports:
+- plain: bytes sent through the static route, uncompressed, on every view
+  (the browser revalidates them: one request per stylesheet per view)
+- built: bytes of the variant sent for Accept-Encoding "br, gzip" on the
+  first view; repeat views send nothing (Cache-Control: immutable, no
+  request at all)
+
+Run:
+    python -m benchmarks.assets
+"""
+
+import re
+import shutil
+import tempfile
+
+from website.assets import IMMUTABLE, build
+
+from benchmarks.common import create_bench_app
+
+PAGES = ("/", "/auth/login", "/auth/sign-up")
+
+STYLESHEET = re.compile(r'<link rel="stylesheet" href="([^"]+)"')
+
+
+def page_assets(client, path):
+    return STYLESHEET.findall(client.get(path).get_data(as_text=True))
+
+
+def main():
+    app = create_bench_app()
+    # Build into a copy: the real static folder stays untouched
+    static = tempfile.mkdtemp(prefix="ecommerce-assets-")
+    shutil.copytree(app.static_folder, static, dirs_exist_ok=True, ignore=shutil.ignore_patterns("dist"))
+    app.static_folder = static
+
+    client = app.test_client()
+    plain = {path: page_assets(client, path) for path in PAGES}
+
+    manifest = build(static)
+    app.extensions["assets"] = manifest
+    built = {path: page_assets(client, path) for path in PAGES}
+
+    print(f"{'page':<16}{'files':>6}{'plain bytes':>13}{'built, first':>14}{'built, repeat':>15}")
+    for path in PAGES:
+        plain_bytes = sum(len(client.get(url).data) for url in plain[path])
+        first = 0
+        for url in built[path]:
+            response = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+            assert response.headers["Cache-Control"] == IMMUTABLE, url
+            first += len(response.data)
+        print(f"{path:<16}{len(built[path]):>6}{plain_bytes:>13}{first:>14}{0:>15}")
+
+    shutil.rmtree(static)
+
+
+if __name__ == "__main__":
+    main()
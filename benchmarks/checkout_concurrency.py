@@ -0,0 +1,129 @@
+"""
+checkout_concurrency.py
+-----------------------
+N users check out the SAME hot product at the same time.
+
+Checks:
+- zero oversell: units sold == initial stock - final stock, stock never < 0,
+  and never more units sold than were in stock
+Reports:
+- successful / rejected checkouts and checkouts per second
+
+Run:
+    python -m benchmarks.checkout_concurrency --threads 32 --stock 10
+    python -m benchmarks.checkout_concurrency --database-url mysql+pymysql://...
+"""
+
+import argparse
+import threading
+import time
+
+from website import db
+from website.models import Cart, CartItem, Category, OrderItem, Product, User
+
+from benchmarks.common import BENCH_PASSWORD_HASH, create_bench_app, login
+
+
+def seed(app, users: int, stock: int, quantity: int) -> int:
+    """Create one hot product and `users` users, each with it in their cart."""
+    with app.app_context():
+        category = Category(name="Hot")
+        db.session.add(category)
+        db.session.flush()
+
+        product = Product(name="Hot SKU", price=9.99, stock=stock, category_id=category.id)
+        db.session.add(product)
+        db.session.flush()
+
+        for number in range(users):
+            user = User(
+                email=f"buyer{number}@bench.local",
+                first_name=f"Buyer{number}",
+                password=BENCH_PASSWORD_HASH
+            )
+            db.session.add(user)
+            db.session.flush()
+
+            cart = Cart(user_id=user.id)
+            db.session.add(cart)
+            db.session.flush()
+            db.session.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=quantity))
+
+        db.session.commit()
+        return product.id
+
+
+def run(threads: int, stock: int, quantity: int, database_url=None) -> dict:
+    app = create_bench_app(database_url)
+    product_id = seed(app, threads, stock, quantity)
+
+    # Log every buyer in up front so only the checkout is timed
+    clients = []
+    for number in range(threads):
+        client = app.test_client()
+        login(client, f"buyer{number}@bench.local")
+        clients.append(client)
+
+    barrier = threading.Barrier(threads + 1)
+
+    def checkout(client):
+        barrier.wait()
+        client.post("/checkout")
+
+    workers = [threading.Thread(target=checkout, args=(client,)) for client in clients]
+    for worker in workers:
+        worker.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        final_stock = db.session.get(Product, product_id).stock
+        units_sold = (
+            db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0))
+            .filter(OrderItem.product_id == product_id)
+            .scalar()
+        )
+        orders = (
+            db.session.query(db.func.count(db.distinct(OrderItem.order_id)))
+            .filter(OrderItem.product_id == product_id)
+            .scalar()
+        )
+
+    return {
+        "threads": threads,
+        "initial_stock": stock,
+        "final_stock": final_stock,
+        "units_sold": units_sold,
+        "successful_checkouts": orders,
+        "rejected_checkouts": threads - orders,
+        "elapsed_s": elapsed,
+        "checkouts_per_s": threads / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent buyers")
+    parser.add_argument("--stock", type=int, default=10, help="Initial stock of the hot SKU")
+    parser.add_argument("--quantity", type=int, default=1, help="Units per checkout")
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    result = run(args.threads, args.stock, args.quantity, args.database_url)
+
+    for key, value in result.items():
+        print(f"{key:>22}: {value:.2f}" if isinstance(value, float) else f"{key:>22}: {value}")
+
+    # Zero-oversell invariants
+    assert result["final_stock"] >= 0, "stock went negative"
+    assert result["units_sold"] == result["initial_stock"] - result["final_stock"], "oversold"
+    assert result["units_sold"] <= result["initial_stock"], "sold more than in stock"
+    print("OK: no oversell")
+
+
+if __name__ == "__main__":
+    main()
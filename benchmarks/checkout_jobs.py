@@ -0,0 +1,180 @@
+"""
+checkout_jobs.py
+----------------
+Checkout latency with its side work run inline vs queued as background jobs.
+
+The confirmation email is simulated: the handler waits --smtp-ms (and 10×
+that for every 20th order, a slow mail server) before logging. Each mode
+runs --checkouts checkouts one after another, each user with a
+--lines-line cart:
+- inline: JOBS_INLINE, the jobs run before the response (old behaviour)
+- queued: JOBS_WORKERS in-process workers run them after the response
+
+Then checks the delivery guarantees with the deterministic harness
+(JobQueue.drain): retries with backoff, permanent failure after
+max_attempts, a job whose worker died is run again after the visibility
+timeout.
+
+Run:
+    python -m benchmarks.checkout_jobs --checkouts 400 --smtp-ms 50
+"""
+
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from website import db
+from website.jobs import HANDLERS, enqueue, job, job_queue
+from website.models import Cart, CartItem, Category, Job, Product, User
+from website.tasks import send_order_confirmation
+
+from benchmarks.common import BENCH_PASSWORD_HASH, create_bench_app, login
+
+
+def seed(app, users: int, lines: int) -> None:
+    """`users` users, each with a cart of `lines` products."""
+    with app.app_context():
+        category = Category(name="Bench")
+        db.session.add(category)
+        db.session.flush()
+        products = [
+            Product(name=f"Product {number}", price=10.0 + number, stock=1_000_000, category_id=category.id)
+            for number in range(lines)
+        ]
+        db.session.add_all(products)
+        db.session.flush()
+
+        for number in range(users):
+            user = User(email=f"buyer{number}@bench.local", first_name="Buyer", password=BENCH_PASSWORD_HASH)
+            db.session.add(user)
+            db.session.flush()
+            cart = Cart(user_id=user.id, item_count=lines)
+            db.session.add(cart)
+            db.session.flush()
+            db.session.add_all(
+                CartItem(cart_id=cart.id, product_id=product.id, quantity=1) for product in products
+            )
+        db.session.commit()
+
+
+def simulate_smtp(smtp_ms: float):
+    """Replace the confirmation handler by one that waits like a mail server."""
+    def send_with_delay(order_id):
+        time.sleep(smtp_ms / 1000 * (10 if order_id % 20 == 0 else 1))
+        send_order_confirmation(order_id)
+    HANDLERS["orders.send_confirmation"] = send_with_delay
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_mode(args, **config) -> dict:
+    app = create_bench_app(args.database_url, ROLLUP_SETTLE_SECONDS=0, JOBS_POLL_SECONDS=0.05, **config)
+    seed(app, args.checkouts, args.lines)
+
+    clients = []
+    for number in range(args.checkouts):
+        client = app.test_client()
+        login(client, f"buyer{number}@bench.local")
+        clients.append(client)
+
+    samples = []
+    started = time.perf_counter()
+    for client in clients:
+        request_started = time.perf_counter()
+        response = client.post("/checkout")
+        samples.append(time.perf_counter() - request_started)
+        assert response.status_code == 302 and "/orders" in response.location, "checkout failed"
+
+    # Wait for the workers to finish the confirmations
+    with app.app_context():
+        while db.session.scalar(
+            select(func.count()).select_from(Job)
+            .where(Job.kind == "orders.send_confirmation", Job.status != "done")
+        ):
+            db.session.rollback()
+            time.sleep(0.01)
+        db.session.rollback()
+    all_sent = time.perf_counter() - started
+    job_queue.stop()
+
+    return {
+        "p50_ms": statistics.median(samples) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "max_ms": max(samples) * 1000,
+        "all_sent_s": all_sent,
+    }
+
+
+def check_delivery(args) -> None:
+    """Retries, permanent failure and visibility timeout, without sleeping."""
+    app = create_bench_app(args.database_url, JOBS_BACKOFF_SECONDS=2, JOBS_VISIBILITY_TIMEOUT=60)
+    calls = []
+
+    @job("bench.flaky")
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ValueError("temporary failure")
+
+    @job("bench.broken")
+    def broken():
+        raise ValueError("permanent failure")
+
+    with app.app_context():
+        flaky_job, broken_job = enqueue("bench.flaky"), enqueue("bench.broken", max_attempts=3)
+        db.session.commit()
+        flaky_id, broken_id, created = flaky_job.id, broken_job.id, flaky_job.created_at
+
+        counts = job_queue.drain()
+        flaky_job, broken_job = db.session.get(Job, flaky_id), db.session.get(Job, broken_id)
+        assert (flaky_job.status, flaky_job.attempts) == ("done", 3), flaky_job
+        assert (broken_job.status, broken_job.attempts) == ("failed", 3), broken_job
+        # 2 s then 4 s backoff (+ the per-job spread) before the third attempt
+        waited = flaky_job.finished_at - created
+        assert timedelta(seconds=6) <= waited <= timedelta(seconds=6 * 1.45 + 1), waited
+        print(f"retries: {counts['succeeded']} succeeded, {counts['failed']} failed attempts; "
+              f"flaky job done on attempt 3 after {waited.total_seconds():.1f}s of backoff, "
+              f"broken job failed after 3 attempts")
+
+        # A worker claims a job and dies: nobody else runs it until the lock expires
+        stuck = enqueue("bench.flaky")
+        db.session.commit()
+        stuck_id = stuck.id
+        job_queue.claim("dead-worker")
+        assert job_queue.run_one("live-worker") is None, "locked job ran twice"
+        job_queue.drain()
+        stuck = db.session.get(Job, stuck_id, populate_existing=True)
+        assert (stuck.status, stuck.attempts, stuck.locked_by) == ("done", 2, "drain"), stuck
+        print("visibility timeout: a dead worker's job ran again once its lock expired")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkouts", type=int, default=400)
+    parser.add_argument("--lines", type=int, default=3, help="Products per cart")
+    parser.add_argument("--smtp-ms", type=float, default=50, help="Simulated mail server latency")
+    parser.add_argument("--workers", type=int, default=2, help="In-process job workers (queued mode)")
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    simulate_smtp(args.smtp_ms)
+    results = {
+        "inline": run_mode(args, JOBS_INLINE=True),
+        "queued": run_mode(args, JOBS_WORKERS=args.workers),
+    }
+    print(f"{'mode':<8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'all sent s':>12}")
+    for mode, result in results.items():
+        print(f"{mode:<8}{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+              f"{result['max_ms']:>9.1f}{result['all_sent_s']:>12.2f}")
+    print()
+    check_delivery(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+checkout_queries.py
+-------------------
+Proves that checkout costs a CONSTANT number of SQL round trips,
+whatever the number of cart lines.
+
+For each cart size it counts the statements (cursor executions) and
+COMMITs issued by one POST /checkout, and fails if any size differs.
+tests/test_checkout_queries.py runs the same measurement under pytest
+and also pins the number of statements.
+
+Run:
+    python -m benchmarks.checkout_queries
+    python -m benchmarks.checkout_queries --lines 1 10 100 --database-url mysql+pymysql://...
+"""
+
+import argparse
+
+from website import db
+from website.models import Cart, CartItem, Category, Order, OrderItem, Product, User
+
+from benchmarks.common import BENCH_PASSWORD_HASH, count_statements, create_bench_app, login
+
+
+def checkout_round_trips(app, lines: int, buyer: int) -> dict:
+    """Fill one user's cart with `lines` products and count checkout statements."""
+    email = f"lines{buyer}@bench.local"
+    with app.app_context():
+        category = db.session.query(Category).first()
+        user = User(email=email, first_name="Lines", password=BENCH_PASSWORD_HASH)
+        db.session.add(user)
+        db.session.flush()
+
+        cart = Cart(user_id=user.id)
+        db.session.add(cart)
+        db.session.flush()
+
+        products = [
+            Product(name=f"Item {buyer}-{number}", price=1.0 + number, stock=100, category_id=category.id)
+            for number in range(lines)
+        ]
+        db.session.add_all(products)
+        db.session.flush()
+        db.session.add_all(
+            CartItem(cart_id=cart.id, product_id=product.id, quantity=2) for product in products
+        )
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    login(client, email)
+
+    with count_statements(app) as counts:
+        response = client.post("/checkout")
+
+    with app.app_context():
+        order = db.session.query(Order).filter_by(user_id=user_id).one()
+        written = db.session.query(OrderItem).filter_by(order_id=order.id).count()
+        left = db.session.query(CartItem).join(Cart).filter(Cart.user_id == user_id).count()
+
+    if response.status_code != 302 or written != lines or left:
+        raise RuntimeError(f"Checkout with {lines} lines did not complete")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 5, 25, 100])
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        db.session.add(Category(name="Bench"))
+        db.session.commit()
+
+    results = {}
+    print(f"{'lines':>6} {'statements':>11} {'commits':>8}")
+    for buyer, lines in enumerate(args.lines):
+        results[lines] = checkout_round_trips(app, lines, buyer)
+        print(f"{lines:>6} {results[lines]['statements']:>11} {results[lines]['commits']:>8}")
+
+    # Not `assert`: the check must still run under python -O
+    distinct = {(counts["statements"], counts["commits"]) for counts in results.values()}
+    if len(distinct) != 1:
+        raise SystemExit(f"FAIL: round trips depend on line count: {results}")
+    if any(counts["commits"] != 1 for counts in results.values()):
+        raise SystemExit("FAIL: checkout must commit once")
+    print("OK: constant round trips, single commit")
+
+
+if __name__ == "__main__":
+    main()
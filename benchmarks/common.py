@@ -0,0 +1,100 @@
+"""
+common.py
+---------
+Shared helpers for the benchmark scripts.
+
+Every benchmark runs the real Flask app against a LOCAL database:
+- SQLite file in a temp directory (default, zero setup)
+- or any SQLAlchemy URL passed with --database-url
+  (e.g. a local MySQL: mysql+pymysql://root:pw@localhost/ecommerce_bench)
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from website import create_app, db
+
+# Benchmarks measure the routes, not pbkdf2: one iteration is enough
+BENCH_PASSWORD = "bench-pass"
+BENCH_HASH_METHOD = "pbkdf2:sha256:1"
+BENCH_PASSWORD_HASH = generate_password_hash(BENCH_PASSWORD, method=BENCH_HASH_METHOD)
+
+
+def create_bench_app(database_url=None, **overrides):
+    """
+    Create the app on a fresh local database with all tables created.
+
+    Args:
+        database_url (str, optional): SQLAlchemy URL, defaults to a temp SQLite file
+        **overrides: Extra config values
+
+    Returns:
+        Flask: The configured app
+    """
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="ecommerce-bench-"), "bench.db")
+        database_url = f"sqlite:///{path}"
+
+    config = {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SECRET_KEY": "bench",
+        "TESTING": True,
+        # Same method as BENCH_PASSWORD_HASH (no rehash on login), hashed inline
+        "PASSWORD_HASH_METHOD": BENCH_HASH_METHOD,
+        "PASSWORD_HASH_WORKERS": 0,
+        # Background jobs are left queued unless a benchmark processes them
+        "JOBS_WORKERS": 0,
+    }
+    if database_url.startswith("sqlite"):
+        # Writers queue up instead of failing fast with "database is locked"
+        config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"timeout": 30}}
+    config.update(overrides)
+
+    app = create_app(config)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def login(client, email):
+    """Log a test client in as one of the benchmark users."""
+    response = client.post(
+        "/auth/login",
+        data={"email": email, "password": BENCH_PASSWORD}
+    )
+    if response.status_code != 302 or "/auth/sign-up" in response.location:
+        raise RuntimeError(f"Login failed for {email}")
+
+
+@contextmanager
+def count_statements(app):
+    """
+    Count SQL statements (cursor executions) and COMMITs on the app's engine.
+
+    Usage:
+        with count_statements(app) as counts:
+            client.get("/")
+        counts["statements"], counts["commits"]
+    """
+    counts = {"statements": 0, "commits": 0}
+
+    def on_execute(*_):
+        counts["statements"] += 1
+
+    def on_commit(*_):
+        counts["commits"] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        yield counts
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
@@ -0,0 +1,108 @@
+"""
+conditional_get.py
+------------------
+Repeat visits with and without conditional GET.
+
+For the home page (anonymous and logged in) and the order history
+(logged in, --orders orders), measures the steady state of:
+- full:  a plain GET (200, whole page rendered and sent)
+- 304:   the same GET with the ETag of the previous response (If-None-Match)
+reporting SQL statements, body bytes and mean latency per request.
+
+Run:
+    python -m benchmarks.conditional_get --requests 300
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from website import db
+from website.models import Category, Order, OrderItem, Payment, Product, User
+
+from benchmarks.common import BENCH_PASSWORD_HASH, count_statements, create_bench_app, login
+
+
+def seed(app, products: int, orders: int) -> None:
+    with app.app_context():
+        category = Category(name="Bench")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add_all(
+            Product(name=f"Product {number}", price=number + 0.99, stock=10, category_id=category.id)
+            for number in range(products)
+        )
+        user = User(email="reader@bench.local", first_name="Reader", password=BENCH_PASSWORD_HASH)
+        db.session.add(user)
+        db.session.commit()
+
+        start = datetime.utcnow() - timedelta(days=orders)
+        db.session.execute(insert(Order), [
+            {"id": number, "user_id": user.id, "created_at": start + timedelta(days=number), "total_amount": 3.97}
+            for number in range(1, orders + 1)
+        ])
+        db.session.execute(insert(OrderItem), [
+            {"order_id": number, "product_id": 1 + (number + line) % products, "quantity": 1, "price": 1.99}
+            for number in range(1, orders + 1) for line in range(2)
+        ])
+        db.session.execute(insert(Payment), [
+            {"user_id": user.id, "order_id": number, "amount": 3.97, "status": "SUCCESS",
+             "created_at": start + timedelta(days=number)}
+            for number in range(1, orders + 1)
+        ])
+        db.session.commit()
+
+
+def measure(app, client, path: str, requests: int, conditional: bool) -> dict:
+    first = client.get(path)
+    assert first.status_code == 200 and first.headers.get("ETag"), f"{path}: no ETag"
+    headers = {"If-None-Match": first.headers["ETag"]} if conditional else {}
+
+    sizes = 0
+    with count_statements(app) as counts:
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = client.get(path, headers=headers)
+            sizes += len(response.data)
+        elapsed = time.perf_counter() - started
+
+    assert response.status_code == (304 if conditional else 200), response.status_code
+    return {
+        "statements": counts["statements"] / requests,
+        "bytes": sizes / requests,
+        "mean_ms": elapsed / requests * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    app = create_bench_app(args.database_url)
+    seed(app, args.products, args.orders)
+
+    anonymous = app.test_client()
+    reader = app.test_client()
+    login(reader, "reader@bench.local")
+
+    cases = (
+        ("home, anonymous", anonymous, "/"),
+        ("home, logged in", reader, "/"),
+        ("order history", reader, "/orders/orders"),
+    )
+    print(f"{'page':<18}{'mode':<6}{'SQL/req':>9}{'bytes':>9}{'ms/req':>9}")
+    for name, client, path in cases:
+        for conditional in (False, True):
+            result = measure(app, client, path, args.requests, conditional)
+            print(f"{name:<18}{'304' if conditional else 'full':<6}{result['statements']:>9.1f}"
+                  f"{result['bytes']:>9.0f}{result['mean_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
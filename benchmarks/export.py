@@ -0,0 +1,107 @@
+"""
+export.py
+---------
+Throughput and peak memory of the streaming exports (ExportService).
+
+Generates --orders orders over --days days (seeds.generate), then for
+every export (orders, order items, payments) × format (csv, ndjson) and
+for growing date ranges (1/8, 1/4, 1/2, all of the days) reports:
+
+    rows, rows/sec, MB/sec, peak Python memory while streaming
+
+Peak memory should stay flat as the range grows (one fetched chunk at a
+time). For contrast, the last line loads the largest range the way
+order history does (ORM objects, .all()).
+
+Memory is measured with tracemalloc in a separate pass (it slows the
+code down), so the rows/sec figures are unaffected.
+
+Run:
+    python -m benchmarks.export --orders 500000
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from website import db
+from website.models import Order
+from website.services.export_service import EXPORTS, FORMATS, ExportService
+from seeds.generate import Generator
+
+from benchmarks.common import BENCH_PASSWORD_HASH, create_bench_app
+
+FRACTIONS = (8, 4, 2, 1)
+
+
+def build_app(args):
+    app = create_bench_app(args.database_url, EXPORT_CHUNK_ROWS=args.chunk_rows)
+    dataset = argparse.Namespace(
+        seed=args.seed, categories=20, products=10_000, users=args.users,
+        orders=args.orders, carts=0, days=args.days, zipf=1.1, chunk_size=10_000, fixed_clock=True,
+    )
+    with app.app_context():
+        Generator(dataset, BENCH_PASSWORD_HASH).run()
+    return app
+
+
+def drain(kind, fmt, start, end):
+    """Consume an export; return (rows, bytes)."""
+    size, lines = 0, 0
+    for chunk in ExportService.stream(kind, fmt, start, end):
+        size += len(chunk)
+        lines += chunk.count(b"\n")
+    return lines - (1 if fmt == "csv" else 0), size
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--chunk-rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    app = build_app(args)
+    # Generated orders end at the fixed clock (2024-01-01)
+    end = date(2024, 1, 1)
+
+    with app.app_context():
+        print(f"{'export':<22}{'range':>7}{'rows':>11}{'rows/s':>11}{'MB/s':>8}{'peak MB':>9}")
+        for kind in EXPORTS:
+            for fmt in FORMATS:
+                for fraction in FRACTIONS:
+                    start = end - timedelta(days=args.days // fraction)
+                    started = time.perf_counter()
+                    rows, size = drain(kind, fmt, start, end)
+                    elapsed = time.perf_counter() - started
+                    peak = peak_memory(drain, kind, fmt, start, end)
+                    print(f"{kind + '.' + fmt:<22}{'1/' + str(fraction):>7}{rows:>11,}{rows / elapsed:>11,.0f}"
+                          f"{size / elapsed / 1e6:>8.1f}{peak / 1e6:>9.1f}")
+
+        def load_all():
+            return Order.query.filter(Order.created_at >= end - timedelta(days=args.days)).all()
+
+        started = time.perf_counter()
+        count = len(load_all())
+        elapsed = time.perf_counter() - started
+        db.session.remove()
+        peak = peak_memory(load_all)
+        db.session.remove()
+        print(f"{'orders via .all()':<22}{'1/1':>7}{count:>11,}{count / elapsed:>11,.0f}{'':>8}{peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
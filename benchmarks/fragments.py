@@ -0,0 +1,84 @@
+"""
+fragments.py
+------------
+Home page render time when the listing cache misses, with and without
+{% cache %} template fragments.
+
+A checkout bumps the catalog version of the categories it touched, so
+the next view of their listing pages misses the page cache and is
+rebuilt. This benchmark bumps the version before every request (the
+worst case: every request is a page-cache miss) and walks --pages
+listing pages over and over, with FRAGMENT_CACHE on and off. Reports mean
+and p50 latency, and the fragment hit ratios of the run.
+
+Run:
+    python -m benchmarks.fragments --products 2000 --categories 40
+"""
+
+import argparse
+import statistics
+import time
+
+from website import db
+from website.fragment_cache import fragment_cache
+from website.models import Category, Product
+from website.services.catalog_service import CatalogService
+
+from benchmarks.common import create_bench_app
+
+
+def run(args, enabled: bool) -> dict:
+    app = create_bench_app(args.database_url, FRAGMENT_CACHE=enabled, SQL_INSTRUMENTATION=False)
+    with app.app_context():
+        categories = [Category(name=f"Category {number:03d}") for number in range(args.categories)]
+        db.session.add_all(categories)
+        db.session.flush()
+        db.session.add_all(
+            Product(name=f"Product {number:05d}", price=1 + number % 500 + 0.99, stock=10,
+                    category_id=categories[number % args.categories].id)
+            for number in range(args.products)
+        )
+        db.session.commit()
+
+    client = app.test_client()
+    paths = [f"/?page={page}" for page in range(1, args.pages + 1)]
+    for path in paths:
+        client.get(path)
+
+    samples = []
+    for round_ in range(args.rounds):
+        for path in paths:
+            with app.app_context():
+                CatalogService.bump_catalog_version([])
+            started = time.perf_counter()
+            client.get(path)
+            samples.append(time.perf_counter() - started)
+
+    return {
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": statistics.median(samples) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=20, help="Listing pages visited per round")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    off = run(args, enabled=False)
+    on = run(args, enabled=True)
+    print(f"{'fragments':<11}{'mean ms':>9}{'p50 ms':>9}")
+    print(f"{'off':<11}{off['mean_ms']:>9.2f}{off['p50_ms']:>9.2f}")
+    print(f"{'on':<11}{on['mean_ms']:>9.2f}{on['p50_ms']:>9.2f}")
+    print()
+    for name, counters in fragment_cache.stats().items():
+        print(f"{name:<24} hits {counters['hits']:>6}  misses {counters['misses']:>5}  "
+              f"hit ratio {counters['hit_ratio']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+logging_overhead.py
+-------------------
+Cost of the access log under concurrent load.
+
+Serves the (cached) home page from --threads threads at once and reports
+throughput and latency for three setups:
+- off:    LOG_LEVEL=WARNING, no access line at all (the floor)
+- sync:   LOG_ASYNC=False, the JSON line is formatted and written to the
+          file on the request thread (the old RotatingFileHandler setup)
+- queued: LOG_ASYNC=True (default), the request thread only enqueues the
+          record; a listener thread formats and writes it
+
+--slow-write-ms adds a delay to every file write, standing in for a busy
+disk or a network filesystem: the stall the queue keeps off requests.
+
+Run:
+    python -m benchmarks.logging_overhead --threads 8 --requests 500
+    python -m benchmarks.logging_overhead --slow-write-ms 2
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from website import logger as app_logger
+
+from benchmarks.common import create_bench_app
+
+SETUPS = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "sync": {"LOG_ASYNC": False},
+    "queued": {"LOG_ASYNC": True},
+}
+
+
+def slow_down(handler, seconds: float) -> None:
+    """Make every write of the file handler take `seconds` longer."""
+    emit = handler.emit
+
+    def slow_emit(record):
+        time.sleep(seconds)
+        emit(record)
+
+    handler.emit = slow_emit
+
+
+def run(args, name: str, log_dir: str) -> dict:
+    log_file = os.path.join(log_dir, f"{name}.log")
+    app = create_bench_app(
+        args.database_url, LOG_FILE=log_file, SQL_INSTRUMENTATION=True, **SETUPS[name]
+    )
+    if args.slow_write_ms:
+        for writer in app_logger._active["writers"]:
+            slow_down(writer, args.slow_write_ms / 1000)
+
+    # Warm the page cache: every measured request is a cache hit
+    app.test_client().get("/")
+
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        mine = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            client.get("/")
+            mine.append(time.perf_counter() - started)
+        with lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # Flush the queue before counting lines
+    app_logger._stop_active()
+    with open(log_file, encoding="utf-8") as handle:
+        lines = sum(1 for _ in handle)
+
+    samples.sort()
+    return {
+        "rps": len(samples) / elapsed,
+        "p50_ms": statistics.median(samples) * 1000,
+        "p99_ms": samples[int(len(samples) * 0.99) - 1] * 1000,
+        "lines": lines,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per thread")
+    parser.add_argument("--slow-write-ms", type=float, default=0, help="Extra delay per log write")
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="ecommerce-logs-")
+    print(f"{'setup':<9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'log lines':>11}")
+    for name in SETUPS:
+        result = run(args, name, log_dir)
+        print(f"{name:<9}{result['rps']:>9.0f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['lines']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+login_storm.py
+--------------
+Catalog latency while a burst of logins hits the same worker.
+
+A server worker is modelled as a fixed pool of request threads
+(--threads) fed by one queue, like a threaded gunicorn worker.
+Catalog GETs arrive at a steady rate; their latency is measured from
+arrival, so it includes time spent waiting for a free request thread.
+Then logins arrive at --login-rate on top of them.
+
+Two configurations are compared:
+- inline: pbkdf2 runs on the request thread (PASSWORD_HASH_WORKERS=0),
+  every request thread ends up hashing and catalog requests queue behind
+- pool:   hashing pool of --hash-workers processes, bounded to
+  --hash-queue jobs; excess logins get a fast 503 and the request
+  threads stay available for the catalog
+
+Run:
+    python -m benchmarks.login_storm --seconds 5 --login-rate 100
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from website import db
+from website.models import Category, Product, User
+
+from benchmarks.common import BENCH_PASSWORD, create_bench_app
+
+USERS = 50
+
+
+def build_app(args, hash_workers: int, database_url=None):
+    app = create_bench_app(
+        database_url,
+        PASSWORD_HASH_METHOD=args.hash_method,
+        PASSWORD_HASH_WORKERS=hash_workers,
+        PASSWORD_HASH_QUEUE=args.hash_queue,
+    )
+    # One real-cost hash shared by every user (same method as configured, so no rehash)
+    password_hash = generate_password_hash(BENCH_PASSWORD, method=args.hash_method)
+
+    with app.app_context():
+        category = Category(name="Bench")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add_all(
+            Product(name=f"Product {number}", price=number + 0.99, stock=10, category_id=category.id)
+            for number in range(30)
+        )
+        db.session.add_all(
+            User(email=f"user{number}@bench.local", first_name="Bench", password=password_hash)
+            for number in range(USERS)
+        )
+        db.session.commit()
+    return app
+
+
+def percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_phase(app, args, storm: bool) -> dict:
+    """Drive catalog (and optionally login) traffic for --seconds."""
+    catalog_ms = []
+    logins = {"ok": 0, "rejected": 0, "other": 0}
+    lock = threading.Lock()
+
+    def catalog(arrived):
+        app.test_client().get("/")
+        with lock:
+            catalog_ms.append((time.perf_counter() - arrived) * 1000)
+
+    def login(number):
+        response = app.test_client().post(
+            "/auth/login",
+            data={"email": f"user{number % USERS}@bench.local", "password": BENCH_PASSWORD}
+        )
+        outcome = {302: "ok", 503: "rejected"}.get(response.status_code, "other")
+        with lock:
+            logins[outcome] += 1
+
+    def arrivals(rate, submit):
+        interval = 1.0 / rate
+        deadline = time.perf_counter() + args.seconds
+        number = 0
+        while time.perf_counter() < deadline:
+            submit(number)
+            number += 1
+            time.sleep(interval)
+
+    with ThreadPoolExecutor(max_workers=args.threads) as workers:
+        sources = [threading.Thread(
+            target=arrivals,
+            args=(args.catalog_rate, lambda _: workers.submit(catalog, time.perf_counter()))
+        )]
+        if storm:
+            sources.append(threading.Thread(
+                target=arrivals,
+                args=(args.login_rate, lambda number: workers.submit(login, number))
+            ))
+        for source in sources:
+            source.start()
+        for source in sources:
+            source.join()
+
+    return {
+        "catalog_p50": percentile(catalog_ms, 0.50),
+        "catalog_p99": percentile(catalog_ms, 0.99),
+        "catalog_mean": statistics.fmean(catalog_ms) if catalog_ms else 0.0,
+        **logins,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--threads", type=int, default=8, help="Request threads in the simulated worker")
+    parser.add_argument("--catalog-rate", type=float, default=50, help="Catalog GETs per second")
+    parser.add_argument("--login-rate", type=float, default=100, help="Logins per second during the storm")
+    parser.add_argument("--hash-method", default="pbkdf2:sha256:600000")
+    parser.add_argument("--hash-workers", type=int, default=2)
+    parser.add_argument("--hash-queue", type=int, default=4)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    print(f"{args.threads} request threads, {args.catalog_rate:g} catalog req/s, "
+          f"storm of {args.login_rate:g} logins/s, {args.hash_method}")
+    print(f"{'mode':<8}{'phase':<8}{'p50 ms':>10}{'p99 ms':>10}{'logins ok':>11}{'503':>7}")
+
+    for mode, hash_workers in (("inline", 0), ("pool", args.hash_workers)):
+        app = build_app(args, hash_workers, args.database_url)
+        for phase, storm in (("quiet", False), ("storm", True)):
+            result = run_phase(app, args, storm)
+            print(f"{mode:<8}{phase:<8}{result['catalog_p50']:>10.1f}{result['catalog_p99']:>10.1f}"
+                  f"{result['ok']:>11}{result['rejected']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+replica_routing.py
+------------------
+Checks read-replica routing locally, with two SQLite files standing in
+for the primary and the replica.
+
+The "replica" starts as a copy of the primary, then never receives
+another write (a replica with infinite lag); its product names are
+suffixed with " [replica]" so every page shows where it was read from.
+
+Checks:
+1. read-only routes (home, order history) read the replica
+2. checkout runs entirely on the primary (no statement on the replica)
+3. read-your-writes: right after checkout the buyer's order history
+   reads the primary (the new order is visible) ...
+4. ... and once the sticky window is over it reads the replica again
+5. a catalog page refilled right after a catalog write reads the
+   primary, so no stale page is cached for other users
+
+Run:
+    python -m benchmarks.replica_routing
+"""
+
+import os
+import tempfile
+import time
+
+from sqlalchemy import event, insert, select, update
+
+from website import db
+from website.models import Cart, CartItem, Category, Product, User
+
+from benchmarks.common import BENCH_PASSWORD_HASH, create_bench_app, login
+
+STICKY_SECONDS = 1.0
+
+
+def build_app():
+    directory = tempfile.mkdtemp(prefix="ecommerce-replica-")
+    replica_url = f"sqlite:///{os.path.join(directory, 'replica.db')}"
+    app = create_bench_app(
+        f"sqlite:///{os.path.join(directory, 'primary.db')}",
+        SQLALCHEMY_BINDS={"replica": replica_url},
+        REPLICA_STICKY_SECONDS=STICKY_SECONDS,
+    )
+
+    with app.app_context():
+        category = Category(name="Bench")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add_all(
+            Product(name=f"Product {number}", price=10.0 + number, stock=100, category_id=category.id)
+            for number in range(10)
+        )
+        db.session.add(User(email="buyer@bench.local", first_name="Buyer", password=BENCH_PASSWORD_HASH))
+        db.session.commit()
+
+        # "Replicate" once: copy every table, then tag the replica's products
+        primary, replica = db.engines[None], db.engines["replica"]
+        db.metadata.create_all(replica)
+        with primary.connect() as source, replica.begin() as target:
+            for table in db.metadata.sorted_tables:
+                rows = [dict(row) for row in source.execute(select(table)).mappings()]
+                if rows:
+                    target.execute(insert(table), rows)
+            target.execute(update(Product.__table__).values(name=Product.__table__.c.name + " [replica]"))
+    return app
+
+
+def statements_per_engine(app):
+    counts = {}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            name = key or "primary"
+            counts[name] = 0
+
+            def count(*_, name=name):
+                counts[name] += 1
+
+            event.listen(engine, "before_cursor_execute", count)
+    return counts
+
+
+def check(label: str, condition: bool) -> None:
+    print(f"{'PASS' if condition else 'FAIL'}  {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def main():
+    app = build_app()
+    counts = statements_per_engine(app)
+
+    # Let the initial catalog version age past the lag window
+    anonymous = app.test_client()
+    anonymous.get("/")
+    time.sleep(STICKY_SECONDS)
+
+    page = anonymous.get("/?sort=price_asc").get_data(as_text=True)
+    check("home reads the replica", "[replica]" in page)
+
+    buyer = app.test_client()
+    login(buyer, "buyer@bench.local")
+    time.sleep(STICKY_SECONDS)
+    history = buyer.get("/orders/orders").get_data(as_text=True)
+    check("order history reads the replica", "Order #" not in history)
+
+    # Cart writes and checkout: primary only
+    with app.app_context():
+        user = db.session.query(User).filter_by(email="buyer@bench.local").one()
+        cart = Cart(user_id=user.id, item_count=1)
+        db.session.add(cart)
+        db.session.flush()
+        db.session.add(CartItem(cart_id=cart.id, product_id=1, quantity=1))
+        db.session.commit()
+
+    before = dict(counts)
+    response = buyer.post("/checkout")
+    check("checkout succeeds", response.status_code == 302 and "/orders" in response.location)
+    check("checkout sends nothing to the replica", counts["replica"] == before["replica"])
+    check("checkout runs on the primary", counts["primary"] > before["primary"])
+
+    history = buyer.get("/orders/orders").get_data(as_text=True)
+    check("right after checkout, order history reads the primary (sticky)", "Order #" in history)
+
+    page = anonymous.get("/?sort=price_desc").get_data(as_text=True)
+    check("catalog page refilled right after the stock change reads the primary",
+          "[replica]" not in page)
+
+    time.sleep(STICKY_SECONDS)
+    history = buyer.get("/orders/orders").get_data(as_text=True)
+    check("after the sticky window, order history reads the replica again", "Order #" not in history)
+
+    print("OK: reads routed to the replica, writes and fresh reads to the primary")
+
+
+if __name__ == "__main__":
+    main()
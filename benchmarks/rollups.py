@@ -0,0 +1,171 @@
+"""
+rollups.py
+----------
+Sales reports from the rollup tables vs aggregating OrderItem directly.
+
+Generates --orders orders over --days days (seeds.generate), then:
+1. `rebuild`: rolls up the whole history (orders/sec)
+2. checks that the rollups match a direct aggregation of the order lines
+   (units and revenue per day, per product, per category)
+3. times each report over the last 7 / 30 / 365 days, from the rollups
+   and straight from OrderItem
+4. places --new-orders more orders and times the incremental catch-up
+
+Run:
+    python -m benchmarks.rollups --orders 500000
+"""
+
+import argparse
+import math
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from website import db
+from website.models import Category, Order, OrderItem, Product
+from website.services.rollup_service import RollupService
+from seeds.generate import Generator
+
+from benchmarks.common import BENCH_PASSWORD_HASH, create_bench_app
+
+# Generated orders end at the fixed clock
+END = date(2024, 1, 1)
+
+
+def build_app(args):
+    app = create_bench_app(args.database_url, ROLLUP_SETTLE_SECONDS=0)
+    dataset = argparse.Namespace(
+        seed=args.seed, categories=50, products=args.products, users=args.users,
+        orders=args.orders, carts=0, days=args.days, zipf=1.1, chunk_size=10_000, fixed_clock=True,
+    )
+    with app.app_context():
+        Generator(dataset, BENCH_PASSWORD_HASH).run()
+    return app
+
+
+# --------------------------------------------------
+# The same reports, aggregating every order line
+# --------------------------------------------------
+def _raw_lines(start):
+    return (
+        select()
+        .select_from(OrderItem)
+        .join(Order, OrderItem.order_id == Order.id)
+        .where(Order.created_at >= datetime.combine(start, datetime.min.time()))
+    )
+
+
+def raw_revenue_by_day(start):
+    day = func.date(Order.created_at, type_=db.Date)
+    query = _raw_lines(start).add_columns(
+        day.label("day"),
+        func.sum(OrderItem.quantity).label("units"),
+        func.sum(OrderItem.quantity * OrderItem.price).label("revenue"),
+    ).group_by(day).order_by(day)
+    return [
+        {"day": row.day.isoformat(), "units": int(row.units), "revenue": round(float(row.revenue), 2)}
+        for row in db.session.execute(query)
+    ]
+
+
+def raw_top_products(start, limit=20):
+    units = func.sum(OrderItem.quantity)
+    query = _raw_lines(start).add_columns(OrderItem.product_id, units.label("units")) \
+        .group_by(OrderItem.product_id).order_by(units.desc(), OrderItem.product_id).limit(limit)
+    return [(row.product_id, int(row.units)) for row in db.session.execute(query)]
+
+
+def raw_sales_by_category(start):
+    revenue = func.sum(OrderItem.quantity * OrderItem.price)
+    query = _raw_lines(start).join(Product, OrderItem.product_id == Product.id).join(
+        Category, Category.id == Product.category_id
+    ).add_columns(Category.id, func.sum(OrderItem.quantity).label("units"), revenue.label("revenue")) \
+        .group_by(Category.id).order_by(revenue.desc())
+    return [(row.id, int(row.units), round(float(row.revenue), 2)) for row in db.session.execute(query)]
+
+
+def timed(function, *args, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        samples.append(time.perf_counter() - started)
+        db.session.rollback()
+    return result, statistics.median(samples)
+
+
+def close(a, b):
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=0.011)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500_000)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--new-orders", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    app = build_app(args)
+    with app.app_context():
+        started = time.perf_counter()
+        rolled = RollupService.rebuild()
+        elapsed = time.perf_counter() - started
+        print(f"rebuild: {rolled:,} orders in {elapsed:.1f}s ({rolled / elapsed:,.0f} orders/s)")
+
+        # 2. Correctness over the whole history
+        start = END - timedelta(days=args.days + 1)
+        assert RollupService.revenue_by_day(start) == raw_revenue_by_day(start), "revenue by day differs"
+        top = [(row["product_id"], row["units"]) for row in RollupService.top_products(start, limit=50)]
+        assert top == raw_top_products(start, 50), "top products differ"
+        rolled_categories = [(row["category_id"], row["units"], row["revenue"]) for row in RollupService.sales_by_category(start)]
+        raw_categories = raw_sales_by_category(start)
+        assert len(rolled_categories) == len(raw_categories) and all(
+            a[0] == b[0] and a[1] == b[1] and close(a[2], b[2]) for a, b in zip(rolled_categories, raw_categories)
+        ), "sales by category differ"
+        print("rollups match the order lines (per day, top products, per category)")
+
+        # 3. Report latency
+        print(f"\n{'report':<22}{'range':>7}{'rollup ms':>11}{'raw ms':>10}{'speed-up':>10}")
+        reports = (
+            ("revenue by day", RollupService.revenue_by_day, raw_revenue_by_day),
+            ("top products", RollupService.top_products, raw_top_products),
+            ("sales by category", RollupService.sales_by_category, raw_sales_by_category),
+        )
+        for days in (7, 30, 365):
+            start = END - timedelta(days=days)
+            for name, rolled_report, raw_report in reports:
+                _, rolled_time = timed(rolled_report, start)
+                _, raw_time = timed(raw_report, start, repeat=3)
+                print(f"{name:<22}{days:>6}d{rolled_time * 1000:>11.2f}{raw_time * 1000:>10.1f}"
+                      f"{raw_time / rolled_time:>9.0f}x")
+
+        # 4. Incremental catch-up after new checkouts
+        last = db.session.scalar(select(func.max(Order.id)))
+        product_ids = db.session.scalars(select(Product.id).limit(100)).all()
+        now = datetime.utcnow() - timedelta(seconds=1)
+        db.session.execute(insert(Order), [
+            {"id": last + number, "user_id": 1, "created_at": now, "total_amount": 10.0}
+            for number in range(1, args.new_orders + 1)
+        ])
+        db.session.execute(insert(OrderItem), [
+            {"order_id": last + number, "product_id": product_ids[number % len(product_ids)],
+             "quantity": 1, "price": 10.0}
+            for number in range(1, args.new_orders + 1)
+        ])
+        db.session.commit()
+
+        started = time.perf_counter()
+        rolled = RollupService.catch_up()
+        elapsed = time.perf_counter() - started
+        print(f"\ncatch-up of {rolled:,} new orders: {elapsed * 1000:.1f} ms; "
+              f"nothing new: {timed(RollupService.catch_up)[1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+run.py
+------
+End-to-end benchmark suite for the storefront routes.
+
+Seeds a local database (temp SQLite by default, or --database-url for a
+local MySQL-compatible server) with seeds.generate, then drives each
+route through the Flask test client:
+
+    home           GET  /                 (random category / sort / page)
+    add_to_cart    POST /add-to-cart/<id>
+    view_cart      GET  /cart
+    checkout       POST /checkout         (cart refilled, untimed, before each one)
+    order_history  GET  /orders/orders
+
+Two modes per route:
+- sequential: one client, one request at a time → latency and SQL statements per request
+- threaded:   --threads clients (one user each) in parallel → latency under contention and throughput
+
+Reports p50 / p95 / p99 latency (ms), throughput (req/s) and SQL statements
+per request. Save a baseline on a known-good commit, compare later:
+
+    python -m benchmarks.run --save-baseline bench_baseline.json
+    python -m benchmarks.run --baseline bench_baseline.json     # exit 1 on regression
+
+A route regresses when its p95 or throughput is worse than the baseline by
+more than --tolerance (default 25%), when it issues more SQL statements per
+request, or when any request fails (error status, or a checkout that
+redirected back to the cart instead of the order history).
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from sqlalchemy import update
+
+from website import db
+from website.models import Product
+from seeds.generate import Generator
+
+from benchmarks.common import BENCH_PASSWORD_HASH, count_statements, create_bench_app, login
+
+# Products kept in stock for every run (ids 1..HOT_PRODUCTS)
+HOT_PRODUCTS = 100
+
+# Max extra SQL statements per request tolerated before calling it a regression
+# (cache hit / miss mix can move the average a little)
+QUERY_SLACK = 0.1
+
+
+# ==================================================
+# ROUTE SCENARIOS
+# ==================================================
+# Each scenario does its (untimed) preparation with the client and
+# returns the (method, path) of the request to time
+def home(client, rng, dataset):
+    category = rng.choice([0] + list(range(1, dataset["categories"] + 1)))
+    sort = rng.choice(["name_asc", "name_desc", "price_asc", "price_desc"])
+    page = rng.randint(1, 5)
+    return "GET", f"/?category={category}&sort={sort}&page={page}"
+
+
+def add_to_cart(client, rng, dataset):
+    return "POST", f"/add-to-cart/{rng.randint(1, HOT_PRODUCTS)}"
+
+
+def view_cart(client, rng, dataset):
+    return "GET", "/cart"
+
+
+def checkout(client, rng, dataset):
+    for _ in range(rng.randint(1, 3)):
+        client.post(f"/add-to-cart/{rng.randint(1, HOT_PRODUCTS)}")
+    return "POST", "/checkout"
+
+
+def order_history(client, rng, dataset):
+    return "GET", "/orders/orders"
+
+
+SCENARIOS = {
+    "home": home,
+    "add_to_cart": add_to_cart,
+    "view_cart": view_cart,
+    "checkout": checkout,
+    "order_history": order_history,
+}
+
+# Where a successful request redirects, for routes that report failure
+# with a redirect instead of an error status: a rejected checkout goes
+# back to the cart (302 + flash message), a placed order to the history
+SUCCESS_LOCATIONS = {
+    checkout: "/orders/orders",
+}
+
+
+def failed(scenario, response) -> bool:
+    """True for an error status, or a redirect elsewhere than the route's success page."""
+    if response.status_code >= 400:
+        return True
+    expected = SUCCESS_LOCATIONS.get(scenario)
+    return expected is not None and urlsplit(response.location or "").path != expected
+
+
+# ==================================================
+# SETUP
+# ==================================================
+def build_app(args):
+    """Fresh database seeded with the generator; returns the app."""
+    app = create_bench_app(args.database_url)
+    dataset = argparse.Namespace(
+        seed=args.seed,
+        categories=args.categories,
+        products=args.products,
+        users=args.users,
+        orders=args.orders,
+        carts=0,
+        days=365,
+        zipf=1.1,
+        chunk_size=10_000,
+        fixed_clock=True,
+    )
+    with app.app_context():
+        # Every generated user logs in with BENCH_PASSWORD
+        Generator(dataset, BENCH_PASSWORD_HASH).run()
+        db.session.execute(
+            update(Product).where(Product.id <= HOT_PRODUCTS).values(stock=10 ** 9)
+        )
+        db.session.commit()
+    return app
+
+
+def logged_in_client(app, user_id: int):
+    client = app.test_client()
+    # seeds.generate names its users user<id>@example.com
+    login(client, f"user{user_id}@example.com")
+    return client
+
+
+# ==================================================
+# MEASUREMENT
+# ==================================================
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies, elapsed: float, errors: int, statements=None) -> dict:
+    result = {
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "throughput": len(latencies) / elapsed,
+        "errors": errors,
+    }
+    if statements is not None:
+        result["queries"] = statements / len(latencies)
+    return result
+
+
+def run_sequential(app, scenario, requests: int, seed: int, dataset: dict) -> dict:
+    rng = random.Random(seed)
+    client = logged_in_client(app, 1)
+
+    # Warm-up (caches, connection pool), not measured
+    for _ in range(min(20, requests)):
+        method, path = scenario(client, rng, dataset)
+        client.open(path, method=method)
+
+    latencies, errors, statements, busy = [], 0, 0, 0.0
+    for _ in range(requests):
+        method, path = scenario(client, rng, dataset)
+        with count_statements(app) as counts:
+            started = time.perf_counter()
+            response = client.open(path, method=method)
+            latency = time.perf_counter() - started
+        latencies.append(latency)
+        busy += latency
+        statements += counts["statements"]
+        errors += failed(scenario, response)
+
+    return summarize(latencies, busy, errors, statements)
+
+
+def run_threaded(app, scenario, requests: int, threads: int, seed: int, dataset: dict) -> dict:
+    # One user per thread: carts and orders of different threads do not mix
+    clients = [logged_in_client(app, user_id) for user_id in range(1, threads + 1)]
+    per_thread = max(1, requests // threads)
+    latencies, lock = [], threading.Lock()
+    errors = [0]
+    start = threading.Barrier(threads + 1)
+
+    def worker(number):
+        rng = random.Random(seed + number)
+        client = clients[number]
+        mine, failures = [], 0
+        start.wait()
+        for _ in range(per_thread):
+            method, path = scenario(client, rng, dataset)
+            started = time.perf_counter()
+            response = client.open(path, method=method)
+            mine.append(time.perf_counter() - started)
+            failures += failed(scenario, response)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failures
+
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return summarize(latencies, elapsed, errors[0])
+
+
+# ==================================================
+# BASELINE COMPARISON
+# ==================================================
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return human-readable regressions (empty list = all good)."""
+    problems = []
+    for mode, routes in results.items():
+        for route, current in routes.items():
+            if current["errors"]:
+                problems.append(f"{mode}/{route}: {current['errors']} failed requests")
+
+            previous = baseline.get(mode, {}).get(route)
+            if previous is None:
+                continue
+            if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                problems.append(
+                    f"{mode}/{route}: p95 {current['p95_ms']:.2f} ms vs baseline {previous['p95_ms']:.2f} ms"
+                )
+            if current["throughput"] < previous["throughput"] * (1 - tolerance):
+                problems.append(
+                    f"{mode}/{route}: {current['throughput']:.0f} req/s vs baseline {previous['throughput']:.0f} req/s"
+                )
+            if "queries" in previous and current.get("queries", 0) > previous["queries"] + QUERY_SLACK:
+                problems.append(
+                    f"{mode}/{route}: {current['queries']:.2f} SQL/request vs baseline {previous['queries']:.2f}"
+                )
+    return problems
+
+
+def print_table(mode: str, routes: dict) -> None:
+    print(f"\n{mode}")
+    print(f"{'route':<15}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'SQL/req':>9}{'errors':>8}")
+    for route, result in routes.items():
+        queries = f"{result['queries']:.2f}" if "queries" in result else "-"
+        print(f"{route:<15}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{result['throughput']:>9.0f}{queries:>9}{result['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    parser.add_argument("--routes", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per route and mode")
+    parser.add_argument("--threads", type=int, default=8, help="Clients in the threaded mode (0 = skip it)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--orders", type=int, default=5_000)
+    parser.add_argument("--baseline", help="Compare with this baseline JSON, exit 1 on regression")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown of p95 / throughput (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if args.users < max(args.threads, 1):
+        parser.error("--users must be at least --threads")
+
+    print(f"seeding {args.products:,} products, {args.users:,} users, {args.orders:,} orders ...")
+    app = build_app(args)
+    dataset = {"categories": args.categories}
+
+    results = {"sequential": {}, "threaded": {}}
+    for route in args.routes:
+        scenario = SCENARIOS[route]
+        results["sequential"][route] = run_sequential(app, scenario, args.requests, args.seed, dataset)
+        if args.threads:
+            results["threaded"][route] = run_threaded(
+                app, scenario, args.requests, args.threads, args.seed, dataset
+            )
+
+    for mode, routes in results.items():
+        if routes:
+            print_table(mode, routes)
+
+    config = {name: getattr(args, name) for name in ("requests", "threads", "seed", "categories",
+                                                     "products", "users", "orders")}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as handle:
+            json.dump({"config": config, "results": results}, handle, indent=2)
+        print(f"\nbaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline["config"] != config:
+            print(f"\nwarning: baseline was recorded with {baseline['config']}")
+        problems = compare(results, baseline["results"], args.tolerance)
+        if problems:
+            print("\nREGRESSIONS:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("\nOK: no regression against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+search.py
+---------
+Latency of ProductService.search on a large generated catalog.
+
+Builds the in-process index over --products generated products
+(seeds.generate), then runs a mix of queries through the service
+(index lookup + the one query fetching the page's products):
+
+    one term, two terms, three terms, with a category filter,
+    sorted by relevance and by price
+
+and reports the index build time and p50 / p95 / p99 per query shape.
+
+The periodic catch-up is disabled while queries are timed; it is timed
+on its own at the end, after updating --changed products with plain SQL,
+the way another worker's writes look.
+
+Run:
+    python -m benchmarks.search --products 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from website import db
+from website.models import Product
+from website.services.product_service import ProductService
+from website.services.search_index import SearchIndexService
+from seeds.generate import ADJECTIVES, NOUNS, Generator
+
+from benchmarks.common import BENCH_PASSWORD_HASH, create_bench_app
+from benchmarks.run import percentile
+
+
+def build_app(args):
+    app = create_bench_app(args.database_url, SEARCH_REFRESH_SECONDS=10**9)
+    dataset = argparse.Namespace(
+        seed=args.seed, categories=args.categories, products=args.products, users=0,
+        orders=0, carts=0, days=365, zipf=1.1, chunk_size=10_000, fixed_clock=True,
+    )
+    with app.app_context():
+        Generator(dataset, BENCH_PASSWORD_HASH).run()
+        # A real catalog was not all written in the last minute
+        db.session.execute(update(Product).values(updated_at=datetime(2024, 1, 1)))
+        db.session.commit()
+    return app
+
+
+def query_shapes(rng, categories: int):
+    """name → function returning (query, category_id, sort)"""
+    return {
+        "1 term": lambda: (rng.choice(NOUNS), None, "relevance"),
+        "2 terms": lambda: (f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}", None, "relevance"),
+        "3 terms": lambda: (f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} synthetic", None, "relevance"),
+        "2 terms + category": lambda: (
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}", rng.randint(1, categories), "relevance"
+        ),
+        "2 terms, by price": lambda: (f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}", None, "price_asc"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per shape")
+    parser.add_argument("--changed", type=int, default=100, help="Products changed before the catch-up")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    app = build_app(args)
+    rng = random.Random(args.seed)
+
+    with app.test_request_context("/search"):
+        started = time.perf_counter()
+        SearchIndexService.warm()
+        index = SearchIndexService.current()
+        print(f"index: {index.live_count:,} products, {len(index.postings):,} terms, "
+              f"built in {time.perf_counter() - started:.1f}s")
+
+        print(f"\n{'query shape':<22}{'matches':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name, make in query_shapes(rng, args.categories).items():
+            latencies, totals = [], []
+            for _ in range(args.queries):
+                query, category_id, sort = make()
+                started = time.perf_counter()
+                result = ProductService.search(query, category_id=category_id, sort=sort)
+                latencies.append(time.perf_counter() - started)
+                totals.append(result["total"])
+                db.session.remove()
+            print(f"{name:<22}{statistics.fmean(totals):>10,.0f}{percentile(latencies, 0.50) * 1000:>9.2f}"
+                  f"{percentile(latencies, 0.95) * 1000:>9.2f}{percentile(latencies, 0.99) * 1000:>9.2f}")
+
+        # Catch-up: rows changed "by another worker" after the build
+        index.watermark = datetime.utcnow() - timedelta(seconds=1)
+        db.session.execute(
+            update(Product)
+            .where(Product.id <= args.changed)
+            .values(description=Product.description + " refurbished", updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+        started = time.perf_counter()
+        SearchIndexService._catch_up(index)
+        elapsed = time.perf_counter() - started
+        found = ProductService.search("refurbished")["total"]
+        print(f"\ncatch-up of {args.changed} changed products: {elapsed * 1000:.1f} ms ({found} now match)")
+
+
+if __name__ == "__main__":
+    main()
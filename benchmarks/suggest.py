@@ -0,0 +1,131 @@
+"""
+suggest.py
+----------
+Throughput of the search box suggestions (/api/suggest) on a generated
+catalog with Zipf-distributed sales (seeds.generate).
+
+Reports:
+- index build time (keys, weights, segment tree)
+- suggestions/sec and p50 / p99 per prefix length, straight from the
+  index (what a keystroke costs the worker) ...
+- ... and through the Flask route (JSON encoding + request overhead)
+
+Before timing, a sample of prefixes is checked against a brute-force
+answer (scan every name, sort by units sold then name).
+
+Run:
+    python -m benchmarks.suggest --products 1000000 --orders 200000
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import func
+
+from website import db
+from website.models import OrderItem, Product
+from website.services.suggest_index import SuggestIndexService, _word_starts, normalize
+from seeds.generate import Generator
+
+from benchmarks.common import BENCH_PASSWORD_HASH, create_bench_app
+from benchmarks.run import percentile
+
+PREFIX_LENGTHS = (1, 2, 3, 5, 8, 12)
+
+
+def build_app(args):
+    app = create_bench_app(args.database_url)
+    dataset = argparse.Namespace(
+        seed=args.seed, categories=50, products=args.products, users=args.users,
+        orders=args.orders, carts=0, days=365, zipf=1.1, chunk_size=10_000, fixed_clock=True,
+    )
+    with app.app_context():
+        Generator(dataset, BENCH_PASSWORD_HASH).run()
+    return app
+
+
+def brute_force(names, sold, prefix, limit):
+    prefix = normalize(prefix)
+    matches = {
+        product_id: min(key for key in _word_starts(name) if key.startswith(prefix))
+        for product_id, name in names.items()
+        if any(key.startswith(prefix) for key in _word_starts(name))
+    }
+    ranked = sorted(matches, key=lambda product_id: (-sold.get(product_id, 0), matches[product_id].encode(), product_id))
+    return ranked[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=20_000, help="Index lookups per prefix length")
+    parser.add_argument("--http-queries", type=int, default=2_000)
+    parser.add_argument("--checks", type=int, default=20, help="Prefixes checked against brute force")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    app = build_app(args)
+    rng = random.Random(args.seed)
+
+    with app.test_request_context("/api/suggest"):
+        started = time.perf_counter()
+        SuggestIndexService.warm()
+        index = SuggestIndexService.current()
+        print(f"index: {len(index.product_ids):,} products, {len(index.key_products):,} keys, "
+              f"built in {time.perf_counter() - started:.1f}s")
+
+        names = dict(db.session.query(Product.id, Product.name))
+        sold = {
+            product_id: int(quantity)
+            for product_id, quantity in db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .group_by(OrderItem.product_id)
+        }
+        product_ids = list(names)
+
+        def random_prefix(length):
+            name = names[rng.choice(product_ids)]
+            key = rng.choice(list(_word_starts(name)))
+            return key[:length]
+
+        # Correctness first
+        for _ in range(args.checks):
+            prefix = random_prefix(rng.choice(PREFIX_LENGTHS))
+            got = [item["id"] for item in index.suggest(prefix, 8)]
+            expected = brute_force(names, sold, prefix, 8)
+            if got != expected:
+                raise SystemExit(f"FAIL {prefix!r}: {got} != {expected}")
+        print(f"{args.checks} prefixes match the brute-force ranking")
+
+        print(f"\n{'prefix length':<15}{'matches/8':>10}{'sugg/s':>12}{'p50 µs':>9}{'p99 µs':>9}")
+        for length in PREFIX_LENGTHS:
+            prefixes = [random_prefix(length) for _ in range(args.queries)]
+            latencies, filled = [], 0
+            started = time.perf_counter()
+            for prefix in prefixes:
+                began = time.perf_counter()
+                filled += len(index.suggest(prefix, 8))
+                latencies.append(time.perf_counter() - began)
+            elapsed = time.perf_counter() - started
+            print(f"{length:<15}{filled / len(prefixes):>10.1f}{len(prefixes) / elapsed:>12,.0f}"
+                  f"{percentile(latencies, 0.50) * 1e6:>9.0f}{percentile(latencies, 0.99) * 1e6:>9.0f}")
+
+    client = app.test_client()
+    prefixes = [random_prefix(rng.choice(PREFIX_LENGTHS)) for _ in range(args.http_queries)]
+    latencies = []
+    started = time.perf_counter()
+    for prefix in prefixes:
+        began = time.perf_counter()
+        response = client.get("/api/suggest", query_string={"q": prefix})
+        latencies.append(time.perf_counter() - began)
+        assert response.status_code == 200
+    elapsed = time.perf_counter() - started
+    print(f"\nthrough /api/suggest: {len(prefixes) / elapsed:,.0f} suggestions/s, "
+          f"p50 {percentile(latencies, 0.50) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
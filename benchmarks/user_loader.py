@@ -0,0 +1,68 @@
+"""
+user_loader.py
+--------------
+Cost of identifying the logged-in user on every authenticated request.
+
+Runs the same authenticated GET with the user identity cache on
+(USER_CACHE_TIMEOUT=60) and off (USER_CACHE_TIMEOUT=0) and reports
+SQL statements per request and mean latency in the steady state.
+
+Run:
+    python -m benchmarks.user_loader --requests 500
+"""
+
+import argparse
+import time
+
+from website import db
+from website.models import Category, Product, User
+
+from benchmarks.common import BENCH_PASSWORD_HASH, count_statements, create_bench_app, login
+
+
+def measure(user_cache_timeout: int, requests: int, path: str, database_url=None) -> dict:
+    app = create_bench_app(database_url, USER_CACHE_TIMEOUT=user_cache_timeout)
+    with app.app_context():
+        category = Category(name="Bench")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add_all(
+            Product(name=f"Product {number}", price=number + 0.99, stock=10, category_id=category.id)
+            for number in range(30)
+        )
+        db.session.add(User(email="reader@bench.local", first_name="Reader", password=BENCH_PASSWORD_HASH))
+        db.session.commit()
+
+    client = app.test_client()
+    login(client, "reader@bench.local")
+
+    # Warm every cache once, then measure the steady state
+    client.get(path)
+
+    with count_statements(app) as counts:
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "queries_per_request": counts["statements"] / requests,
+        "mean_ms": elapsed / requests * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--path", default="/", help="Authenticated route to hit")
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    print(f"{'user cache':>12} {'queries/req':>12} {'mean ms':>9}")
+    for label, timeout in (("off", 0), ("on", 60)):
+        result = measure(timeout, args.requests, args.path, args.database_url)
+        print(f"{label:>12} {result['queries_per_request']:>12.2f} {result['mean_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
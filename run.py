@@ -1,6 +1,25 @@
+import time
+
+# Cold start = importing the app's code + create_app (see website/startup.py)
+_import_started = time.perf_counter()
+
 from website import create_app
 
+_import_seconds = time.perf_counter() - _import_started
+
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the development server.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print the time spent per startup phase and exit")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        profile = app.extensions["startup_profile"]
+        profile.phases.insert(0, ("import website", _import_seconds))
+        print(profile.report())
+    else:
+        app.run(debug=True)
@@ -0,0 +1,352 @@
+"""
+generate.py
+-----------
+High-volume synthetic data for benchmarks and capacity tests.
+
+Generates categories, products, users, orders (+ items + payments) and
+carts (+ items) with production-like skew:
+- product popularity follows a Zipf law (a few best-sellers, a long tail)
+- order frequency per user follows a Zipf law too (a few heavy buyers)
+
+Why it is fast:
+- rows go through SQLAlchemy Core executemany in chunks (--chunk-size),
+  never through the ORM unit of work
+- primary keys are assigned here, so orders and carts can reference
+  products and users without reading anything back
+- every user shares ONE precomputed password hash (hashing 100k+
+  passwords at a production work factor would take hours)
+
+Deterministic: the same --seed and sizes always produce the same data.
+
+Run (against the configured database, or --database-url):
+    python -m seeds.generate --reset --products 1000000 --users 200000 \\
+        --orders 500000 --carts 50000 --seed 42
+
+Every generated user can log in with --password (default "password").
+"""
+
+import argparse
+import itertools
+import random
+import time
+from array import array
+from bisect import bisect
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, insert, select
+from werkzeug.security import generate_password_hash
+
+from website import cache, create_app, db
+from website.models import Cart, CartItem, Category, Order, OrderItem, Payment, Product, User
+
+
+ADJECTIVES = [
+    "Classic", "Smart", "Compact", "Wireless", "Premium", "Eco", "Ultra", "Portable",
+    "Vintage", "Pro", "Mini", "Deluxe", "Rugged", "Slim", "Organic", "Digital",
+]
+NOUNS = [
+    "Phone", "Laptop", "Headphones", "Backpack", "Sneakers", "Jacket", "Blender",
+    "Novel", "Watch", "Camera", "Lamp", "Speaker", "Bottle", "Tent", "Keyboard", "Mug",
+]
+FIRST_NAMES = [
+    "Alice", "Bob", "Charlie", "David", "Eve", "Frank", "Grace", "Heidi",
+    "Ivan", "Judy", "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil",
+]
+
+
+class ZipfSampler:
+    """
+    Draws indexes 0..n-1 with P(rank k) proportional to 1 / k**s.
+
+    Ranks are mapped to indexes through a seeded shuffle, so the
+    best-sellers are spread over the id space instead of being ids 1..10.
+    """
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        self.cumulative = list(itertools.accumulate(1.0 / rank ** s for rank in range(1, n + 1)))
+        self.total = self.cumulative[-1]
+        self.index_of_rank = array("l", range(n))
+        rng.shuffle(self.index_of_rank)
+        self.rng = rng
+
+    def sample(self) -> int:
+        rank = bisect(self.cumulative, self.rng.random() * self.total)
+        return self.index_of_rank[min(rank, len(self.index_of_rank) - 1)]
+
+
+def insert_chunks(table, rows, chunk_size: int) -> int:
+    """
+    Insert an iterable of row dicts in chunks, one transaction per chunk.
+
+    Args:
+        table: SQLAlchemy Table
+        rows: Iterable of dicts (consumed lazily)
+        chunk_size (int): Rows per executemany
+
+    Returns:
+        int: Rows inserted
+    """
+    inserted = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return inserted
+        with db.engine.begin() as connection:
+            connection.execute(insert(table), chunk)
+        inserted += len(chunk)
+
+
+def next_id(model) -> int:
+    """First free primary key of a table (ids are assigned by the generator)."""
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def tune_for_bulk_load(engine) -> None:
+    """
+    SQLite only: a large page cache and no fsync per commit.
+    The default 2 MB cache thrashes on the (name, ...) indexes, which
+    receive keys in random order; this is a throwaway benchmark database.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA cache_size = -524288")  # 512 MB
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.close()
+
+    # Connections opened before the listener existed would keep the defaults
+    engine.dispose()
+
+
+def timed(label: str, load) -> None:
+    started = time.perf_counter()
+    counts = load()
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{count:,} {name}" for name, count in counts.items())
+    rate = sum(counts.values()) / elapsed if elapsed else 0
+    print(f"{label:<12} {summary} in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+
+class Generator:
+    """Holds the shared state (ids, prices, samplers) of one generation run."""
+
+    def __init__(self, args, password_hash: str):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.password_hash = password_hash
+        self.now = datetime(2024, 1, 1) if args.fixed_clock else datetime.utcnow()
+
+        self.first_category = next_id(Category)
+        self.first_product = next_id(Product)
+        self.first_user = next_id(User)
+        self.first_order = next_id(Order)
+        self.first_cart = next_id(Cart)
+
+        # Prices are needed for order lines; 8 bytes per product
+        self.prices = array("d")
+
+    # --------------------------------------------------
+    # Catalog
+    # --------------------------------------------------
+    def categories(self):
+        for number in range(self.args.categories):
+            yield {
+                "id": self.first_category + number,
+                "name": f"Category {self.first_category + number}",
+            }
+
+    def products(self):
+        rng = self.rng
+        for number in range(self.args.products):
+            product_id = self.first_product + number
+            price = round(rng.lognormvariate(3.5, 1.0), 2) or 0.99
+            self.prices.append(price)
+            yield {
+                "id": product_id,
+                # The id suffix keeps (name, category) unique
+                "name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id}",
+                "price": price,
+                "stock": rng.randint(0, 500),
+                "description": f"Synthetic product {product_id}",
+                "category_id": self.first_category + rng.randrange(self.args.categories),
+            }
+
+    # --------------------------------------------------
+    # Users
+    # --------------------------------------------------
+    def users(self):
+        rng = self.rng
+        for number in range(self.args.users):
+            user_id = self.first_user + number
+            yield {
+                "id": user_id,
+                "email": f"user{user_id}@example.com",
+                "first_name": rng.choice(FIRST_NAMES),
+                "password": self.password_hash,
+                "created_at": self.now - timedelta(days=rng.uniform(0, self.args.days)),
+            }
+
+    # --------------------------------------------------
+    # Orders, order items, payments
+    # --------------------------------------------------
+    def orders(self, product_sampler: ZipfSampler, user_sampler: ZipfSampler):
+        """Insert orders with their items and payments, chunk by chunk."""
+        rng = self.rng
+        counts = {"orders": 0, "order items": 0, "payments": 0}
+        order_id = self.first_order
+        remaining = self.args.orders
+
+        while remaining:
+            batch = min(remaining, self.args.chunk_size)
+            orders, items, payments = [], [], []
+
+            for _ in range(batch):
+                user_id = self.first_user + user_sampler.sample()
+                created_at = self.now - timedelta(days=rng.uniform(0, self.args.days))
+
+                lines = {}
+                for _ in range(rng.randint(1, 4)):
+                    product = product_sampler.sample()
+                    lines[product] = lines.get(product, 0) + rng.randint(1, 3)
+
+                total = 0.0
+                for product, quantity in lines.items():
+                    price = self.prices[product]
+                    total += price * quantity
+                    items.append({
+                        "order_id": order_id,
+                        "product_id": self.first_product + product,
+                        "quantity": quantity,
+                        "price": price,
+                    })
+
+                total = round(total, 2)
+                orders.append({
+                    "id": order_id,
+                    "user_id": user_id,
+                    "created_at": created_at,
+                    "total_amount": total,
+                })
+                payments.append({
+                    "user_id": user_id,
+                    "order_id": order_id,
+                    "amount": total,
+                    "status": "SUCCESS",
+                    "created_at": created_at,
+                })
+                order_id += 1
+
+            # Orders first: items and payments reference them
+            counts["orders"] += insert_chunks(Order.__table__, orders, self.args.chunk_size)
+            counts["order items"] += insert_chunks(OrderItem.__table__, items, self.args.chunk_size)
+            counts["payments"] += insert_chunks(Payment.__table__, payments, self.args.chunk_size)
+            remaining -= batch
+
+        return counts
+
+    # --------------------------------------------------
+    # Carts and cart items
+    # --------------------------------------------------
+    def carts(self, product_sampler: ZipfSampler):
+        """Insert carts (at most one per user) with their items and item_count."""
+        rng = self.rng
+        owners = rng.sample(range(self.args.users), min(self.args.carts, self.args.users))
+        counts = {"carts": 0, "cart items": 0}
+
+        for start in range(0, len(owners), self.args.chunk_size):
+            carts, items = [], []
+            for offset, owner in enumerate(owners[start:start + self.args.chunk_size]):
+                cart_id = self.first_cart + start + offset
+
+                lines = {}
+                for _ in range(rng.randint(1, 5)):
+                    product = product_sampler.sample()
+                    lines[product] = lines.get(product, 0) + rng.randint(1, 2)
+
+                carts.append({
+                    "id": cart_id,
+                    "user_id": self.first_user + owner,
+                    "item_count": sum(lines.values()),
+                })
+                items.extend(
+                    {"cart_id": cart_id, "product_id": self.first_product + product, "quantity": quantity}
+                    for product, quantity in lines.items()
+                )
+
+            counts["carts"] += insert_chunks(Cart.__table__, carts, self.args.chunk_size)
+            counts["cart items"] += insert_chunks(CartItem.__table__, items, self.args.chunk_size)
+
+        return counts
+
+    # --------------------------------------------------
+    # Whole run
+    # --------------------------------------------------
+    def run(self):
+        args = self.args
+        chunk = args.chunk_size
+
+        timed("categories", lambda: {"categories": insert_chunks(Category.__table__, self.categories(), chunk)})
+        timed("products", lambda: {"products": insert_chunks(Product.__table__, self.products(), chunk)})
+        timed("users", lambda: {"users": insert_chunks(User.__table__, self.users(), chunk)})
+
+        if not (args.products and args.users):
+            return
+
+        # Separate generators: the samplers' shuffles must not depend on each other
+        product_sampler = ZipfSampler(args.products, args.zipf, random.Random(args.seed + 1))
+        user_sampler = ZipfSampler(args.users, args.zipf, random.Random(args.seed + 2))
+
+        if args.orders:
+            timed("orders", lambda: self.orders(product_sampler, user_sampler))
+        if args.carts:
+            timed("carts", lambda: self.carts(product_sampler))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (default: the app's configured database)")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same data)")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--carts", type=int, default=5_000)
+    parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many past days")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent for product and user skew")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Rows per bulk INSERT")
+    parser.add_argument("--password", default="password", help="Password shared by all generated users")
+    parser.add_argument("--fixed-clock", action="store_true",
+                        help="Date rows relative to 2024-01-01 instead of now (fully reproducible)")
+    args = parser.parse_args()
+
+    if args.categories < 1 and args.products:
+        parser.error("--products needs at least one category")
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database_url} if args.database_url else None)
+
+    with app.app_context():
+        tune_for_bulk_load(db.engine)
+
+        if args.reset:
+            db.drop_all()
+            db.create_all()
+
+        # Hash once, at the app's configured work factor
+        password_hash = generate_password_hash(args.password, method=app.config["PASSWORD_HASH_METHOD"])
+
+        started = time.perf_counter()
+        Generator(args, password_hash).run()
+        db.session.remove()
+
+        # Everything cached about the catalog is stale now
+        cache.clear()
+        print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
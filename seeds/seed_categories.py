@@ -1,5 +1,6 @@
 from website import db
 from website.models import Category
+from website.services.catalog_service import CatalogService
 
 def seed_categories():
     # Delete existing categories
@@ -23,4 +24,7 @@ def seed_categories():
         db.session.add(category)
 
     db.session.commit()
+
+    # Cached category list / filter menus are stale now
+    CatalogService.bump_categories_version()
     print("Seeded categories successfully!")
@@ -0,0 +1,42 @@
+"""
+test_checkout_queries.py
+------------------------
+Checkout costs a CONSTANT number of SQL round trips, whatever the number
+of cart lines: EXPECTED_STATEMENTS statements and a single COMMIT.
+
+A change that adds a query per cart line (lazy loads, one UPDATE per
+product, ...) or a second commit fails here. When a deliberate change
+moves the constant, update EXPECTED_STATEMENTS with it.
+
+Same measurement as python -m benchmarks.checkout_queries.
+"""
+
+import pytest
+
+from website import db
+from website.models import Category
+
+from benchmarks.checkout_queries import checkout_round_trips
+from benchmarks.common import create_bench_app
+
+# user load (Flask-Login), cart + lines SELECT, stock UPDATE, order /
+# order lines / payment INSERTs, cart_item DELETE, item_count UPDATE,
+# confirmation + rollup catch-up job INSERTs
+EXPECTED_STATEMENTS = 10
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = create_bench_app()
+    with app.app_context():
+        db.session.add(Category(name="Bench"))
+        db.session.commit()
+    return app
+
+
+@pytest.mark.parametrize("lines", [1, 5, 25, 100])
+def test_checkout_round_trips_are_constant(app, lines):
+    counts = checkout_round_trips(app, lines, buyer=lines)
+
+    assert counts["statements"] == EXPECTED_STATEMENTS
+    assert counts["commits"] == 1
@@ -2,18 +2,34 @@
 from flask import Flask
 
 # SQLAlchemy is the ORM used to interact with the database
-from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
 
 # Flask-Login handles user authentication (login, logout, sessions)
 from flask_login import LoginManager, current_user
 
-# Used to safely encode special characters in the database password
-from urllib.parse import quote_plus
-
 from .config import config_map
 from .logger import setup_logger
+
+# Two-tier cache (in-process LRU + shared backend), see cache.py
 from .cache import cache
+
+# Per-request SQL counters, Server-Timing header, N+1 detector
+from .instrumentation import sql_instrumentation
+
+# Session class sending read-only routes to the replica bind, see routing.py
+from .routing import RoutingSession, replica_router
+
+# Vary / Cache-Control headers per blueprint, see conditional.py
+from .conditional import cache_policies
+
+# Fingerprinted, precompressed static files (asset_url), see assets.py
+from .assets import asset_pipeline
+
+# {% cache %} template fragments, see fragment_cache.py
+from .fragment_cache import fragment_cache
+
+# Startup phase timer, Jinja bytecode cache, lazy `flask db`, see startup.py
+from .startup import StartupProfile, migrate_cli, setup_templates, templates_cli
 import os
  
 
@@ -22,15 +38,22 @@ import os
 # Create the database object at MODULE LEVEL
 # This allows models to import and use `db`
 # --------------------------------------------------
-db = SQLAlchemy()
-cache = Cache()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
-def create_app():
+def create_app(test_config=None):
     """
     Application factory function.
     This function creates and configures the Flask app instance.
+
+    test_config (dict, optional) overrides any setting below,
+    e.g. a local SQLite database for benchmarks.
+
+    Time spent per phase: app.extensions["startup_profile"]
+    (python run.py --profile-startup).
     """
+    profile = StartupProfile()
+    phase = profile.phase
 
     # Create Flask app instance
     app = Flask(
@@ -43,85 +66,137 @@ def create_app():
     # Load environment-based configuration
     # ---
 
-    env= os.getenv("FLASK_ENV","development")
-    app.config.from_object(config_map[env])
+    with phase("config"):
+        env= os.getenv("FLASK_ENV","development")
+        app.config.from_object(config_map[env])
    
 
-    # --------------------------------------------------
-    # Application configuration
-    # --------------------------------------------------
-
-    # Secret key is used for sessions, cookies, CSRF protection
-    app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "fallback-secret-key")
-    app.config["CACHE_TYPE"] = "SimpleCache"
-    app.config["CACHE_DEFAULT_TIMEOUT"] = 300
-
-    db_user = os.getenv("DB_USER", "root")
-    db_password = quote_plus(os.getenv("DB_PASSWORD", ""))
-    db_host = os.getenv("DB_HOST", "localhost")
-    db_name = os.getenv("DB_NAME", "ecommerce")
-    app.config["SQLALCHEMY_DATABASE_URI"] = (
-        f"mysql+pymysql://{db_user}:{db_password}@{db_host}/{db_name}"
-    )
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-    db.init_app(app)
-    cache.init_app(app)
-    
+        # Explicit overrides (benchmarks / local runs)
+        if test_config:
+            app.config.update(test_config)
 
     #----
-    # Setup Logging
+    # Setup Logging (first: its access log hook must run last)
     #----
 
-    setup_logger(app)
+    with phase("logging"):
+        setup_logger(app)
+
+    with phase("extensions"):
+        db.init_app(app)
+        cache.init_app(app)
+        sql_instrumentation.init_app(app, db)
+        replica_router.init_app(app, db)
+        cache_policies.init_app(app)
+        asset_pipeline.init_app(app)
+        fragment_cache.init_app(app)
 
     # --------------------------------------------------
     # Import models AFTER initializing db
     # This avoids circular import problems
     # --------------------------------------------------
-    from . import models
+    with phase("models"):
+        from . import models
+
+    # Durable background jobs (side work after checkout), see jobs.py
+    # Imported here: jobs.py uses the models, which need `db`
+    with phase("jobs"):
+        from .jobs import job_queue
+        job_queue.init_app(app)
+
+        # Job handlers (registered by import)
+        from . import tasks
 
 
     # --------------------------------------------------
     # Register Blueprints (modular route groups)
     # --------------------------------------------------
-    from .views import views     # main website routes
-    from .auth import auth       # authentication routes
-    from .cart import cart_bp,orders_bp    # shopping cart routes
+    with phase("blueprints"):
+        from .views import views     # main website routes
+        from .auth import auth       # authentication routes
+        from .cart import cart_bp,orders_bp    # shopping cart routes
+        from .exports import exports_bp        # finance CSV / NDJSON exports
+        from .reports import reports_bp        # sales reports (rollup tables)
      
 
-    app.register_blueprint(views)
-    app.register_blueprint(auth, url_prefix="/auth")
-    app.register_blueprint(cart_bp)
-    app.register_blueprint(orders_bp, url_prefix="/orders")
+        app.register_blueprint(views)
+        app.register_blueprint(auth, url_prefix="/auth")
+        app.register_blueprint(cart_bp)
+        app.register_blueprint(orders_bp, url_prefix="/orders")
+        app.register_blueprint(exports_bp, url_prefix="/exports")
+        app.register_blueprint(reports_bp, url_prefix="/reports")
+
+
+    # --------------------------------------------------
+    # CLI commands (flask --app run <command>)
+    # `flask db` (migrations) imports Flask-Migrate only when it runs
+    # --------------------------------------------------
+    with phase("cli"):
+        from .services.catalog_snapshot import build_catalog_snapshot_command
+        from .services.export_service import export_command
+        from .services.rollup_service import rollups_cli
+        from .jobs import jobs_cli
+        from .assets import assets_cli
+
+        app.cli.add_command(build_catalog_snapshot_command)
+        app.cli.add_command(export_command)
+        app.cli.add_command(rollups_cli)
+        app.cli.add_command(jobs_cli)
+        app.cli.add_command(assets_cli)
+        app.cli.add_command(migrate_cli)
+        app.cli.add_command(templates_cli)
 
 
     # --------------------------------------------------
     # Setup Flask-Login
     # --------------------------------------------------
-    login_manager = LoginManager()
-    # If a user tries to access a protected page,
-    # they will be redirected to this login route
-    login_manager.login_view = "auth.login"
-    # Attach login manager to the app
-    login_manager.init_app(app)
+    with phase("login"):
+        login_manager = LoginManager()
+        # If a user tries to access a protected page,
+        # they will be redirected to this login route
+        login_manager.login_view = "auth.login"
+        # Attach login manager to the app
+        login_manager.init_app(app)
 
-    # Import User model for login handling
-    from .models import User
+        # Cached user identity (UserSnapshot) for login handling
+        from .services.user_service import UserService
 
     @login_manager.user_loader
     def load_user(user_id):
         """
         This function tells Flask-Login how to get a user
-        from the database using the user ID stored in session.
+        from the user ID stored in session.
+
+        Returns a cached UserSnapshot (id, email, first_name), so
+        authenticated requests normally make no database query.
         """
-        return User.query.get(int(user_id))
+        return UserService.load_user(int(user_id))
 
     # --------------------------------------------------
     # Create database tables (only if they don't exist)
+    # Development only (DB_CREATE_ALL): create_all inspects every table
+    # on every boot; production runs `flask db upgrade` at deploy time
     # --------------------------------------------------
-    with app.app_context():
-        db.create_all()
+    if app.config["DB_CREATE_ALL"]:
+        with phase("create_all"), app.app_context():
+            db.create_all()
+
+    # Jinja bytecode cache / precompiled templates, see startup.py
+    with phase("templates"):
+        setup_templates(app)
+
+    # Search index built before serving (preloaded master), else in the
+    # background after the first search, see services/search_index.py
+    if app.config["SEARCH_WARM_ON_START"]:
+        from .services.search_index import SearchIndexService
+        with phase("search_index"), app.app_context():
+            SearchIndexService.warm()
+
+    # Same for the search box suggestions, see services/suggest_index.py
+    if app.config["SUGGEST_WARM_ON_START"]:
+        from .services.suggest_index import SuggestIndexService
+        with phase("suggest_index"), app.app_context():
+            SuggestIndexService.warm()
 
     # --------------------------------------------------
     # Context processor (runs before every template render)
@@ -131,24 +206,18 @@ def create_app():
     def inject_cart_count():
         # Import here to avoid circular import issues
         #Run this function before rendering any template, and add whatever it returns to the template context.”
-        from .models import Cart
+        from .services.cart_service import CartService
 
+        # For guest users
         if not current_user.is_authenticated:
              return {"cart_count":0}
-        
-        cache_key= f"cart_count_{current_user.id}"
-        count = cache.get(cache_key)
 
-        # Only check cart if user is logged in
-        if count is None:
-            cart  = Cart.query.filter_by(user_id=current_user.id).first()
-            count = cart.total_items() if cart else 0
-            cache.set(cache_key,count,timeout=30)
-            return {"cart_count": count}
+        # Maintained Cart.item_count, cached per user and invalidated by
+        # every cart mutation: usually no query, at most one indexed lookup
+        return {"cart_count": CartService.get_item_count(current_user.id)}
 
-        # For guest users
-        return {"cart_count": 0}
 
+    app.extensions["startup_profile"] = profile
 
     # Return the fully configured app
     return app
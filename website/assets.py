@@ -0,0 +1,206 @@
+"""
+assets.py
+---------
+Fingerprinted, precompressed static assets.
+
+Build (once per deploy, after changing anything in website/static/):
+    flask --app run assets build [--prune]
+
+- copies every file of website/static/ to website/static/dist/ under a
+  content-hashed name: css/base.css → css/base.3f2a9c41d07e.css
+  (earlier builds are kept for pages and workers still using them;
+  --prune deletes them)
+- writes .gz (and .br, when the `brotli` package is installed) next to
+  each text file, when smaller
+- writes dist/manifest.json: logical name → fingerprinted name
+
+Templates:
+    {{ asset_url('css/base.css') }}    (same argument as url_for('static', filename=...))
+gives /assets/css/base.3f2a9c41d07e.css when the manifest lists the file,
+else the plain static URL (no build in development: nothing changes).
+
+Serving (/assets/<name>):
+- the name changes whenever the content does, so a URL never goes stale:
+  Cache-Control: public, max-age=1 year, immutable. Repeat page loads
+  take the files from the browser cache without asking (no request,
+  not even a 304)
+- the .br / .gz variant is sent when the browser accepts it
+  (Accept-Encoding), with Vary: Accept-Encoding; nothing is compressed
+  per request
+A front proxy (nginx: gzip_static / brotli_static) can serve
+static/dist/ directly with the same headers.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+import click
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz variants without it
+    brotli = None
+
+DIST = "dist"
+MANIFEST = "manifest.json"
+
+# Worth compressing (images and fonts are compressed already)
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map")
+
+# Far-future caching for fingerprinted files
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Content-Encoding → file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def fingerprint(path: str, digest: str) -> str:
+    """css/base.css + digest → css/base.<digest>.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+def build(static_folder: str, prune: bool = False) -> dict:
+    """
+    Write the fingerprinted and precompressed copies of static_folder's
+    files to static_folder/dist, then the manifest.
+
+    Files of earlier builds are kept unless prune: workers still running
+    the previous manifest, and pages already in browsers, keep working
+    during a deploy.
+
+    Args:
+        static_folder (str): The app's static folder
+        prune (bool): Delete dist files the new manifest does not use
+
+    Returns:
+        dict: Logical name → fingerprinted name
+    """
+    dist = os.path.join(static_folder, DIST)
+
+    manifest = {}
+    for directory, subdirectories, files in os.walk(static_folder):
+        # Never fingerprint build output
+        subdirectories[:] = sorted(
+            name for name in subdirectories if os.path.join(directory, name) != dist
+        )
+        for name in sorted(files):
+            source = os.path.join(directory, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as handle:
+                content = handle.read()
+
+            target = fingerprint(logical, hashlib.sha256(content).hexdigest()[:12])
+            manifest[logical] = target
+            output = os.path.join(dist, target)
+            if os.path.exists(output):
+                continue  # same content already built
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+
+            variants = [("", content)]
+            if logical.endswith(COMPRESSIBLE):
+                # mtime=0: identical input → identical .gz (reproducible builds)
+                variants.append((".gz", gzip.compress(content, compresslevel=9, mtime=0)))
+                if brotli is not None:
+                    variants.append((".br", brotli.compress(content, quality=11)))
+            # Original last: its presence marks a complete build of the file
+            for suffix, data in reversed(variants):
+                if suffix and len(data) >= len(content):
+                    continue
+                with open(output + suffix, "wb") as handle:
+                    handle.write(data)
+
+    # Swap the manifest in atomically
+    staging = os.path.join(dist, MANIFEST + ".tmp")
+    with open(staging, "w") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(staging, os.path.join(dist, MANIFEST))
+
+    if prune:
+        keep = {MANIFEST} | {
+            target + suffix for target in manifest.values() for suffix in ("", ".gz", ".br")
+        }
+        for directory, _, files in os.walk(dist):
+            for name in files:
+                path = os.path.join(directory, name)
+                if os.path.relpath(path, dist).replace(os.sep, "/") not in keep:
+                    os.remove(path)
+    return manifest
+
+
+class Assets:
+    """Loads the manifest and serves the fingerprinted files (one instance per app)."""
+
+    def init_app(self, app) -> None:
+        dist = os.path.join(app.static_folder, DIST)
+        manifest = {}
+        if os.path.exists(os.path.join(dist, MANIFEST)):
+            with open(os.path.join(dist, MANIFEST)) as handle:
+                manifest = json.load(handle)
+        app.extensions["assets"] = manifest
+
+        def asset_url(filename: str) -> str:
+            """Fingerprinted URL of a static file (plain static URL when not built)."""
+            built = current_app.extensions["assets"].get(filename)
+            if built is None:
+                return url_for("static", filename=filename)
+            return url_for("assets.asset", filename=built)
+
+        app.add_template_global(asset_url)
+        app.register_blueprint(assets_bp, url_prefix="/assets")
+
+
+# ==================================================
+# SERVING
+# ==================================================
+assets_bp = Blueprint("assets", __name__)
+
+
+@assets_bp.route("/<path:filename>")
+def asset(filename: str):
+    """A fingerprinted file, precompressed variant when accepted."""
+    if filename == MANIFEST or filename.endswith((".gz", ".br")):
+        abort(404)
+    dist = os.path.join(current_app.static_folder, DIST)
+
+    sent, encoding = filename, None
+    for name, suffix in ENCODINGS:
+        if name in request.accept_encodings and os.path.exists(os.path.join(dist, filename + suffix)):
+            sent, encoding = filename + suffix, name
+            break
+
+    response = send_from_directory(
+        dist, sent,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        max_age=31536000,
+    )
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+# Single instance used across the app
+asset_pipeline = Assets()
+
+
+# ==================================================
+# CLI: flask --app run assets build
+# ==================================================
+assets_cli = AppGroup("assets", help="Build fingerprinted static assets.")
+
+
+@assets_cli.command("build")
+@click.option("--prune", is_flag=True, help="Delete files of earlier builds.")
+def build_command(prune):
+    """Fingerprint and precompress website/static/ into website/static/dist/."""
+    manifest = build(current_app.static_folder, prune=prune)
+    if brotli is None:
+        click.echo("brotli not installed: .gz variants only (pip install brotli)")
+    click.echo(f"Built {len(manifest)} assets into {os.path.join(current_app.static_folder, DIST)}")
@@ -13,10 +13,11 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 # ----------------------------------------------------
 # Password utilities
 # ----------------------------------------------------
-# generate_password_hash → Converts plain password into a secure hash
-# check_password_hash   → Compares plain password with stored hash
+# PasswordService.hash_password   → Converts plain password into a secure hash
+# PasswordService.verify_password → Compares plain password with stored hash
+# Both run in a bounded process pool, off the request thread.
 # NEVER store plain passwords in the database!
-from werkzeug.security import generate_password_hash, check_password_hash
+from .services.password_service import PasswordService, PasswordPoolSaturated
 
 
 # ----------------------------------------------------
@@ -48,6 +49,21 @@ from . import db
 auth = Blueprint("auth", __name__)
 
 
+# ====================================================
+# HASHING POOL SATURATED
+# ====================================================
+# During a login storm the hashing pool refuses new work instead of
+# letting requests queue up behind it: answer fast with a 503 and ask
+# the client to retry shortly
+@auth.errorhandler(PasswordPoolSaturated)
+def hashing_pool_saturated(error):
+    return (
+        "Too many sign-in attempts right now, please retry in a moment.",
+        503,
+        {"Retry-After": "1"}
+    )
+
+
 # ====================================================
 # LOGIN ROUTE
 # ====================================================
@@ -73,7 +89,17 @@ def login():
         # Check:
         # 1. User exists
         # 2. Entered password matches the hashed password in DB
-        if user and check_password_hash(user.password, password):
+        if user and PasswordService.verify_password(user.password, password):
+
+            # Hash weaker than the configured one (e.g. fewer iterations):
+            # upgrade it now that we know the plain password.
+            # Best effort - a busy pool must not fail a valid login.
+            if PasswordService.needs_rehash(user.password):
+                try:
+                    user.password = PasswordService.hash_password(password)
+                    db.session.commit()
+                except PasswordPoolSaturated:
+                    pass
 
             # login_user():
             # - Saves user ID in Flask session
@@ -115,7 +141,7 @@ def sign_up():
 
             # Password is HASHED before storing
             # This protects users even if DB is compromised
-            password=generate_password_hash(
+            password=PasswordService.hash_password(
                 request.form.get("password")
             )
         )
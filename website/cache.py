@@ -1,11 +1,364 @@
 """
 cache.py
 --------
-Flask-Caching configuration.
+Two-tier cache shared by the whole application.
+
+    L1  bounded in-process LRU   (per worker, no I/O, short TTL)
+    L2  pluggable shared backend (Redis-protocol server, filesystem, in-memory)
+
+Why two tiers:
+- L1 answers hot keys (catalog pages, categories) without any I/O
+- L2 is shared by every gunicorn worker, so a value loaded by one worker
+  is reused by all of them, and invalidations are seen everywhere
+
+Why single-flight:
+- When a hot key expires, every concurrent request would miss at once
+  and stampede MySQL. get_or_load() lets ONE caller run the loader
+  while the others wait for its result (per process), and an L2 lock
+  coalesces the loaders of different workers too
+
+Configuration (see config.py):
+    CACHE_L2_TYPE          "simple" (per-process, dev), "filesystem", "redis", "null"
+    CACHE_DIR              directory for the filesystem backend
+    CACHE_REDIS_URL        redis://host:port/db (any Redis-protocol server)
+    CACHE_L1_MAX_ITEMS     LRU capacity per worker
+    CACHE_L1_TIMEOUT       max seconds a value lives in L1 (bounds cross-worker staleness)
+    CACHE_DEFAULT_TIMEOUT  default TTL in seconds (0 = never expires)
+    CACHE_KEY_PREFIX       namespace for L2 keys
+
+Values handed out from L1 are shared objects: treat them as read-only.
 """
 
-#Your cart count query runs on every page load
+import threading
+import time
+from collections import OrderedDict
+
+from cachelib import FileSystemCache, NullCache, RedisCache, SimpleCache
+from flask import current_app
+
+
+class LRUCache:
+    """Bounded, thread-safe, in-process LRU with per-entry expiry (the L1 tier)."""
+
+    def __init__(self, max_items: int = 10000):
+        self.max_items = max_items
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight:
+    """One in-progress load that other callers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+class _CacheState:
+    """Per-app tiers and counters (stored in app.extensions)."""
+
+    def __init__(self, l1: LRUCache, l2, config: dict):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_timeout = config["CACHE_L1_TIMEOUT"]
+        self.default_timeout = config["CACHE_DEFAULT_TIMEOUT"]
+        self.shared = config["CACHE_L2_TYPE"] in ("filesystem", "redis")
+        self.lock_timeout = config.get("CACHE_LOCK_TIMEOUT", 10)
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            "l2_hits": 0,
+            "l2_misses": 0,
+            "loader_calls": 0,
+            "coalesced": 0,
+        }
+        self.flights = {}
+        self.flights_lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self.stats_lock:
+            self.stats[name] += 1
+
+
+def _build_l2(config: dict):
+    """Create the shared (L2) backend from config."""
+    kind = config["CACHE_L2_TYPE"]
+    timeout = config["CACHE_DEFAULT_TIMEOUT"]
+    prefix = config["CACHE_KEY_PREFIX"]
+
+    if kind == "simple":
+        return SimpleCache(threshold=config["CACHE_L1_MAX_ITEMS"], default_timeout=timeout)
+    if kind == "filesystem":
+        return FileSystemCache(
+            config["CACHE_DIR"],
+            threshold=config.get("CACHE_THRESHOLD", 0),
+            default_timeout=timeout
+        )
+    if kind == "redis":
+        # Optional dependency: only needed when a Redis-protocol server is used
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_L2_TYPE='redis' requires the 'redis' package") from exc
+        client = redis.Redis.from_url(config["CACHE_REDIS_URL"])
+        return RedisCache(host=client, default_timeout=timeout, key_prefix=prefix)
+    if kind == "null":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_L2_TYPE: {kind!r}")
+
+
+class TwoTierCache:
+    """
+    Flask extension exposing the L1 + L2 cache.
+
+    Same basic API as Flask-Caching (get / set / add / delete), plus:
+    - get_or_load(): single-flight read-through
+    - local=False: keep a key out of L1 (for values that must be fresh in
+      every worker right after an invalidation, e.g. version stamps)
+    - stats(): per-tier hit / miss / eviction counters
+    """
+
+    def init_app(self, app) -> None:
+        config = {
+            "CACHE_L2_TYPE": "simple",
+            "CACHE_DIR": "instance/cache",
+            "CACHE_REDIS_URL": "redis://localhost:6379/0",
+            "CACHE_L1_MAX_ITEMS": 10000,
+            "CACHE_L1_TIMEOUT": 30,
+            "CACHE_DEFAULT_TIMEOUT": 300,
+            "CACHE_KEY_PREFIX": "ecommerce:",
+        }
+        config.update({key: app.config[key] for key in config if key in app.config})
+
+        app.extensions["two_tier_cache"] = _CacheState(
+            LRUCache(config["CACHE_L1_MAX_ITEMS"]),
+            _build_l2(config),
+            config
+        )
+
+    @property
+    def _state(self) -> _CacheState:
+        return current_app.extensions["two_tier_cache"]
+
+    # --------------------------------------------------
+    # Basic operations
+    # --------------------------------------------------
+    def get(self, key, local: bool = True):
+        """
+        Return the cached value, or None on a miss.
+
+        Args:
+            key (str): Cache key
+            local (bool): Look in (and promote L2 hits into) this worker's L1;
+                pass False for keys that are stored with local=False
+
+        Returns:
+            The value or None
+        """
+        state = self._state
+        if local:
+            value = state.l1.get(key)
+            if value is not None:
+                return value
+
+        value = state.l2.get(key)
+        if value is None:
+            state.count("l2_misses")
+            return None
+
+        state.count("l2_hits")
+        if local:
+            state.l1.set(key, value, state.l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=None, local: bool = True) -> None:
+        """
+        Store a value in both tiers.
+
+        Args:
+            key (str): Cache key
+            value: Any picklable value (None cannot be cached)
+            timeout (int, optional): TTL in seconds, 0 = never expires
+            local (bool): Also keep it in this worker's L1
+        """
+        state = self._state
+        timeout = state.default_timeout if timeout is None else timeout
+        state.l2.set(key, value, timeout=timeout)
+        if local:
+            state.l1.set(key, value, self._l1_ttl(state, timeout))
+        else:
+            state.l1.delete(key)
+
+    def add(self, key, value, timeout=None) -> bool:
+        """Store a value only if the key is absent in L2. Never cached in L1."""
+        state = self._state
+        timeout = state.default_timeout if timeout is None else timeout
+        return bool(state.l2.add(key, value, timeout=timeout))
+
+    def delete(self, key) -> None:
+        """Remove a key from L2 and from this worker's L1."""
+        state = self._state
+        state.l1.delete(key)
+        state.l2.delete(key)
+
+    def clear(self) -> None:
+        state = self._state
+        state.l1.clear()
+        state.l2.clear()
+
+    # --------------------------------------------------
+    # Read-through with single-flight miss handling
+    # --------------------------------------------------
+    def get_or_load(self, key, loader, timeout=None, local: bool = True):
+        """
+        Return the cached value, calling `loader()` at most once per key
+        across concurrent callers when it is missing.
+
+        Args:
+            key (str): Cache key
+            loader (callable): Produces the value on a miss (must not return None)
+            timeout (int, optional): TTL in seconds
+            local (bool): Also keep it in this worker's L1
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        value = self.get(key, local=local)
+        if value is not None:
+            return value
+
+        state = self._state
+
+        # In-process: the first caller becomes the leader, others wait for it
+        with state.flights_lock:
+            flight = state.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                state.flights[key] = flight
+
+        if not leader:
+            state.count("coalesced")
+            flight.event.wait(state.lock_timeout)
+            if flight.event.is_set() and not flight.failed:
+                return flight.value
+            # Leader failed or is too slow: load on our own
+            return self._load(state, key, loader, timeout, local)
+
+        try:
+            flight.value = self._load_shared(state, key, loader, timeout, local)
+            return flight.value
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with state.flights_lock:
+                state.flights.pop(key, None)
+            flight.event.set()
+
+    def stats(self) -> dict:
+        """
+        Return per-tier counters for this process.
+
+        Returns:
+            dict: l1 (hits, misses, evictions, size), l2 (hits, misses),
+            loader_calls and coalesced waits
+        """
+        state = self._state
+        with state.stats_lock:
+            counters = dict(state.stats)
+        return {
+            "l1": dict(state.l1.stats, size=len(state.l1)),
+            "l2": {"hits": counters["l2_hits"], "misses": counters["l2_misses"]},
+            "loader_calls": counters["loader_calls"],
+            "coalesced": counters["coalesced"],
+        }
+
+    # --------------------------------------------------
+    # Internal helpers
+    # --------------------------------------------------
+    @staticmethod
+    def _l1_ttl(state: _CacheState, timeout) -> float:
+        if not timeout:
+            return state.l1_timeout
+        return min(timeout, state.l1_timeout)
+
+    def _load(self, state, key, loader, timeout, local):
+        state.count("loader_calls")
+        value = loader()
+        if value is not None:
+            self.set(key, value, timeout, local=local)
+        return value
+
+    def _load_shared(self, state, key, loader, timeout, local):
+        """
+        Leader path. With a shared L2, take a short L2 lock so that only one
+        worker runs the loader; the others poll L2 for its result.
+        """
+        # Another thread may have filled the key while we became leader
+        value = self.get(key, local=local)
+        if value is not None:
+            return value
+
+        if not state.shared:
+            return self._load(state, key, loader, timeout, local)
+
+        lock_key = f"lock:{key}"
+        if state.l2.add(lock_key, 1, timeout=state.lock_timeout):
+            try:
+                return self._load(state, key, loader, timeout, local)
+            finally:
+                state.l2.delete(lock_key)
+
+        # Another worker is loading: wait for its value, then give up and load
+        deadline = time.monotonic() + state.lock_timeout
+        delay = 0.005
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            value = state.l2.get(key)
+            if value is not None:
+                state.count("coalesced")
+                if local:
+                    state.l1.set(key, value, self._l1_ttl(state, timeout))
+                return value
+            if not state.l2.has(lock_key):
+                break
+        return self._load(state, key, loader, timeout, local)
 
-from flask_caching import Cache
 
-cache = Cache(config={"CACHE_TYPE": "SimpleCache"})
\ No newline at end of file
+# Single cache instance used across the app
+cache = TwoTierCache()
@@ -2,14 +2,17 @@
 # IMPORTS
 # ==================================================
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from sqlalchemy.orm import joinedload
 
-from website.services.payment_service import PaymentService
-from .models import Cart, CartItem, Order, OrderItem, Product
+from website.conditional import conditional
+from website.routing import use_replica
+from website.services.cart_service import CartService
+from website.services.catalog_service import CatalogService
+from .models import Cart, CartItem, Product
 from . import db
-from website.services.order_service import OrderService
+from website.services.order_service import InsufficientStockError, OrderService
 
 # ==================================================
 # BLUEPRINTS
@@ -17,12 +20,18 @@ from website.services.order_service import OrderService
 cart_bp = Blueprint("cart", __name__)
 orders_bp = Blueprint("orders", __name__)
 
+# Orders shown per page in order history
+ORDERS_PER_PAGE = 10
+
+# Most cart lines one bulk update may change
+MAX_BULK_LINES = 100
+
 # ==================================================
 # HELPER FUNCTIONS
 # ==================================================
 def get_user_cart():
     """Fetch or create a cart for the current user."""
-    cart = current_user.cart
+    cart = Cart.query.filter_by(user_id=current_user.id).first()
     if not cart:
         cart = Cart(user_id=current_user.id)
         db.session.add(cart)
@@ -51,7 +60,8 @@ def view_cart():
         flash("Your cart is empty", "info")
         return render_template("cart.html", items=[], total=0)
 
-    total = OrderService.calculate_cart_total(cart)
+    # Total from the lines loaded above (no second load of cart.items)
+    total = OrderService.calculate_cart_total(cart, items)
     return render_template("cart.html", items=items, total=total)
 
 # ==================================================
@@ -68,20 +78,14 @@ def add_to_cart(product_id: int):
 
     cart = get_user_cart()
 
-    # Check if product already exists in cart
-    cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product.id).first()
-    if cart_item:
-        if cart_item.quantity >= product.stock:
-            flash("No more stock available", "warning")
-        else:
-            cart_item.quantity += 1
-            flash(f"{product.name} quantity updated in cart", "success")
-    else:
-        cart_item = CartItem(cart_id=cart.id, product_id=product.id, quantity=1)
-        db.session.add(cart_item)
+    # +1 on the existing line (within stock) or a new line, atomically
+    if CartService.add_unit(cart.id, product.id):
         flash(f"{product.name} added to cart", "success")
+    else:
+        flash("No more stock available", "warning")
 
     db.session.commit()
+    CartService.invalidate_item_count(current_user.id)
     return redirect(url_for("cart.view_cart"))
 
 # ==================================================
@@ -97,8 +101,9 @@ def remove_from_cart(item_id: int):
         return redirect(url_for("cart.view_cart"))
 
     product_name = cart_item.product.name
-    db.session.delete(cart_item)
+    CartService.remove_line(cart_item.cart_id, cart_item.id)
     db.session.commit()
+    CartService.invalidate_item_count(current_user.id)
 
     flash(f"{product_name} removed from cart", "info")
     return redirect(url_for("cart.view_cart"))
@@ -109,18 +114,19 @@ def remove_from_cart(item_id: int):
 def update_cart_item_quantity(item_id: int, increment: bool = True):
     """Increase or decrease quantity of a cart item."""
     item = CartItem.query.get_or_404(item_id)
+
+    if item.cart.user_id != current_user.id:
+        flash("Unauthorized action", "error")
+        return redirect(url_for("cart.view_cart"))
+
+    # Conditional UPDATE / DELETE: concurrent clicks cannot double-count
     if increment:
-        if item.quantity < item.product.stock:
-            item.quantity += 1
+        CartService.increment_line(item.cart_id, item.id)
     else:
-        if item.quantity > 1:
-            item.quantity -= 1
-        else:
-            db.session.delete(item)
-            db.session.commit()
-            return redirect(url_for("cart.view_cart"))
+        CartService.decrement_line(item.cart_id, item.id)
 
     db.session.commit()
+    CartService.invalidate_item_count(current_user.id)
     return redirect(url_for("cart.view_cart"))
 
 @cart_bp.route("/cart/increase/<int:item_id>", methods=["POST"])
@@ -133,6 +139,93 @@ def increase_quantity(item_id: int):
 def decrease_quantity(item_id: int):
     return update_cart_item_quantity(item_id, increment=False)
 
+# ==================================================
+# BULK UPDATE (several lines, one request)
+# ==================================================
+def parse_bulk_quantities() -> dict:
+    """
+    CartItem ID → new quantity from the request, 400 when invalid.
+
+    JSON:  {"quantities": {"12": 3, "15": 0}}
+    Form:  quantity-12=3&quantity-15=0
+    """
+    if request.is_json:
+        body = request.get_json(silent=True)
+        raw = body.get("quantities") if isinstance(body, dict) else None
+        if not isinstance(raw, dict):
+            abort(400, description="expected {\"quantities\": {item_id: quantity}}")
+        pairs = raw.items()
+    else:
+        pairs = [
+            (name.removeprefix("quantity-"), value)
+            for name, value in request.form.items()
+            if name.startswith("quantity-")
+        ]
+
+    quantities = {}
+    for item_id, quantity in pairs:
+        try:
+            item_id, quantity = int(item_id), int(quantity)
+        except (TypeError, ValueError):
+            abort(400, description="item ids and quantities must be integers")
+        if quantity < 0:
+            abort(400, description="quantities must be >= 0")
+        quantities[item_id] = quantity
+
+    if len(quantities) > MAX_BULK_LINES:
+        abort(400, description=f"at most {MAX_BULK_LINES} lines per update")
+    return quantities
+
+
+@cart_bp.route("/cart/bulk", methods=["POST"])
+@login_required
+def bulk_update():
+    """
+    Apply several quantity changes / removals at once (0 removes a line).
+
+    One transaction and one stock query for all the lines
+    (CartService.set_quantities); no redirect. Responds with:
+    - a JSON cart summary to JSON clients (Accept, or a JSON body)
+    - the _cart_table.html fragment otherwise (the cart page's script,
+      plain form posts), for the page to swap in
+    """
+    quantities = parse_bulk_quantities()
+    cart = get_user_cart()
+
+    result = CartService.set_quantities(cart.id, quantities) if quantities else {"capped": [], "ignored": []}
+    CartService.invalidate_item_count(current_user.id)
+
+    items = get_cart_items(cart)
+    total = OrderService.calculate_cart_total(cart, items)
+
+    # The client's Accept decides; on a tie, answer in the request's format
+    offered = ["application/json", "text/html"] if request.is_json else ["text/html", "application/json"]
+    if request.accept_mimetypes.best_match(offered, default=offered[0]) == "application/json":
+        return jsonify({
+            "items": [
+                {
+                    "id": item.id,
+                    "product_id": item.product_id,
+                    "name": item.product.name,
+                    "quantity": item.quantity,
+                    "price": item.product.price,
+                    "line_total": round(item.product.price * item.quantity, 2),
+                }
+                for item in items
+            ],
+            "item_count": sum(item.quantity for item in items),
+            "total": round(total, 2),
+            "capped": result["capped"],
+            "ignored": result["ignored"],
+        })
+
+    names = {item.id: item.product.name for item in items}
+    notices = [
+        f"Only {line['quantity']} of {names.get(line['id'], 'this product')} in stock"
+        for line in result["capped"]
+    ]
+    return render_template("_cart_table.html", items=items, total=total, notices=notices)
+
 # ==================================================
 # CHECKOUT
 # ==================================================
@@ -143,6 +236,8 @@ def checkout():
     Handles checkout process:
     - GET: Display cart items and total
     - POST: Create order, process payment, and clear cart
+            (OrderService.checkout_cart, single transaction);
+            the confirmation and rollups run afterwards as background jobs
     """
 
     # Load user's cart and items
@@ -159,46 +254,37 @@ def checkout():
 
     if request.method == "POST":
         try:
-            # 1️⃣ Create Order
-            order = Order(user_id=current_user.id)
-            db.session.add(order)
-            db.session.flush()  # assign order.id
-
-            # 2️⃣ Move cart items to order items
-            for item in cart.items:
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=item.product.id,
-                    quantity=item.quantity,
-                    price=item.product.price
-                )
-                db.session.add(order_item)
-
-                # Reduce stock
-                if item.product.stock >= item.quantity:
-                    item.product.stock -= item.quantity
-                else:
-                    raise Exception(f"Insufficient stock for {item.product.name}")
-
-                # Remove from cart
-                db.session.delete(item)
-
-            # 3️⃣ Assign total amount
-            order.total_amount = grand_total
-            db.session.flush()
-
-            # 4️⃣ Process payment
-            payment = PaymentService.process_payment(user=current_user, amount=grand_total)
-
-            # Optionally, you can link payment to order if your Order model has a payment_id
-            # order.payment_id = payment.id
-
-            # 5️⃣ Commit all changes
-            db.session.commit()
+            # Categories whose cached listings show this stock
+            touched_categories = {item.product.category_id for item in cart.items}
+
+            # One transaction, one commit:
+            # reserve stock → order + lines → payment → clear cart
+            OrderService.checkout_cart(cart, current_user)
+
+            # Stock changed → invalidate cached listings for those categories
+            CatalogService.bump_catalog_version(touched_categories)
+
+            # Cart is empty now → drop the cached badge count
+            CartService.invalidate_item_count(current_user.id)
 
             flash("Your order has been placed successfully!", "success")
             return redirect(url_for("orders.order_history"))
 
+        except InsufficientStockError:
+            db.session.rollback()
+
+            # Reload current stock to tell the user which lines are short
+            short = [
+                item.product.name
+                for item in cart.items
+                if item.product.stock < item.quantity
+            ]
+            flash(
+                f"Checkout failed: Insufficient stock for {', '.join(short) or 'some items'}",
+                "error"
+            )
+            return redirect(url_for("cart.view_cart"))
+
         except Exception as e:
             db.session.rollback()
             flash(f"Checkout failed: {str(e)}", "error")
@@ -210,13 +296,30 @@ def checkout():
 # ==================================================
 # VIEW ORDER HISTORY
 # ==================================================
+def order_history_validator():
+    """ETag source of the order history: the user's newest order."""
+    latest = OrderService.latest_order(current_user.id)
+    return (latest[0] if latest else None,), (latest[1] if latest else None)
+
+
 @orders_bp.route("/orders")
 @login_required
+@use_replica
+@conditional(order_history_validator)
 def order_history():
-    orders = (
-        Order.query
-        .filter_by(user_id=current_user.id)
-        .order_by(Order.created_at.desc())
-        .all()
+    """
+    Shows the user's orders, newest first, ORDERS_PER_PAGE at a time.
+    ?cursor=... (from the "Older orders" link) continues after the last order shown.
+    Unchanged since the last visit (no new order) → empty 304 (@conditional).
+    """
+    orders, next_cursor = OrderService.get_order_history(
+        current_user.id,
+        cursor=request.args.get("cursor"),
+        per_page=ORDERS_PER_PAGE
+    )
+    return render_template(
+        "orders.html",
+        orders=orders,
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor")
     )
-    return render_template("orders.html", orders=orders)
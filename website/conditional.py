@@ -0,0 +1,157 @@
+"""
+conditional.py
+--------------
+Conditional GET (ETag / Last-Modified → 304 Not Modified) for pages that
+are re-rendered identically on most visits, and a Cache-Control policy
+per blueprint.
+
+Usage:
+    @views.route("/")
+    @conditional(lambda: CatalogService.listing_validator(category_id))
+    def home(): ...
+
+The validator returns (parts, last_modified) from cheap lookups only
+(cached version stamps, one indexed query at most). The ETag hashes:
+- the validator parts (what the page body is made of)
+- the release: templates and static files (a deploy changes the HTML)
+- the viewer: user id and cart count, shown in the nav of every page
+If the browser's If-None-Match matches, the view is never called: no
+template rendering, no listing or order queries, an empty 304.
+
+Rules:
+- If-None-Match wins over If-Modified-Since (RFC 9110). Last-Modified
+  alone is only trusted for anonymous visitors: it cannot see a change
+  of the cart badge
+- while flashed messages are pending the view always runs; if the page
+  shows them it gets no validators (a one-off: a later 304 would show
+  the message again from the browser cache), else a match is still
+  answered with an empty 304
+- every page response gets Vary: Cookie (same URL, different users)
+
+Cache-Control per blueprint: CACHE_CONTROL_POLICIES below, applied to
+responses that did not set their own.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+# Blueprint → Cache-Control for its responses
+# no-cache   the browser keeps the page but asks (If-None-Match) every time
+# no-store   never kept: forms, cart state, finance data
+CACHE_CONTROL_POLICIES = {
+    "views": "private, no-cache",
+    "orders": "private, no-cache",
+    "cart": "private, no-store",
+    "auth": "private, no-store",
+    "exports": "private, no-store",
+    "reports": "private, no-store",
+}
+
+
+def _release(app) -> tuple:
+    """
+    (stamp, datetime) of the deployed templates and static files, from
+    their paths, sizes and mtimes; computed once per process.
+    """
+    release = app.extensions.get("conditional_release")
+    if release is None:
+        digest = hashlib.blake2b(digest_size=8)
+        newest = 0
+        for folder in (app.template_folder, app.static_folder):
+            root = os.path.join(app.root_path, folder)
+            for directory, _, files in sorted(os.walk(root)):
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(directory, name))
+                    digest.update(f"{directory}/{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+                    newest = max(newest, stat.st_mtime_ns)
+        release = (digest.hexdigest(), datetime.fromtimestamp(newest / 1e9, timezone.utc))
+        app.extensions["conditional_release"] = release
+    return release
+
+
+def conditional(validator: Callable[..., tuple]):
+    """
+    View decorator: answer 304 Not Modified when the page has not changed.
+
+    Args:
+        validator: Called with the view's arguments; returns
+            (parts (tuple), last_modified (datetime UTC, or None))
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            # Import here to avoid circular import issues
+            from website.services.cart_service import CartService
+
+            parts, last_modified = validator(*args, **kwargs)
+            if last_modified is not None and last_modified.tzinfo is None:
+                # Naive datetimes in this app are UTC (datetime.utcnow)
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+            stamp, released = _release(current_app)
+            if current_user.is_authenticated:
+                viewer = (current_user.id, CartService.get_item_count(current_user.id))
+            else:
+                viewer = (None,)
+            etag = hashlib.blake2b(
+                repr((stamp, viewer, parts)).encode(), digest_size=12
+            ).hexdigest()
+            # HTTP dates have whole seconds
+            last_modified = max(filter(None, (last_modified, released))).replace(microsecond=0)
+
+            if request.if_none_match:
+                unchanged = request.if_none_match.contains_weak(etag)
+            else:
+                unchanged = (
+                    not current_user.is_authenticated
+                    and request.if_modified_since is not None
+                    and request.if_modified_since >= last_modified
+                )
+
+            # Pending flashed messages may be shown by this render: it must run
+            flashes_pending = bool(session.get("_flashes"))
+            if unchanged and not flashes_pending:
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if flashes_pending and not session.get("_flashes"):
+                    # The page showed them: a one-off, no validators
+                    return response
+                if unchanged:
+                    # Rendered for nothing, but the body need not be sent
+                    response = make_response("", 304)
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
+
+
+class CachePolicies:
+    """Vary and per-blueprint Cache-Control headers (one instance per app)."""
+
+    def init_app(self, app) -> None:
+        @app.after_request
+        def cache_headers(response):
+            # Static files and assets keep their own caching
+            policy = CACHE_CONTROL_POLICIES.get(request.blueprint)
+            if policy is None:
+                return response
+            response.vary.add("Cookie")
+            if "Cache-Control" not in response.headers:
+                response.headers["Cache-Control"] = policy
+            return response
+
+
+# Single instance used across the app
+cache_policies = CachePolicies()
@@ -11,6 +11,8 @@ Why this file exists:
 """
 
 import os
+from urllib.parse import quote_plus
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,23 +24,187 @@ class BaseConfig:
     """
 
     # Secret key used for sessions, cookies, CSRF protection
-    SECRET_KEY = os.getenv("SECRET_KEY")
-
-    # SQLAlchemy database connection string
-    SQLALCHEMY_DATABASE_URI =(
-         f"mysql+pymysql://"
-        f"{os.getenv('DB_USER')}:"
-        f"{os.getenv('DB_PASSWORD')}@"
-        f"{os.getenv('DB_HOST')}/"
-        f"{os.getenv('DB_NAME')}"
+    SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key")
+
+    # SQLAlchemy database connection string (primary: all writes)
+    # DATABASE_URL wins when set, e.g. sqlite:///primary.db for local runs
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or (
+        f"mysql+pymysql://"
+        f"{os.getenv('DB_USER', 'root')}:"
+        f"{quote_plus(os.getenv('DB_PASSWORD', ''))}@"
+        f"{os.getenv('DB_HOST', 'localhost')}/"
+        f"{os.getenv('DB_NAME', 'ecommerce')}"
     )
 
+    # Read replica (optional): read-only routes read from it, see routing.py
+    # Each bind gets the pool settings below
+    SQLALCHEMY_BINDS = (
+        {"replica": os.getenv("DATABASE_REPLICA_URL")}
+        if os.getenv("DATABASE_REPLICA_URL") else {}
+    )
+
+    # Read-your-writes: after a user's own write, their requests keep
+    # reading the primary for this many seconds (must exceed replica lag)
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+
+    # Connection pool (per worker process, per bind)
+    # pool_size      connections kept open
+    # max_overflow   extra connections allowed under bursts
+    # pool_timeout   seconds to wait for a free connection before failing
+    # pool_recycle   reconnect before MySQL's wait_timeout drops idle connections
+    # pool_pre_ping  test each connection on checkout (survives DB restarts)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
+
     # Disable modification tracking to save memory
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # Default cache timeout (seconds)
     CACHE_TIMEOUT = int(os.getenv("CACHE_TIMEOUT", 60))
 
+    # --------------------------------------------------
+    # Two-tier cache (see cache.py)
+    # --------------------------------------------------
+    # L2 shared backend: "simple" (per-process, dev), "filesystem", "redis", "null"
+    CACHE_L2_TYPE = os.getenv("CACHE_L2_TYPE", "simple")
+    CACHE_DIR = os.getenv("CACHE_DIR", "instance/cache")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # L1 in-process LRU: capacity and max age (bounds cross-worker staleness)
+    CACHE_L1_MAX_ITEMS = int(os.getenv("CACHE_L1_MAX_ITEMS", 10000))
+    CACHE_L1_TIMEOUT = int(os.getenv("CACHE_L1_TIMEOUT", 30))
+
+    CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_KEY_PREFIX = "ecommerce:"
+
+    # Logged-in user identity cache (seconds, 0 = load from the database every request)
+    USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", 60))
+
+    # --------------------------------------------------
+    # Password hashing (see services/password_service.py)
+    # --------------------------------------------------
+    # Werkzeug method string for new hashes. On login, a stored hash of the
+    # same family with weaker parameters (e.g. fewer iterations) is upgraded;
+    # other families (Werkzeug's default scrypt, from sign-ups before this
+    # setting) are kept, unless listed in PASSWORD_REHASH_FROM
+    # (comma-separated families, e.g. "pbkdf2:sha1")
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+    PASSWORD_REHASH_FROM = frozenset(
+        family.strip() for family in os.getenv("PASSWORD_REHASH_FROM", "").split(",") if family.strip()
+    )
+
+    # Hashing process pool size (0 = hash inline on the request thread)
+    # Pool processes are spawned and re-import the entry module, so it must
+    # keep its startup under `if __name__ == "__main__":` (gunicorn does;
+    # run.py builds the app at import time, hence inline hashing in development)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0))
+
+    # Max hashes running or waiting per worker; beyond that login/sign-up get a 503
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 8))
+
+    # Max seconds a request waits for its hash before giving up with a 503
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))
+
+    # --------------------------------------------------
+    # SQL instrumentation (see instrumentation.py)
+    # --------------------------------------------------
+    # Count statements / DB time per request, Server-Timing header, access log fields
+    SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "1") == "1"
+    SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "1") == "1"
+
+    # More repetitions of one statement shape in one request = probable N+1
+    SQL_NPLUSONE_THRESHOLD = int(os.getenv("SQL_NPLUSONE_THRESHOLD", 10))
+
+    # Raise NPlusOneError instead of logging a warning (tests / CI)
+    SQL_NPLUSONE_STRICT = os.getenv("SQL_NPLUSONE_STRICT", "0") == "1"
+
+    # Logging (see logger.py): JSON lines written by a background thread
+    # LOG_FILE          rotating log file ("" = stderr, e.g. in containers)
+    # LOG_QUEUE_SIZE    records waiting for the writer before new ones are dropped
+    # LOG_ASYNC         0 = write on the request thread (debugging only)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 10))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"
+
+    # Startup (see startup.py)
+    # DB_CREATE_ALL             create missing tables on boot (development);
+    #                           production applies migrations: flask db upgrade
+    # JINJA_BYTECODE_CACHE_DIR  compiled templates kept on disk ("" = off)
+    # JINJA_PRECOMPILE          compile every template at startup (before
+    #                           workers fork) instead of on first use
+    DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "1") == "1"
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR", "instance/jinja-cache")
+    JINJA_PRECOMPILE = os.getenv("JINJA_PRECOMPILE", "0") == "1"
+
+    # Product search index (see services/search_index.py):
+    # max seconds before a worker picks up products changed by other workers
+    SEARCH_REFRESH_SECONDS = float(os.getenv("SEARCH_REFRESH_SECONDS", 5))
+
+    # Build the search index in create_app instead of in the background
+    # after the first search (gunicorn --preload: once, before the fork)
+    SEARCH_WARM_ON_START = os.getenv("SEARCH_WARM_ON_START", "0") == "1"
+
+    # Search box suggestions (see services/suggest_index.py):
+    # seconds between background rebuilds (sales ranking, other workers' products)
+    SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", 600))
+
+    # Build the suggestion index in create_app instead of in the background
+    # after the first keystroke (gunicorn --preload: once, before the fork)
+    SUGGEST_WARM_ON_START = os.getenv("SUGGEST_WARM_ON_START", "0") == "1"
+
+    # Finance exports (/exports/<kind>.<csv|ndjson>, flask export) and
+    # sales reports (/reports/...): who may read them (comma-separated
+    # emails) and export rows per fetch
+    EXPORT_ALLOWED_EMAILS = frozenset(
+        email.strip() for email in os.getenv("EXPORT_ALLOWED_EMAILS", "").split(",") if email.strip()
+    )
+    EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 5000))
+
+    # Sales rollups (see services/rollup_service.py): orders per catch-up
+    # transaction, and how old an order must be before the catch-up moves
+    # past it (longer than any checkout transaction)
+    ROLLUP_BATCH_ORDERS = int(os.getenv("ROLLUP_BATCH_ORDERS", 50_000))
+    ROLLUP_SETTLE_SECONDS = float(os.getenv("ROLLUP_SETTLE_SECONDS", 30))
+
+    # Background jobs (see jobs.py)
+    # JOBS_WORKERS             worker threads per app process (0 = none here:
+    #                          run `flask jobs work` separately)
+    # JOBS_INLINE              run a request's jobs before it returns (the
+    #                          old synchronous checkout; debugging only)
+    # JOBS_VISIBILITY_TIMEOUT  seconds before a job whose worker vanished runs again
+    # JOBS_BACKOFF_SECONDS     first retry delay, doubled per attempt up to
+    #                          JOBS_BACKOFF_MAX_SECONDS
+    # JOBS_POLL_SECONDS        idle worker poll interval (other processes' jobs)
+    # JOBS_RETENTION_HOURS     how long finished jobs are kept
+    JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", 2))
+    JOBS_INLINE = os.getenv("JOBS_INLINE", "0") == "1"
+    JOBS_VISIBILITY_TIMEOUT = float(os.getenv("JOBS_VISIBILITY_TIMEOUT", 60))
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", 5))
+    JOBS_BACKOFF_SECONDS = float(os.getenv("JOBS_BACKOFF_SECONDS", 2))
+    JOBS_BACKOFF_MAX_SECONDS = float(os.getenv("JOBS_BACKOFF_MAX_SECONDS", 600))
+    JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", 1))
+    JOBS_RETENTION_HOURS = float(os.getenv("JOBS_RETENTION_HOURS", 24))
+
+    # {% cache %} template fragments (see fragment_cache.py); off = render everything
+    FRAGMENT_CACHE = os.getenv("FRAGMENT_CACHE", "1") == "1"
+
+    # Home page listing cache timeout (seconds)
+    # Entries are versioned, so catalog writes invalidate them immediately;
+    # the timeout only bounds how long unused pages stay in memory
+    CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
+    # Memory-mapped catalog snapshot shared by all workers (disabled if unset)
+    # Build it with: flask --app run build-catalog-snapshot
+    CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH")
+
 class DevelopmentConfig(BaseConfig):
 
       """
@@ -54,6 +220,26 @@ class ProductionConfig(BaseConfig):
       Used on live servers.
     """      
 
+      # Workers on one host share the L2 cache through the filesystem;
+      # use CACHE_L2_TYPE=redis (+ the redis package) across several hosts
+      CACHE_L2_TYPE = os.getenv("CACHE_L2_TYPE", "filesystem")
+
+      # Bigger pool: production workers run several request threads each
+      SQLALCHEMY_ENGINE_OPTIONS = {
+            **BaseConfig.SQLALCHEMY_ENGINE_OPTIONS,
+            "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+      }
+
+      # Hash passwords in a process pool, away from the request threads
+      PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+
+      # Schema comes from the migrations (flask db upgrade at deploy time)
+      DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "0") == "1"
+
+      # Templates compiled once in the (preloaded) master, not per worker
+      JINJA_PRECOMPILE = os.getenv("JINJA_PRECOMPILE", "1") == "1"
+
     # Map environment name to config class
 config_map = {
          "development":DevelopmentConfig,
@@ -0,0 +1,71 @@
+# ==================================================
+# IMPORTS
+# ==================================================
+
+from datetime import date
+from functools import wraps
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+from flask_login import current_user, login_required
+
+from website.services.export_service import EXPORTS, FORMATS, ExportService
+
+# ==================================================
+# BLUEPRINT
+# ==================================================
+exports_bp = Blueprint("exports", __name__)
+
+
+# ==================================================
+# HELPER FUNCTIONS
+# ==================================================
+def finance_only(view):
+    """View decorator: logged-in users listed in EXPORT_ALLOWED_EMAILS only (403 otherwise)."""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.email not in current_app.config.get("EXPORT_ALLOWED_EMAILS", ()):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def parse_day(name: str):
+    """?start= / ?end= as a date (YYYY-MM-DD), None when absent, 400 when invalid."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"{name} must be YYYY-MM-DD")
+
+
+# ==================================================
+# STREAMING EXPORT
+# ==================================================
+@exports_bp.route("/<kind>.<fmt>")
+@finance_only
+def export(kind: str, fmt: str):
+    """
+    Finance dump of orders / order items / payments over a date range.
+
+    Example URL:
+    /exports/orders.csv?start=2024-01-01&end=2024-03-31
+    /exports/payments.ndjson?start=2024-03-01
+
+    Only users listed in EXPORT_ALLOWED_EMAILS may export (finance_only).
+    The body is streamed (chunked transfer encoding) as the rows are read,
+    so the worker never holds the whole export in memory.
+    """
+    if kind not in EXPORTS or fmt not in FORMATS:
+        abort(404)
+
+    start, end = parse_day("start"), parse_day("end")
+    filename = f"{kind}_{start or 'all'}_{end or 'now'}.{fmt}"
+
+    return Response(
+        stream_with_context(ExportService.stream(kind, fmt, start, end)),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,123 @@
+"""
+fragment_cache.py
+-----------------
+{% cache %} template tag: caches the rendered HTML of a template fragment
+in the two-tier cache (cache.py).
+
+Usage:
+    {% cache ("category-select", categories_version, selected_category), 3600 %}
+        ... expensive markup ...
+    {% endcache %}
+
+- the key is any value or tuple of values; its first part names the
+  fragment (stats), the rest is hashed. Put in it everything the markup
+  depends on: a version stamp (bumped by writes) or the displayed values
+  themselves, so a change makes a new key and nothing is ever invalidated
+- the timeout (seconds, optional: CACHE_DEFAULT_TIMEOUT) only bounds how
+  long unused fragments stay in memory
+- a page whose own cache entry missed is still mostly assembled from warm
+  fragments (cards of products that did not change)
+
+Stats:
+- per process: fragment_cache.stats() → hits, misses, hit_ratio per fragment name
+- per request: Server-Timing header entry (with SQL_SERVER_TIMING), e.g.
+      Server-Timing: fragments;desc="7 hits, 1 misses"
+
+FRAGMENT_CACHE = False renders every fragment (debugging templates).
+"""
+
+import hashlib
+import threading
+from collections import Counter
+
+from flask import current_app, g, has_request_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from website.cache import cache
+
+KEY = "fragment:{name}:{digest}"
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension adding {% cache key[, timeout] %} ... {% endcache %}."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", args), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, timeout, caller):
+        if not current_app.config.get("FRAGMENT_CACHE", True):
+            return caller()
+
+        parts = key if isinstance(key, (tuple, list)) else (key,)
+        name = str(parts[0])
+        cache_key = KEY.format(
+            name=name,
+            digest=hashlib.blake2b(repr(tuple(parts[1:])).encode(), digest_size=12).hexdigest()
+        )
+
+        html = cache.get(cache_key)
+        fragment_cache.record(name, html is not None)
+        if html is None:
+            html = str(caller())
+            cache.set(cache_key, html, timeout=timeout)
+        # Already escaped when rendered
+        return Markup(html)
+
+
+class FragmentCache:
+    """Registers the extension and keeps hit / miss counters (one instance per app)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+
+    def init_app(self, app) -> None:
+        app.config.setdefault("FRAGMENT_CACHE", True)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+        @app.after_request
+        def report_fragments(response):
+            counts = g.pop("fragment_counts", None)
+            if counts and app.config.get("SQL_SERVER_TIMING"):
+                response.headers.add(
+                    "Server-Timing", f'fragments;desc="{counts[0]} hits, {counts[1]} misses"'
+                )
+            return response
+
+    def record(self, name: str, hit: bool) -> None:
+        with self._lock:
+            (self._hits if hit else self._misses)[name] += 1
+        if has_request_context():
+            counts = g.setdefault("fragment_counts", [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def stats(self) -> dict:
+        """
+        Hit / miss counters of this process, per fragment name.
+
+        Returns:
+            dict: {name: {"hits", "misses", "hit_ratio"}}
+        """
+        with self._lock:
+            names = set(self._hits) | set(self._misses)
+            counters = {name: (self._hits[name], self._misses[name]) for name in names}
+        return {
+            name: {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses)}
+            for name, (hits, misses) in sorted(counters.items())
+        }
+
+
+# Single instance used across the app
+fragment_cache = FragmentCache()
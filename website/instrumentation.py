@@ -0,0 +1,189 @@
+"""
+instrumentation.py
+------------------
+Per-request SQL instrumentation and N+1 detection.
+
+SQLAlchemy engine events record, for every request:
+- number of statements sent to the database
+- total time spent in the database
+- how often each statement SHAPE (fingerprint) was repeated
+
+A fingerprint is the SQL text with literals and IN-lists collapsed, so
+"SELECT ... WHERE product.id = ?" issued 40 times in a loop shows up as
+one fingerprint with count 40: the signature of an N+1 query.
+
+Output:
+- Server-Timing response header (visible in the browser dev tools):
+      Server-Timing: db;dur=12.4;desc="7 queries", app;dur=31.0
+- db_ms / sql fields of the access log line (logger.py)
+- a WARNING when a fingerprint repeats more than SQL_NPLUSONE_THRESHOLD times
+
+Strict mode (SQL_NPLUSONE_STRICT = True, meant for tests / CI):
+the statement that crosses the threshold raises NPlusOneError instead.
+
+Configuration (see config.py):
+    SQL_INSTRUMENTATION      enable the hooks at all
+    SQL_SERVER_TIMING        add the Server-Timing header
+    SQL_NPLUSONE_THRESHOLD   max repetitions of one statement shape per request
+    SQL_NPLUSONE_STRICT      raise NPlusOneError instead of logging a warning
+"""
+
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+
+class NPlusOneError(Exception):
+    """One request repeated the same statement shape more than the threshold."""
+
+
+# --------------------------------------------------
+# Statement fingerprints
+# --------------------------------------------------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a SQL statement to its shape.
+
+    Args:
+        statement (str): SQL as sent to the driver
+
+    Returns:
+        str: Statement with literals → ?, IN-lists → (?), whitespace collapsed
+    """
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PARAM_LIST.sub("(?)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+class RequestSQLStats:
+    """SQL counters of one request (stored in flask.g)."""
+
+    __slots__ = ("count", "seconds", "fingerprints", "started", "violation")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+        self.started = time.perf_counter()
+        self.violation = None
+
+    def most_repeated(self):
+        """Return (fingerprint, count) of the most repeated shape, or (None, 0)."""
+        if not self.fingerprints:
+            return None, 0
+        return self.fingerprints.most_common(1)[0]
+
+
+def current_stats():
+    """SQL stats of the request being served, or None outside a request."""
+    if not has_app_context():
+        return None
+    return g.get("sql_stats")
+
+
+# --------------------------------------------------
+# Engine hooks
+# --------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is None:
+        return
+
+    conn.info.setdefault("sql_started", []).append(time.perf_counter())
+    stats.count += 1
+
+    shape = fingerprint(statement)
+    stats.fingerprints[shape] += 1
+    repeated = stats.fingerprints[shape]
+    threshold = current_app.config["SQL_NPLUSONE_THRESHOLD"]
+
+    if repeated == threshold + 1 and stats.violation is None:
+        stats.violation = (shape, repeated)
+        if current_app.config["SQL_NPLUSONE_STRICT"]:
+            conn.info["sql_started"].pop()
+            raise NPlusOneError(
+                f"{request.method} {request.path} repeated this statement more than "
+                f"{threshold} times (N+1?): {shape}"
+            )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    started = conn.info.get("sql_started")
+    if stats is None or not started:
+        return
+    stats.seconds += time.perf_counter() - started.pop()
+
+
+class SQLInstrumentation:
+    """Flask extension wiring the engine events and the per-request report."""
+
+    def init_app(self, app, db) -> None:
+        app.config.setdefault("SQL_INSTRUMENTATION", True)
+        app.config.setdefault("SQL_SERVER_TIMING", True)
+        app.config.setdefault("SQL_NPLUSONE_THRESHOLD", 10)
+        app.config.setdefault("SQL_NPLUSONE_STRICT", False)
+
+        if not app.config["SQL_INSTRUMENTATION"]:
+            return
+
+        with app.app_context():
+            engines = list(db.engines.values())
+
+        for engine in engines:
+            if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+        app.before_request(self._start)
+        app.after_request(self._report)
+
+    @staticmethod
+    def _start():
+        g.sql_stats = RequestSQLStats()
+
+    @staticmethod
+    def _report(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+
+        db_ms = stats.seconds * 1000
+        app_ms = (time.perf_counter() - stats.started) * 1000
+
+        if current_app.config["SQL_SERVER_TIMING"]:
+            response.headers.add(
+                "Server-Timing",
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries", app;dur={app_ms:.1f}'
+            )
+
+        if stats.violation:
+            shape, _ = stats.violation
+            repeated = stats.fingerprints[shape]
+            if current_app.config["SQL_NPLUSONE_STRICT"]:
+                # The statement-time error was swallowed by the view: fail anyway
+                raise NPlusOneError(
+                    f"{request.method} {request.path} repeated this statement "
+                    f"{repeated} times (N+1?): {shape}"
+                )
+            current_app.logger.warning(
+                "possible N+1 on %s %s: %d x %s",
+                request.method, request.path, repeated, shape
+            )
+
+        return response
+
+
+# Single instance used across the app
+sql_instrumentation = SQLInstrumentation()
@@ -0,0 +1,427 @@
+"""
+jobs.py
+-------
+Durable background jobs, stored in the database (Job model).
+
+Why:
+- checkout should answer as soon as the order is committed; confirmation
+  emails, rollups and cache invalidation can run a moment later
+- the queue is a table, so enqueuing is part of the caller's transaction:
+  a job exists if and only if the order that needed it was committed
+  (no lost emails after a crash, no email for a rolled-back order)
+
+Usage:
+    @job("orders.send_confirmation")
+    def send_confirmation(order_id): ...
+
+    enqueue("orders.send_confirmation", order_id=order.id)   # before commit
+    enqueue_once("rollups.catch_up:<slot>", "rollups.catch_up", run_at)  # coalesced
+
+Who runs the jobs (see config.py):
+    JOBS_WORKERS          in-process worker threads per app process
+    flask jobs work       standalone worker process (--threads N)
+    JobQueue.drain()      tests / local runs: process everything now, in
+                          order, in the calling thread (deterministic)
+    JOBS_INLINE           run the request's jobs right after the response
+                          is built (the old synchronous behaviour; for
+                          comparison and debugging)
+
+Delivery: at least once. Handlers must be idempotent.
+- claim: a conditional UPDATE (... WHERE id = ? AND status = 'queued' ...)
+  marks the job running with locked_until = now + JOBS_VISIBILITY_TIMEOUT;
+  whoever updates the row owns the job, no SELECT ... FOR UPDATE needed
+- a worker that dies mid-job leaves it "running"; once locked_until has
+  passed, another worker claims it again
+- failure: retried after JOBS_BACKOFF_SECONDS × 2^(attempt-1) (capped at
+  JOBS_BACKOFF_MAX_SECONDS, spread by up to +45% depending on the job id,
+  so retries of a burst do not all land together) until max_attempts,
+  then "failed" with the last error kept for inspection
+- done jobs are deleted after JOBS_RETENTION_HOURS
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import click
+from flask import current_app, g, has_request_context
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, func, inspect, or_, select, update
+
+from website import db
+from website.models import Job
+
+# Registered handlers: kind → function(**payload)
+HANDLERS: Dict[str, Callable] = {}
+
+
+def job(kind: str):
+    """Decorator registering a job handler under `kind`."""
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind: str, delay: float = 0, max_attempts: Optional[int] = None, **payload) -> Job:
+    """
+    Add a job to the current transaction (it is visible to workers once
+    the caller commits).
+
+    Args:
+        kind (str): Registered handler name
+        delay (float): Seconds before it may run
+        max_attempts (int, optional): Defaults to JOBS_MAX_ATTEMPTS
+        **payload: Handler arguments (JSON-serializable)
+
+    Returns:
+        Job: The pending job row
+    """
+    if kind not in HANDLERS:
+        raise KeyError(f"no job handler registered for {kind!r}")
+
+    new_job = Job(
+        kind=kind,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts or current_app.config.get("JOBS_MAX_ATTEMPTS", 5),
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.session.add(new_job)
+
+    if has_request_context():
+        g.setdefault("jobs_enqueued", []).append(new_job)
+    return new_job
+
+
+def enqueue_once(dedupe_key: str, kind: str, run_at: datetime, **payload) -> None:
+    """
+    Add a job to the current transaction unless one with the same
+    dedupe_key already exists (queued, running or done): one
+    INSERT ... ON CONFLICT DO NOTHING, no read first.
+
+    For jobs that cover everything before them (a rollup catch-up): with a
+    key per time slot, a burst of callers adds one job per slot instead
+    of one each. The job is not dispatched by this request (no ORM row):
+    workers find it when they poll, which a delayed job waits for anyway.
+
+    Args:
+        dedupe_key (str): At most one job per key (kept until purged)
+        kind (str): Registered handler name
+        run_at (datetime): Not before this time (UTC)
+        **payload: Handler arguments (JSON-serializable)
+    """
+    if kind not in HANDLERS:
+        raise KeyError(f"no job handler registered for {kind!r}")
+
+    table = Job.__table__
+    dialect = db.session.get_bind(mapper=Job.__mapper__).dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        # No-op update: unlike INSERT IGNORE, other errors still raise
+        statement = insert(table).on_duplicate_key_update(id=table.c.id)
+    else:
+        # SQLite and PostgreSQL share the ON CONFLICT syntax
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).on_conflict_do_nothing(index_elements=["dedupe_key"])
+
+    db.session.execute(statement.values(
+        kind=kind,
+        payload=json.dumps(payload),
+        status="queued",
+        attempts=0,
+        max_attempts=current_app.config.get("JOBS_MAX_ATTEMPTS", 5),
+        run_at=run_at,
+        created_at=datetime.utcnow(),
+        dedupe_key=dedupe_key,
+    ))
+
+
+class JobQueue:
+    """Claims, runs, retries and cleans up jobs (one instance per app)."""
+
+    def __init__(self):
+        self.app = None
+        self.workers: List[threading.Thread] = []
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+    # --------------------------------------------------
+    # Setup
+    # --------------------------------------------------
+    def init_app(self, app) -> None:
+        app.config.setdefault("JOBS_WORKERS", 0)
+        app.config.setdefault("JOBS_INLINE", False)
+        app.config.setdefault("JOBS_VISIBILITY_TIMEOUT", 60)
+        app.config.setdefault("JOBS_MAX_ATTEMPTS", 5)
+        app.config.setdefault("JOBS_BACKOFF_SECONDS", 2)
+        app.config.setdefault("JOBS_BACKOFF_MAX_SECONDS", 600)
+        app.config.setdefault("JOBS_POLL_SECONDS", 1)
+        app.config.setdefault("JOBS_RETENTION_HOURS", 24)
+
+        @app.after_request
+        def dispatch_jobs(response):
+            enqueued = g.pop("jobs_enqueued", None)
+            if not enqueued:
+                return response
+            # Only jobs that made it into a commit have an identity (read
+            # without reloading the expired rows)
+            identities = (inspect(pending).identity for pending in enqueued)
+            committed = [identity[0] for identity in identities if identity]
+            if app.config["JOBS_INLINE"]:
+                for job_id in committed:
+                    self.run_one(job_id=job_id)
+            elif app.config["JOBS_WORKERS"]:
+                self.start(app)
+                self.wake.set()
+            return response
+
+    def start(self, app, threads: Optional[int] = None) -> None:
+        """Start the worker threads for `app` (once per process)."""
+        with self._start_lock:
+            if self.workers:
+                return
+            self.app = app
+            count = threads or app.config["JOBS_WORKERS"]
+            for number in range(count):
+                worker = threading.Thread(
+                    target=self._work, name=f"job-worker-{number}", daemon=True
+                )
+                worker.start()
+                self.workers.append(worker)
+
+    def stop(self, timeout: float = 5) -> None:
+        """Ask the worker threads to finish their current job and exit."""
+        self.stopping.set()
+        self.wake.set()
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = []
+        self.stopping.clear()
+
+    # --------------------------------------------------
+    # Claim / run / finish
+    # --------------------------------------------------
+    @staticmethod
+    def _runnable(now: datetime):
+        """Queued and due, or running with an expired visibility timeout."""
+        return or_(
+            and_(Job.status == "queued", Job.run_at <= now),
+            and_(Job.status == "running", Job.locked_until <= now),
+        )
+
+    def claim(self, worker_id: str, now: Optional[datetime] = None, job_id: Optional[int] = None) -> Optional[Job]:
+        """
+        Take ownership of the oldest runnable job (or of job_id).
+
+        Returns:
+            Job | None: The claimed job (status running), None if none is runnable
+        """
+        now = now or datetime.utcnow()
+        config = current_app.config
+        query = select(Job.id).where(self._runnable(now))
+        if job_id is not None:
+            query = query.where(Job.id == job_id)
+        candidates = db.session.scalars(query.order_by(Job.run_at, Job.id).limit(8)).all()
+
+        for candidate in candidates:
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == candidate, self._runnable(now))
+                .values(
+                    status="running",
+                    locked_by=worker_id,
+                    locked_until=now + timedelta(seconds=config["JOBS_VISIBILITY_TIMEOUT"]),
+                    attempts=Job.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return db.session.get(Job, candidate, populate_existing=True)
+        return None
+
+    def execute(self, claimed: Job, worker_id: str, now: Optional[datetime] = None) -> bool:
+        """
+        Run a claimed job's handler and record the outcome.
+
+        Returns:
+            bool: True if the handler succeeded
+        """
+        job_id, kind, attempts, max_attempts = claimed.id, claimed.kind, claimed.attempts, claimed.max_attempts
+        error = None
+        try:
+            if attempts > max_attempts:
+                raise RuntimeError("visibility timeout expired on the last attempt")
+            handler = HANDLERS.get(kind)
+            if handler is None:
+                raise KeyError(f"no job handler registered for {kind!r}")
+            handler(**json.loads(claimed.payload))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            error = traceback.format_exc(limit=5)
+            current_app.logger.warning("job %s (%s) attempt %d failed: %s",
+                                       job_id, kind, attempts, error.strip().splitlines()[-1])
+
+        now = now or datetime.utcnow()
+        if error is None:
+            values = {"status": "done", "finished_at": now, "locked_until": None, "last_error": None}
+        elif attempts >= max_attempts:
+            values = {"status": "failed", "finished_at": now, "locked_until": None, "last_error": error}
+        else:
+            values = {"status": "queued", "run_at": now + self.backoff(job_id, attempts),
+                      "locked_until": None, "last_error": error}
+
+        # Only the current owner records the outcome (the lock may have expired
+        # and the job been claimed again meanwhile)
+        db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id, Job.attempts == attempts)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return error is None
+
+    def backoff(self, job_id: int, attempts: int) -> timedelta:
+        """Delay before retry number `attempts` (deterministic spread by job id)."""
+        config = current_app.config
+        base = min(config["JOBS_BACKOFF_SECONDS"] * 2 ** (attempts - 1), config["JOBS_BACKOFF_MAX_SECONDS"])
+        return timedelta(seconds=base * (1 + (job_id % 10) * 0.05))
+
+    def run_one(self, worker_id: Optional[str] = None, now: Optional[datetime] = None,
+                job_id: Optional[int] = None) -> Optional[bool]:
+        """
+        Claim and run one job.
+
+        Returns:
+            bool | None: Handler outcome, None if nothing was runnable
+        """
+        worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        claimed = self.claim(worker_id, now=now, job_id=job_id)
+        if claimed is None:
+            return None
+        return self.execute(claimed, worker_id, now=now)
+
+    # --------------------------------------------------
+    # Deterministic harness (tests, local runs)
+    # --------------------------------------------------
+    def drain(self, max_jobs: Optional[int] = None, fast_forward: bool = True) -> dict:
+        """
+        Process jobs in the calling thread, oldest first, until none is left.
+
+        Args:
+            max_jobs (int, optional): Stop after this many runs
+            fast_forward (bool): Jump the clock to the next delayed job, retry or
+                expired lock instead of stopping (no sleeping; same order
+                every time). Only for tests: it also takes over jobs that
+                live workers are still running
+
+        Returns:
+            dict: {"succeeded": n, "failed": n (attempts that raised)}
+        """
+        counts = {"succeeded": 0, "failed": 0}
+        clock = datetime.utcnow()
+        while max_jobs is None or counts["succeeded"] + counts["failed"] < max_jobs:
+            outcome = self.run_one(worker_id="drain", now=clock)
+            if outcome is None:
+                # Next job to become runnable: a delayed / retried one, or a
+                # running one whose visibility timeout expires
+                next_run = min(
+                    (moment for moment in (
+                        db.session.scalar(select(func.min(Job.run_at)).where(Job.status == "queued")),
+                        db.session.scalar(select(func.min(Job.locked_until)).where(Job.status == "running")),
+                    ) if moment is not None),
+                    default=None,
+                )
+                db.session.commit()
+                if not fast_forward or next_run is None:
+                    break
+                clock = max(clock, next_run)
+                continue
+            counts["succeeded" if outcome else "failed"] += 1
+        return counts
+
+    # --------------------------------------------------
+    # Worker loop
+    # --------------------------------------------------
+    def _work(self) -> None:
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        last_purge = 0.0
+        while not self.stopping.is_set():
+            with self.app.app_context():
+                try:
+                    outcome = self.run_one(worker_id)
+                    if time.monotonic() - last_purge > 3600:
+                        self.purge()
+                        last_purge = time.monotonic()
+                except Exception:
+                    self.app.logger.exception("job worker %s: unexpected error", worker_id)
+                    outcome = None
+                finally:
+                    db.session.remove()
+
+            if outcome is None:
+                # Idle: wait for an enqueue in this process, or poll again
+                self.wake.wait(self.app.config["JOBS_POLL_SECONDS"])
+                self.wake.clear()
+
+    def purge(self) -> int:
+        """Delete done jobs older than JOBS_RETENTION_HOURS; return how many."""
+        cutoff = datetime.utcnow() - timedelta(hours=current_app.config["JOBS_RETENTION_HOURS"])
+        deleted = db.session.execute(
+            delete(Job).where(Job.status == "done", Job.finished_at < cutoff)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        """Number of jobs per status."""
+        return dict(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+
+
+# Single instance used across the app
+job_queue = JobQueue()
+
+
+# ==================================================
+# CLI: flask --app run jobs work | drain | stats
+# ==================================================
+jobs_cli = AppGroup("jobs", help="Run and inspect background jobs.")
+
+
+@jobs_cli.command("work")
+@click.option("--threads", type=int, default=2, show_default=True, help="Worker threads.")
+def work_command(threads):
+    """Standalone worker: process jobs until interrupted."""
+    job_queue.start(current_app._get_current_object(), threads)
+    click.echo(f"Processing jobs with {threads} threads (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        job_queue.stop()
+
+
+@jobs_cli.command("drain")
+def drain_command():
+    """Process every runnable job now, in this process, then exit."""
+    counts = job_queue.drain(fast_forward=False)
+    click.echo(f"{counts['succeeded']} succeeded, {counts['failed']} failed attempts")
+
+
+@jobs_cli.command("stats")
+def stats_command():
+    """Jobs per status."""
+    for status, count in sorted(job_queue.stats().items()):
+        click.echo(f"{status:<10}{count}")
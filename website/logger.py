@@ -1,36 +1,231 @@
 """
 logger.py
 ---------
-Central logging configuration.
+Central logging configuration: JSON lines, written off the request path.
+
+How:
+- app.logger gets a QueueHandler: a request thread only puts the record
+  on an in-memory queue (no file I/O, no formatting of the JSON)
+- a QueueListener thread formats the records and writes them to the
+  rotating log file (or stderr)
+- the queue is bounded (LOG_QUEUE_SIZE): if the disk cannot keep up,
+  records are dropped and counted instead of blocking requests; the
+  count is logged once the queue drains
+
+Every record logged during a request carries its request_id (the
+X-Request-ID header when the client / proxy sent one, else a new id,
+echoed back in the response). One access line per request:
+
+    {"ts": "2024-05-01T12:00:00.123Z", "level": "INFO", "logger": "website.access",
+     "msg": "GET / 200", "request_id": "5f0c...", "method": "GET", "path": "/",
+     "route": "/", "status": 200, "latency_ms": 3.1, "db_ms": 0.8, "sql": 2}
+
+Configuration (see config.py):
+    LOG_LEVEL          INFO, WARNING, ...
+    LOG_FILE           path of the rotating file ("" = stderr)
+    LOG_MAX_BYTES      rotate after this size
+    LOG_BACKUP_COUNT   rotated files kept
+    LOG_QUEUE_SIZE     records waiting for the writer thread before dropping
+    LOG_ASYNC          False = write on the request thread (debugging, benchmarks)
 """
 
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+from website.instrumentation import current_stats
+
+# Attributes of every LogRecord; anything else was passed with extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Accepted X-Request-ID values (anything else gets a fresh id)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# The writer of the last configured app (one per process)
+_active = {"listener": None, "handlers": []}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")[:-6] + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RESERVED:
+                line[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line["exc"] = record.exc_text
+        return json.dumps(line, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the request id to records logged while serving a request."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context() and "request_id" not in vars(record):
+            record.request_id = g.get("request_id")
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: a full queue drops (and counts) the record."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now (the arguments may change
+        # before the writer thread gets to them); JSON is built over there
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+
+        if self.dropped and self.queue.qsize() < self.queue.maxsize // 2:
+            with self._lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                warning = logging.makeLogRecord({
+                    "name": record.name, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": "log queue full: %d records dropped", "args": (dropped,),
+                })
+                self.queue.put_nowait(self.prepare(warning))
+
+
+def _writer(app) -> logging.Handler:
+    """The handler doing the actual I/O (file or stderr), with the JSON format."""
+    path = app.config["LOG_FILE"]
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=app.config["LOG_MAX_BYTES"],
+            backupCount=app.config["LOG_BACKUP_COUNT"],
+            encoding="utf-8",
+        )
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _stop_active() -> None:
+    """Detach the handlers of a previous setup (create_app called again) and flush its writer."""
+    for logger, handler in _active["handlers"]:
+        logger.removeHandler(handler)
+    if _active["listener"] is not None:
+        _active["listener"].stop()
+    for handler in _active.pop("writers", []):
+        handler.close()
+    _active.update(listener=None, handlers=[])
+
 
 def setup_logger(app):
     """
-    Configure rotating file logs.
+    Configure JSON logging (queued, see module docstring) and the access log.
+
+    Called first in create_app: after_request hooks run in reverse order
+    of registration, so the access line is written last and its latency
+    covers the other hooks too.
     """
+    app.config.setdefault("LOG_LEVEL", "INFO")
+    app.config.setdefault("LOG_FILE", "logs/app.log")
+    app.config.setdefault("LOG_MAX_BYTES", 10 * 1024 * 1024)
+    app.config.setdefault("LOG_BACKUP_COUNT", 10)
+    app.config.setdefault("LOG_QUEUE_SIZE", 10000)
+    app.config.setdefault("LOG_ASYNC", True)
+
+    _stop_active()
+    writer = _writer(app)
+
+    if app.config["LOG_ASYNC"]:
+        log_queue = queue.Queue(maxsize=app.config["LOG_QUEUE_SIZE"])
+        handler = DroppingQueueHandler(log_queue)
+        listener = QueueListener(log_queue, writer, respect_handler_level=True)
+        listener.start()
+        _active["listener"] = listener
+    else:
+        handler = writer
+    handler.addFilter(RequestContextFilter())
+    _active["writers"] = [writer]
+
+    # Flask's own stderr handler would write every record again, synchronously
+    app.logger.removeHandler(default_handler)
+
+    level = logging.getLevelName(app.config["LOG_LEVEL"])
+    access = logging.getLogger(f"{app.logger.name}.access")
+    for logger in (app.logger, access):
+        logger.setLevel(level)
+        logger.addHandler(handler)
+        _active["handlers"].append((logger, handler))
+    # website.access is a child of app.logger: it must not write twice
+    access.propagate = False
 
-    if not os.path.exists("logs"):
-        os.mkdir("logs")
+    @app.before_request
+    def start_request():
+        supplied = request.headers.get("X-Request-ID", "")
+        g.request_id = supplied if _REQUEST_ID.match(supplied) else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
 
-        handler= RotatingFileHandler(
-           "logs/app.log",
-           maxBytes=10240,
-           backupCount=10
-        ) 
+    @app.after_request
+    def log_request(response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+        response.headers.setdefault("X-Request-ID", g.request_id)
+        if not access.isEnabledFor(logging.INFO):
+            return response
 
-        formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(message)s"
-         )
+        # None when SQL_INSTRUMENTATION is off
+        sql = current_stats()
+        access.info(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "route": request.url_rule.rule if request.url_rule else None,
+                "status": response.status_code,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                "db_ms": round(sql.seconds * 1000, 2) if sql else None,
+                "sql": sql.count if sql else None,
+            }
+        )
+        return response
 
-        handler.setFormatter(formatter)
-        handler.setLevel(logging.INFO)
+    app.logger.info("Application started")
 
-        app.logger.addHandler(handler)
-        app.logger.setLevel(logging.INFO)
 
-        app.logger.info("Application started")
-        
\ No newline at end of file
+# Flush what is still queued when the process exits
+atexit.register(_stop_active)
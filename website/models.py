@@ -107,16 +107,34 @@ class Product(db.Model):
         default=func.now()
     )
 
+    # Last time the row changed (price, name, stock, ...)
+    # Set by the database on every UPDATE, including bulk stock updates
+    # Used to refresh the catalog snapshot incrementally
+    updated_at = db.Column(
+        db.DateTime,
+        default=func.now(),
+        onupdate=func.now(),
+        index=True
+    )
+
     # Prevent duplicate product names within the same category
     # Example:
     # "iPhone" allowed in Electronics
     # "iPhone" NOT allowed twice in Electronics
+    #
+    # Composite indexes back the keyset (seek) pagination on the home page:
+    # each sort order (name / price) has an index ending in "id",
+    # with and without the category filter in front
     __table_args__ = (
         db.UniqueConstraint(
             "name",
             "category_id",
             name="uq_product_name_category"
         ),
+        db.Index("ix_product_category_price_id", "category_id", "price", "id"),
+        db.Index("ix_product_category_name_id", "category_id", "name", "id"),
+        db.Index("ix_product_price_id", "price", "id"),
+        db.Index("ix_product_name_id", "name", "id"),
     )
 
     def __repr__(self):
@@ -144,6 +162,16 @@ class Cart(db.Model):
         default=func.now()
     )
 
+    # Denormalized total quantity of all items (🛒 badge)
+    # Kept in sync by CartService on every cart mutation,
+    # so the badge never has to load and sum the cart items
+    item_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
+    )
+
     # One cart → many cart items
     # cascade ensures cart items are deleted if cart is deleted
     items = db.relationship(
@@ -155,7 +183,7 @@ class Cart(db.Model):
     def total_items(self):
         """
         Returns total quantity of all items in cart.
-        Used for cart badge (🛒 count).
+        Loads every item: the badge uses the maintained item_count instead.
         """
         return sum(item.quantity for item in self.items)
 
@@ -241,6 +269,21 @@ class Order(db.Model):
 
     user = db.relationship("User", backref="orders")  # <-- add this
 
+    # One order → one payment (Payment.order_id)
+    payment = db.relationship(
+        "Payment",
+        uselist=False,
+        backref="order"
+    )
+
+    # Order history lists a user's orders newest first
+    # and pages through them by (created_at, id)
+    # Finance exports read a date range of all orders in (created_at, id) order
+    __table_args__ = (
+        db.Index("ix_order_user_created_id", "user_id", "created_at", "id"),
+        db.Index("ix_order_created_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<Order {self.id} User {self.user_id}>"
 
@@ -254,9 +297,12 @@ class OrderItem(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
 
+    # Indexed: the order-items export walks orders by date, then their lines
+    # (MySQL has this index implicitly for the foreign key, SQLite does not)
     order_id = db.Column(
         db.Integer,
-        db.ForeignKey("order.id")
+        db.ForeignKey("order.id"),
+        index=True
     )
 
     product_id = db.Column(
@@ -292,6 +338,9 @@ class Payment(db.Model):
     # Reference to the user who made the payment
     # This creates a foreign key relationship with the 'user' table
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+
+    # The order this payment settles (indexed: order history looks payments up by order)
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), index=True)
     
     # Amount paid by the user
     amount = db.Column(db.Float, nullable=False)
@@ -307,4 +356,109 @@ class Payment(db.Model):
     # Relationship property to easily access the user object from a payment
     # E.g., payment.user will give the User instance
     # 'backref="payments"' allows User.payments to return all payments for that user
-    user = db.relationship("User", backref="payments")
\ No newline at end of file
+    user = db.relationship("User", backref="payments")
+
+    # Finance exports read a date range of payments in (created_at, id) order
+    __table_args__ = (
+        db.Index("ix_payment_created_id", "created_at", "id"),
+    )
+
+# ==================================================
+# SALES ROLLUPS (reporting)
+# ==================================================
+# Pre-aggregated sales, maintained by RollupService from the order lines
+# (see services/rollup_service.py). Reports read these instead of
+# aggregating every OrderItem: cost grows with days × products, not with
+# the number of order lines ever placed.
+class DailyProductSales(db.Model):
+
+    # One row per (day, product) with at least one sale
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), primary_key=True)
+
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Orders containing the product that day
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+    # Reports filter on a day range, served by the (day, product_id)
+    # primary key. Deliberately no (product_id, day) index: planners pick
+    # it for GROUP BY product_id and then read every day of history.
+
+    def __repr__(self):
+        return f"<DailyProductSales {self.day} Product {self.product_id} x {self.units}>"
+
+
+class DailyCategorySales(db.Model):
+
+    # One row per (day, category) with at least one sale
+    # (category of the product when the sale was rolled up)
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), primary_key=True)
+
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<DailyCategorySales {self.day} Category {self.category_id} x {self.units}>"
+
+
+class RollupState(db.Model):
+
+    # Name of the rollup ("sales")
+    name = db.Column(db.String(50), primary_key=True)
+
+    # High-water mark: every order with id <= this is included in the rollups
+    last_order_id = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<RollupState {self.name} @ order {self.last_order_id}>"
+
+
+# ==================================================
+# BACKGROUND JOBS
+# ==================================================
+# Durable queue of side work (confirmation emails, rollups, cache
+# invalidation), processed by the workers in website/jobs.py
+class Job(db.Model):
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Registered handler name, e.g. "orders.send_confirmation"
+    kind = db.Column(db.String(100), nullable=False)
+
+    # Handler arguments (JSON object)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+
+    # queued → running → done, or back to queued (retry), or failed
+    status = db.Column(db.String(20), nullable=False, default="queued")
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+
+    # Not before this time (delayed jobs, retry backoff)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Visibility timeout: a running job whose worker died is picked up
+    # again once locked_until has passed
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    # Set by enqueue_once: at most one job per key (NULL = no limit)
+    dedupe_key = db.Column(db.String(150))
+
+    # Workers look for the oldest runnable jobs of a status
+    __table_args__ = (
+        db.Index("ix_job_status_run_at", "status", "run_at"),
+        db.UniqueConstraint("dedupe_key", name="uq_job_dedupe_key"),
+    )
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status} attempt {self.attempts}>"
@@ -0,0 +1,68 @@
+# ==================================================
+# IMPORTS
+# ==================================================
+
+from flask import Blueprint, jsonify, request
+
+from website.exports import finance_only, parse_day
+from website.services.rollup_service import RollupService
+
+# ==================================================
+# BLUEPRINT
+# ==================================================
+reports_bp = Blueprint("reports", __name__)
+
+# Most products a top-products report may list
+MAX_TOP_PRODUCTS = 200
+
+
+# ==================================================
+# SALES REPORTS (JSON, from the rollup tables)
+# ==================================================
+# Reports read only the rollup tables: the cost depends on days ×
+# products in the range, never on the order lines (or on how many
+# orders wait to be rolled up). They do not catch up themselves: the
+# rollups.catch_up job (after checkouts) and `flask rollups catch-up` do.
+# Every report says how far the rollups go:
+#     {"as_of": {"order_id": ..., "order_placed_at": ..., "rolled_up_at": ...},
+#      "rows": [...]}
+def report(rows: list):
+    """JSON report: the rows plus the rollups' high-water mark."""
+    return jsonify({"as_of": RollupService.freshness(), "rows": rows})
+
+
+@reports_bp.route("/revenue")
+@finance_only
+def revenue():
+    """
+    Units and revenue per day.
+
+    Example URL:
+    /reports/revenue?start=2024-01-01&end=2024-01-31
+    """
+    return report(RollupService.revenue_by_day(parse_day("start"), parse_day("end")))
+
+
+@reports_bp.route("/products")
+@finance_only
+def products():
+    """
+    Best-selling products by units.
+
+    Example URL:
+    /reports/products?start=2024-01-01&end=2024-03-31&limit=50
+    """
+    limit = max(1, min(request.args.get("limit", 20, type=int), MAX_TOP_PRODUCTS))
+    return report(RollupService.top_products(parse_day("start"), parse_day("end"), limit))
+
+
+@reports_bp.route("/categories")
+@finance_only
+def categories():
+    """
+    Units and revenue per category, highest revenue first.
+
+    Example URL:
+    /reports/categories?start=2024-01-01
+    """
+    return report(RollupService.sales_by_category(parse_day("start"), parse_day("end")))
@@ -0,0 +1,123 @@
+"""
+routing.py
+----------
+Read-replica routing for the SQLAlchemy session.
+
+Setup (see config.py):
+    SQLALCHEMY_DATABASE_URI   primary (all writes, default for reads)
+    SQLALCHEMY_BINDS          {"replica": <replica URL>} to enable routing
+    REPLICA_STICKY_SECONDS    read-your-writes window after a user's own write
+
+Rules:
+- Reads go to the replica ONLY inside a replica scope:
+    @use_replica            on a read-only view (home, order history)
+    with replica_reads():   around a read in service code (product lookups)
+- Everything else stays on the primary: INSERT / UPDATE / DELETE,
+  SELECT ... FOR UPDATE, anything after the session has flushed or written
+  in this request, and every request outside a replica scope (checkout, cart)
+- Read-your-writes: a request that wrote marks the browser session as
+  "sticky" for REPLICA_STICKY_SECONDS; during that window its replica
+  scopes read from the primary, so a user never sees their own write
+  disappear because the replica lags behind
+- with primary_reads(): forces the primary inside a replica scope
+  (e.g. to refill a cache right after an invalidation)
+
+Without a "replica" bind every scope is a no-op: one database, as before.
+"""
+
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = "replica"
+
+# Key in the (cookie) session holding the end of the sticky window
+STICKY_KEY = "db_primary_until"
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can send plain SELECTs to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or (clause is not None and not isinstance(clause, Select)):
+                # A write: everything after it in this request reads the primary
+                self.info["wrote"] = True
+            elif (
+                g.get("db_route") == REPLICA_BIND
+                and not self.info.get("wrote")
+                and (clause is None or clause._for_update_arg is None)
+            ):
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _sticky() -> bool:
+    """True while the current user is inside their read-your-writes window."""
+    return has_request_context() and session.get(STICKY_KEY, 0) > time.time()
+
+
+@contextmanager
+def _route(target):
+    previous = g.get("db_route")
+    g.db_route = target
+    try:
+        yield
+    finally:
+        g.db_route = previous
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads of this block to the replica (unless the user is sticky)."""
+    with _route(None if _sticky() else REPLICA_BIND):
+        yield
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads of this block to the primary, even inside a replica scope."""
+    with _route(None):
+        yield
+
+
+def use_replica(view):
+    """View decorator: the whole request reads from the replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def replica_lag_window() -> float:
+    """Seconds after a write during which the replica may still be behind."""
+    return current_app.config.get("REPLICA_STICKY_SECONDS", 5)
+
+
+class ReplicaRouter:
+    """Flask extension recording read-your-writes stickiness after writes."""
+
+    def init_app(self, app, db) -> None:
+        app.config.setdefault("REPLICA_STICKY_SECONDS", 5)
+
+        # No replica configured: nothing to route, no cookie to set
+        if REPLICA_BIND not in app.config.get("SQLALCHEMY_BINDS", {}):
+            return
+
+        @app.after_request
+        def remember_write(response):
+            if db.session.info.get("wrote"):
+                session[STICKY_KEY] = time.time() + app.config["REPLICA_STICKY_SECONDS"]
+            return response
+
+
+# Single instance used across the app
+replica_router = ReplicaRouter()
@@ -0,0 +1,297 @@
+from typing import Dict, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from website.models import Cart, CartItem, Product
+from website import cache, db
+
+
+# Cache key for the cart badge count of one user
+CART_COUNT_KEY = "cart_count:{user_id}"
+
+# How long a badge count stays cached (seconds)
+# Every cart mutation invalidates it, so this only bounds memory use
+CART_COUNT_TIMEOUT = 300
+
+
+class CartService:
+    """
+    Batch cart updates, and the denormalized cart item count used by the
+    🛒 badge.
+    """
+
+    @staticmethod
+    def set_quantities(cart_id: int, quantities: Dict[int, int]) -> dict:
+        """
+        Set several cart lines to new quantities in one transaction
+        (0 removes the line), capped at each product's stock.
+
+        Statements, however many lines change:
+        1 SELECT of the lines with their product stock, 1 DELETE,
+        1 executemany UPDATE, 1 item_count UPDATE, then the commit.
+
+        item_count is recomputed as SUM(quantity) in the same transaction,
+        not moved by a delta of the quantities read here: another cart
+        change may land between that SELECT and the UPDATEs. (No FOR
+        UPDATE: on the join it would also lock the product rows that
+        checkouts update.)
+
+        Args:
+            cart_id (int): The user's cart (lines of other carts are ignored)
+            quantities (Dict[int, int]): CartItem ID → new quantity (>= 0)
+
+        Returns:
+            dict: {"capped": [{"id", "quantity"}] set lower than asked
+                   (stock), "ignored": [ids] not in this cart}
+        """
+        lines = db.session.execute(
+            select(CartItem.id, CartItem.quantity, Product.stock)
+            .join(Product, Product.id == CartItem.product_id)
+            .where(CartItem.cart_id == cart_id, CartItem.id.in_(quantities))
+        ).all()
+
+        removed: List[int] = []
+        changed: List[dict] = []
+        capped: List[dict] = []
+        for line in lines:
+            wanted = quantities[line.id]
+            # Only an explicit 0 removes a line (out of stock: 1 kept,
+            # checkout reports the shortage)
+            quantity = max(1, min(wanted, line.stock)) if wanted else 0
+            if quantity < wanted:
+                capped.append({"id": line.id, "quantity": quantity})
+            if quantity == line.quantity:
+                continue
+            if quantity == 0:
+                removed.append(line.id)
+            else:
+                changed.append({"id": line.id, "quantity": quantity})
+
+        if removed:
+            db.session.execute(
+                delete(CartItem)
+                .where(CartItem.id.in_(removed))
+                .execution_options(synchronize_session=False)
+            )
+        if changed:
+            # UPDATE ... WHERE id = ? once, executed for every line
+            db.session.execute(update(CartItem), changed)
+        if removed or changed:
+            CartService.recount_item_count(cart_id)
+        db.session.commit()
+
+        found = {line.id for line in lines}
+        return {"capped": capped, "ignored": sorted(set(quantities) - found)}
+
+    # --------------------------------------------------
+    # Single-line changes (cart buttons)
+    # Each one is a conditional UPDATE / DELETE and item_count moves by
+    # what the database actually changed (rowcount), never by a quantity
+    # read earlier: concurrent clicks on the same line cannot make
+    # item_count drift from SUM(quantity). None of them commits.
+    # --------------------------------------------------
+    @staticmethod
+    def _increment(*where) -> int:
+        """quantity + 1 on the matching line while below its product's stock; rows changed."""
+        stock = select(Product.stock).where(Product.id == CartItem.product_id).scalar_subquery()
+        return db.session.execute(
+            update(CartItem)
+            .where(*where, CartItem.quantity < stock)
+            .values(quantity=CartItem.quantity + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    @staticmethod
+    def add_unit(cart_id: int, product_id: int) -> bool:
+        """
+        Add one unit of a product to a cart: +1 on its line (within stock)
+        or a new line with quantity 1.
+
+        Args:
+            cart_id (int): Cart ID
+            product_id (int): Product ID (the caller checked it is in stock)
+
+        Returns:
+            bool: False when the line is already at the product's stock
+        """
+        same_line = (CartItem.cart_id == cart_id, CartItem.product_id == product_id)
+        added = CartService._increment(*same_line)
+        if not added:
+            if db.session.query(CartItem.id).filter(*same_line).first() is not None:
+                return False
+            try:
+                with db.session.begin_nested():
+                    db.session.add(CartItem(cart_id=cart_id, product_id=product_id, quantity=1))
+                added = 1
+            except IntegrityError:
+                # A concurrent request created the line (uq_cart_product): add to it
+                added = CartService._increment(*same_line)
+        CartService.adjust_item_count(cart_id, added)
+        return bool(added)
+
+    @staticmethod
+    def increment_line(cart_id: int, item_id: int) -> int:
+        """
+        +1 on a cart line, within its product's stock.
+
+        Returns:
+            int: Units added (0 at stock, or not a line of this cart)
+        """
+        added = CartService._increment(CartItem.id == item_id, CartItem.cart_id == cart_id)
+        CartService.adjust_item_count(cart_id, added)
+        return added
+
+    @staticmethod
+    def decrement_line(cart_id: int, item_id: int) -> int:
+        """
+        -1 on a cart line; a line at quantity 1 is deleted.
+
+        Returns:
+            int: Units removed (0 if the line is already gone)
+        """
+        line = (CartItem.id == item_id, CartItem.cart_id == cart_id)
+        removed = db.session.execute(
+            update(CartItem)
+            .where(*line, CartItem.quantity > 1)
+            .values(quantity=CartItem.quantity - 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not removed:
+            # Only the request that actually deletes the line counts it
+            removed = db.session.execute(
+                delete(CartItem)
+                .where(*line, CartItem.quantity == 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        CartService.adjust_item_count(cart_id, -removed)
+        return removed
+
+    @staticmethod
+    def remove_line(cart_id: int, item_id: int) -> int:
+        """
+        Delete a cart line.
+
+        The DELETE is conditional on the quantity just read (row locked
+        where the database supports FOR UPDATE); a concurrent change in
+        between makes it match nothing, and the line is read again.
+
+        Returns:
+            int: Units removed (0 if the line is already gone)
+        """
+        line = (CartItem.id == item_id, CartItem.cart_id == cart_id)
+        while True:
+            quantity = db.session.execute(
+                select(CartItem.quantity).where(*line).with_for_update()
+            ).scalar()
+            if quantity is None:
+                return 0
+            deleted = db.session.execute(
+                delete(CartItem)
+                .where(*line, CartItem.quantity == quantity)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if deleted:
+                CartService.adjust_item_count(cart_id, -quantity)
+                return quantity
+
+    @staticmethod
+    def adjust_item_count(cart_id: int, delta: int) -> None:
+        """
+        Atomically add `delta` to a cart's item_count.
+
+        Runs as UPDATE cart SET item_count = item_count + :delta, so
+        concurrent requests for the same cart cannot lose an update.
+        Does NOT commit: call it in the same transaction as the cart change,
+        then invalidate_item_count() after the commit.
+
+        Args:
+            cart_id (int): Cart ID
+            delta (int): Units added (positive) or removed (negative)
+        """
+        if not delta:
+            return
+        db.session.execute(
+            update(Cart)
+            .where(Cart.id == cart_id)
+            .values(item_count=Cart.item_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def recount_item_count(cart_id: int) -> None:
+        """
+        Set a cart's item_count to the SUM(quantity) of its lines.
+
+        For writes that set absolute quantities (bulk update): the count
+        comes from the rows as this transaction wrote them, whatever was
+        read before. Does NOT commit.
+
+        Args:
+            cart_id (int): Cart ID
+        """
+        units = (
+            select(func.coalesce(func.sum(CartItem.quantity), 0))
+            .where(CartItem.cart_id == cart_id)
+            .scalar_subquery()
+        )
+        db.session.execute(
+            update(Cart)
+            .where(Cart.id == cart_id)
+            .values(item_count=units)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def reset_item_count(cart_id: int) -> None:
+        """
+        Set a cart's item_count back to 0 (cart cleared).
+        Does NOT commit.
+
+        Args:
+            cart_id (int): Cart ID
+        """
+        db.session.execute(
+            update(Cart)
+            .where(Cart.id == cart_id)
+            .values(item_count=0)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def get_item_count(user_id: int) -> int:
+        """
+        Return the number of units in a user's cart.
+        Served from cache; a miss costs one indexed lookup (cart.user_id is unique).
+
+        Args:
+            user_id (int): User ID
+
+        Returns:
+            int: Total quantity in the cart (0 if the user has no cart)
+        """
+        def load():
+            return (
+                db.session.query(Cart.item_count)
+                .filter(Cart.user_id == user_id)
+                .scalar()
+            ) or 0
+
+        # Kept out of the per-worker L1: an invalidation in one worker
+        # must be seen by the next request, whichever worker serves it
+        return cache.get_or_load(
+            CART_COUNT_KEY.format(user_id=user_id),
+            load,
+            timeout=CART_COUNT_TIMEOUT,
+            local=False
+        )
+
+    @staticmethod
+    def invalidate_item_count(user_id: int) -> None:
+        """
+        Drop the cached badge count after a cart change has been committed.
+
+        Args:
+            user_id (int): User ID
+        """
+        cache.delete(CART_COUNT_KEY.format(user_id=user_id))
@@ -0,0 +1,477 @@
+"""
+catalog_service.py
+------------------
+Product listing for the home page, backed by a versioned page cache.
+
+How the cache works:
+- Every listing page is cached under its normalized (category, sort, position)
+  tuple, so "/?category=2&sort=price_desc&page=3" and "/" never share an entry
+- Each key also carries a catalog VERSION stamp
+    * one stamp per category  → used by filtered listings
+    * one "all" stamp         → used by the unfiltered listing
+- A catalog write (new product, admin edit, stock change at checkout)
+  bumps the stamps of the categories it touched, so only the affected
+  entries stop matching; everything else stays warm
+- Hit / miss counters let us check how much home-page traffic
+  still reaches MySQL
+
+How pagination works:
+- Pages are fetched with KEYSET (seek) pagination instead of LIMIT/OFFSET:
+  the next page starts right after the (sort value, id) of the last row shown,
+  so page 5,000 costs the same index seek as page 1
+- The position is passed around as an opaque cursor (?cursor=...)
+- Product counts come from a cached per-category counter instead of
+  a COUNT(*) on every request
+
+When CATALOG_SNAPSHOT_PATH is configured, listings are served from the
+shared memory-mapped snapshot instead (see catalog_snapshot.py).
+"""
+
+import math
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from website import cache, db
+from website.models import Category, Product
+from website.services.catalog_snapshot import CatalogSnapshotService
+from website.services.cursor import decode_cursor, encode_cursor, valid_id
+from website.routing import primary_reads, replica_lag_window
+
+
+# Sort options accepted from the URL (?sort=...)
+# Each maps to (column, descending)
+# Anything else falls back to the default "name_asc"
+SORT_OPTIONS = {
+    "name_asc": (Product.name, False),
+    "name_desc": (Product.name, True),
+    "price_asc": (Product.price, False),
+    "price_desc": (Product.price, True),
+}
+DEFAULT_SORT = "name_asc"
+
+# Bound for price cursor values (far above any real price, well inside a float)
+MAX_PRICE = 1e15
+
+# Number of products per listing page
+PER_PAGE = 6
+
+# Cache key prefixes
+VERSION_KEY = "catalog:version:{scope}"
+PAGE_KEY = "catalog:page:{scope}:{sort}:{position}:v{version}"
+COUNT_KEY = "catalog:count:{scope}"
+CATEGORIES_KEY = "catalog:categories"
+
+
+class CatalogService:
+    """Serves the product listing and keeps its page cache in sync with catalog writes."""
+
+    # Per-process hit/miss counters for the listing cache
+    # ("snapshot" = pages served from the mapped snapshot, no cache or SQL)
+    _stats = {"hits": 0, "misses": 0, "snapshot": 0}
+    _stats_lock = threading.Lock()
+
+    @staticmethod
+    def normalize_listing_args(
+        category_id: Optional[int],
+        sort: Optional[str],
+        page: Optional[int]
+    ) -> Tuple[Optional[int], str, int]:
+        """
+        Normalize raw query-string values into a canonical cache tuple.
+
+        Args:
+            category_id (int, optional): Selected category (None / 0 = all)
+            sort (str, optional): Requested sort option
+            page (int, optional): Requested page number
+
+        Returns:
+            tuple: (category_id or None, sort, page >= 1)
+        """
+        category_id = category_id or None
+        if sort not in SORT_OPTIONS:
+            sort = DEFAULT_SORT
+        page = page if page and page > 0 else 1
+        return category_id, sort, page
+
+    @staticmethod
+    def catalog_version(category_id: Optional[int] = None) -> int:
+        """
+        Return the current version stamp for a category (or for the whole catalog).
+
+        Args:
+            category_id (int, optional): Category ID, None for the unfiltered listing
+
+        Returns:
+            int: Version stamp (nanosecond timestamp of the last write)
+        """
+        # Version stamps skip the per-worker L1 so a bump is seen by every worker
+        key = VERSION_KEY.format(scope=category_id or "all")
+        version = cache.get(key, local=False)
+        if version is None:
+            # First read after a restart / eviction: start a fresh version
+            cache.add(key, time.time_ns(), timeout=0)
+            version = cache.get(key, local=False)
+        return version
+
+    @staticmethod
+    def bump_catalog_version(
+        category_ids: Iterable[int],
+        membership_changed: bool = False
+    ) -> None:
+        """
+        Invalidate cached listings for the given categories.
+        The unfiltered ("all") listing is always bumped too.
+
+        Call this AFTER the catalog write has been committed.
+
+        Args:
+            category_ids (Iterable[int]): Categories touched by the write
+            membership_changed (bool): True when products were added, removed
+                or moved between categories (product counts must be recomputed)
+        """
+        version = time.time_ns()
+        scopes = {category_id for category_id in category_ids if category_id}
+        scopes.add("all")
+        for scope in scopes:
+            cache.set(VERSION_KEY.format(scope=scope), version, timeout=0, local=False)
+            if membership_changed:
+                cache.delete(COUNT_KEY.format(scope=scope))
+
+        if CatalogSnapshotService.enabled():
+            CatalogSnapshotService.schedule_refresh()
+
+    @staticmethod
+    def categories_version() -> int:
+        """
+        Version stamp of the category list (filter menu fragments), bumped
+        by bump_categories_version().
+
+        Returns:
+            int: Version stamp (nanosecond timestamp of the last change)
+        """
+        # Same stamp mechanism as the listings, own scope
+        return CatalogService.catalog_version("categories")
+
+    @staticmethod
+    def bump_categories_version() -> None:
+        """
+        Categories were added, renamed or deleted: refresh the cached list,
+        the fragments rendered from it and the catalog snapshot. Call AFTER
+        the commit.
+        """
+        cache.delete(CATEGORIES_KEY)
+        cache.set(VERSION_KEY.format(scope="categories"), time.time_ns(), timeout=0, local=False)
+
+        # The snapshot's category table too (it notices the new stamp)
+        if CatalogSnapshotService.enabled():
+            CatalogSnapshotService.schedule_refresh()
+
+    @staticmethod
+    def listing_validator(category_id: Optional[int] = None) -> Tuple[tuple, datetime]:
+        """
+        What a listing page is built from, for its ETag / Last-Modified
+        (see conditional.py): no query, a cached stamp at most.
+
+        Args:
+            category_id (int, optional): Category filter
+
+        Returns:
+            tuple: ((source, stamp), time of the last catalog change, UTC)
+        """
+        if CatalogSnapshotService.enabled():
+            # Pages come from the snapshot, which trails the version bumps
+            # (a refresh swaps in a new file: new inode)
+            snapshot = CatalogSnapshotService.current()
+            return (
+                ("snapshot", snapshot.inode, snapshot.watermark),
+                datetime.fromtimestamp(snapshot.watermark / 1e6, timezone.utc)
+            )
+
+        version = CatalogService.catalog_version(category_id)
+        return ("cache", category_id, version), datetime.fromtimestamp(version / 1e9, timezone.utc)
+
+    @staticmethod
+    def get_listing_page(
+        category_id: Optional[int],
+        sort: str,
+        page: int,
+        cursor: Optional[str] = None
+    ) -> dict:
+        """
+        Return one page of the product listing, from cache when possible.
+
+        Args:
+            category_id (int, optional): Category filter
+            sort (str): One of SORT_OPTIONS
+            page (int): 1-based page number (display only when a cursor is given)
+            cursor (str, optional): Opaque position returned by a previous page
+
+        Returns:
+            dict: products, total, pages, prev/next page numbers and cursors
+        """
+        if CatalogSnapshotService.enabled():
+            # Pure array slicing over the shared snapshot (cursor not needed)
+            CatalogService._record(snapshot=True)
+            return CatalogSnapshotService.current().listing_page(
+                category_id, sort, page, PER_PAGE
+            )
+
+        seek = CatalogService._decode_cursor(cursor, sort)
+
+        # Cache position: the cursor when paging by keyset, else the page number.
+        # The page number is part of a cursor entry too: it is only display
+        # ("Page X of Y", prev/next numbers), but it is stored in the entry
+        position = f"{cursor}:p{page}" if seek else f"p{page}"
+        version = CatalogService.catalog_version(category_id)
+        key = PAGE_KEY.format(
+            scope=category_id or "all",
+            sort=sort,
+            position=position,
+            version=version
+        )
+
+        loaded = []
+
+        def load():
+            loaded.append(True)
+            with CatalogService._read_scope(version):
+                return CatalogService._load_listing_page(category_id, sort, page, seek)
+
+        # Concurrent misses on the same page share one query (single-flight)
+        listing = cache.get_or_load(
+            key,
+            load,
+            timeout=current_app.config.get("CATALOG_CACHE_TIMEOUT", 300)
+        )
+        CatalogService._record(hit=not loaded)
+        return listing
+
+    @staticmethod
+    def count_products(category_id: Optional[int] = None) -> int:
+        """
+        Return the number of products in a category (or in the whole catalog).
+        The count is cached until products are added, removed or moved.
+
+        Args:
+            category_id (int, optional): Category ID, None for all products
+
+        Returns:
+            int: Product count
+        """
+        def load():
+            query = db.session.query(db.func.count(Product.id))
+            if category_id:
+                query = query.filter(Product.category_id == category_id)
+            with CatalogService._read_scope(CatalogService.catalog_version(category_id)):
+                return query.scalar()
+
+        # Counts are dropped on membership changes: keep them out of L1
+        return cache.get_or_load(
+            COUNT_KEY.format(scope=category_id or "all"),
+            load,
+            timeout=current_app.config.get("CATALOG_CACHE_TIMEOUT", 300),
+            local=False
+        )
+
+    @staticmethod
+    def get_categories() -> List[dict]:
+        """
+        Return all categories (id, name) ordered by name, for the filter menu.
+
+        Returns:
+            List[dict]: Categories as plain dicts
+        """
+        def load():
+            return [
+                {"id": category.id, "name": category.name}
+                for category in Category.query.order_by(Category.name.asc()).all()
+            ]
+
+        return cache.get_or_load(
+            CATEGORIES_KEY,
+            load,
+            timeout=current_app.config.get("CATALOG_CACHE_TIMEOUT", 300)
+        )
+
+    @staticmethod
+    def cache_stats() -> dict:
+        """
+        Return hit/miss counters for the listing cache in this process.
+
+        Returns:
+            dict: hits, misses, snapshot and hit_ratio
+            (snapshot pages count as hits: they never touch MySQL)
+        """
+        with CatalogService._stats_lock:
+            hits = CatalogService._stats["hits"]
+            misses = CatalogService._stats["misses"]
+            snapshot = CatalogService._stats["snapshot"]
+        total = hits + misses + snapshot
+        return {
+            "hits": hits,
+            "misses": misses,
+            "snapshot": snapshot,
+            "hit_ratio": (hits + snapshot) / total if total else 0.0,
+        }
+
+    # --------------------------------------------------
+    # Internal helpers
+    # --------------------------------------------------
+    @staticmethod
+    def _read_scope(version: int):
+        """
+        Where a cache refill may read from.
+
+        Right after a write bumped `version`, the replica may not have the
+        change yet; a page cached from it would stay stale for the whole
+        cache timeout, for everyone. Refills that young read the primary.
+        """
+        if time.time_ns() - version < replica_lag_window() * 1e9:
+            return primary_reads()
+        return nullcontext()
+
+    @staticmethod
+    def _record(hit: bool = False, snapshot: bool = False) -> None:
+        counter = "snapshot" if snapshot else "hits" if hit else "misses"
+        with CatalogService._stats_lock:
+            CatalogService._stats[counter] += 1
+
+    @staticmethod
+    def _encode_cursor(sort: str, row, direction: str) -> str:
+        """Pack (sort, last sort value, last id, direction) into a URL-safe token."""
+        column, _ = SORT_OPTIONS[sort]
+        return encode_cursor(sort, getattr(row, column.key), row.id, direction)
+
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str], sort: str) -> Optional[tuple]:
+        """
+        Unpack a cursor produced by _encode_cursor.
+
+        Returns:
+            tuple | None: (sort value, id, direction), None if the cursor is
+            missing, malformed or was issued for a different sort order
+            (the listing falls back to page 1: nothing unchecked reaches SQL)
+        """
+        values = decode_cursor(cursor, 4)
+        if values is None:
+            return None
+        cursor_sort, value, last_id, direction = values
+        if cursor_sort != sort or direction not in ("next", "prev"):
+            return None
+        if not valid_id(last_id):
+            return None
+
+        column, _ = SORT_OPTIONS[sort]
+        if column is Product.price:
+            # A finite number a FLOAT column can hold (JSON also gives
+            # bools, lists, dicts, null and ints of any size)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            if not (math.isfinite(value) and abs(value) <= MAX_PRICE):
+                return None
+        elif not isinstance(value, str) or len(value) > column.type.length:
+            return None
+        return value, last_id, direction
+
+    @staticmethod
+    def _load_listing_page(
+        category_id: Optional[int],
+        sort: str,
+        page: int,
+        seek: Optional[tuple]
+    ) -> dict:
+        """Run the keyset query and convert the rows into a cacheable dict."""
+        column, descending = SORT_OPTIONS[sort]
+        forward = seek is None or seek[2] == "next"
+
+        query = (
+            db.session.query(
+                Product.id,
+                Product.name,
+                Product.price,
+                Category.name.label("category_name")
+            )
+            .join(Category, Product.category_id == Category.id)
+        )
+
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+
+        # Walking backwards (prev page) = scanning the index in reverse
+        scan_descending = descending if forward else not descending
+
+        if seek:
+            value, last_id, _ = seek
+            if scan_descending:
+                query = query.filter(or_(
+                    column < value,
+                    and_(column == value, Product.id < last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    column > value,
+                    and_(column == value, Product.id > last_id)
+                ))
+
+        # Tie-break on id so pages are stable when names/prices repeat
+        if scan_descending:
+            query = query.order_by(column.desc(), Product.id.desc())
+        else:
+            query = query.order_by(column.asc(), Product.id.asc())
+
+        # Legacy ?page=N links without a cursor still work (OFFSET),
+        # every link we render from here on carries a cursor
+        if not seek and page > 1:
+            query = query.offset((page - 1) * PER_PAGE)
+
+        # Fetch one extra row to know whether there is another page
+        rows = query.limit(PER_PAGE + 1).all()
+        has_more = len(rows) > PER_PAGE
+        rows = rows[:PER_PAGE]
+
+        if forward:
+            has_next = has_more
+            has_prev = seek is not None or page > 1
+        else:
+            rows.reverse()
+            has_next = True
+            has_prev = has_more
+
+        if not has_prev:
+            page = 1
+
+        total = CatalogService.count_products(category_id)
+        pages = (total + PER_PAGE - 1) // PER_PAGE
+
+        return {
+            "products": [
+                {
+                    "id": row.id,
+                    "name": row.name,
+                    "price": row.price,
+                    "category_name": row.category_name,
+                }
+                for row in rows
+            ],
+            "total": total,
+            "pages": pages,
+            "page": page,
+            "has_prev": has_prev and bool(rows),
+            "prev_num": page - 1 if has_prev else None,
+            "prev_cursor": (
+                CatalogService._encode_cursor(sort, rows[0], "prev")
+                if has_prev and rows else None
+            ),
+            "has_next": has_next and bool(rows),
+            "next_num": page + 1 if has_next else None,
+            "next_cursor": (
+                CatalogService._encode_cursor(sort, rows[-1], "next")
+                if has_next and rows else None
+            ),
+        }
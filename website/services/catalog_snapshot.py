@@ -0,0 +1,586 @@
+"""
+catalog_snapshot.py
+-------------------
+Columnar, memory-mapped snapshot of the product catalog.
+
+Why this file exists:
+- Every worker used to build Product / Category ORM objects for every
+  home page render
+- The snapshot stores the catalog ONCE in a compact binary file that every
+  worker maps read-only, so the OS shares the same pages between processes
+  (memory stays flat as workers are added)
+- Listings become pure array slicing: no SQL, no ORM objects
+
+File layout (native byte order, every section 8-byte aligned):
+    header           magic, format version, counts, watermark,
+                     categories version (see below)
+    ids              int64[n]    product ids, ascending (row order)
+    prices           float64[n]
+    stock            int32[n]    patched in place on stock-only changes
+    category_ids     int32[n]
+    name_offsets     uint32[n+1] → names blob (utf-8)
+    perm_<sort>_all  int32[n]    row indexes in listing order, one per sort
+    perm_<sort>_cat  int32[n]    same, grouped by category
+    cat_ids          int32[m]    ascending
+    cat_start        int32[m]    first slot of the category in perm_<sort>_cat
+    cat_count        int32[m]
+    cat_name_offsets uint32[m+1] → category names blob
+
+Updates:
+- Product.updated_at is the change feed: a refresh only reads rows
+  updated since the snapshot watermark
+- Deleted products leave nothing in that feed: each refresh compares the
+  product count with what the snapshot plus the feed explain, and when
+  rows are missing it diffs the ids and drops the deleted ones
+- Category names are not in that feed: the file records the
+  categories_version() stamp it was written with, and a refresh that
+  finds another stamp (bump_categories_version after a rename) rewrites
+  the category table
+- Stock-only changes are written into the live file in place
+- Anything that changes ordering (new product, price/name/category edit)
+  writes a new file next to the old one and swaps it in with os.replace();
+  readers notice the new inode and remap
+"""
+
+import bisect
+import calendar
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from datetime import datetime, timedelta
+from typing import Optional
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from website import db
+from website.models import Category, Product
+
+
+MAGIC = b"CSNP"
+FORMAT_VERSION = 2
+
+# magic, format version, products, categories, watermark (µs), names bytes,
+# category names bytes, categories version
+HEADER = struct.Struct("=4sIIIqQQq")
+HEADER_SIZE = 64
+
+# Sort orders stored in the file (same names as the ?sort= options)
+SNAPSHOT_SORTS = ("name_asc", "name_desc", "price_asc", "price_desc")
+
+# Rows committed slightly out of order can carry an updated_at just below
+# the watermark, so every refresh re-reads this much history (idempotent)
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _layout(n: int, m: int, names_len: int, cat_names_len: int) -> list:
+    """Return [(section, typecode, length)] in file order."""
+    sections = [
+        ("ids", "q", n),
+        ("prices", "d", n),
+        ("stock", "i", n),
+        ("category_ids", "i", n),
+        ("name_offsets", "I", n + 1),
+        ("names", "B", names_len),
+    ]
+    for sort in SNAPSHOT_SORTS:
+        sections.append((f"perm_{sort}_all", "i", n))
+        sections.append((f"perm_{sort}_cat", "i", n))
+    sections += [
+        ("cat_ids", "i", m),
+        ("cat_start", "i", m),
+        ("cat_count", "i", m),
+        ("cat_name_offsets", "I", m + 1),
+        ("cat_names", "B", cat_names_len),
+    ]
+    return sections
+
+
+def _section_offsets(sections: list) -> dict:
+    """Return {section: (offset, typecode, length)}."""
+    offsets = {}
+    position = HEADER_SIZE
+    for name, typecode, length in sections:
+        offsets[name] = (position, typecode, length)
+        size = array(typecode).itemsize * length
+        position += size + (-size % 8)
+    return offsets
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    return calendar.timegm(value.timetuple()) * 1_000_000 + value.microsecond
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+# ==================================================
+# READ SIDE (one mapping per process)
+# ==================================================
+class CatalogSnapshot:
+    """A read-only view over one snapshot file."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as handle:
+            self.inode = os.fstat(handle.fileno()).st_ino
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, n, m, _, names_len, cat_names_len,
+         categories_version) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a catalog snapshot (v{FORMAT_VERSION})")
+
+        self.size = n
+        # categories_version() the category table was written with
+        self.categories_version = categories_version
+        self.offsets = _section_offsets(_layout(n, m, names_len, cat_names_len))
+
+        view = memoryview(self._map)
+        for name, (offset, typecode, length) in self.offsets.items():
+            size = array(typecode).itemsize * length
+            section = view[offset:offset + size]
+            setattr(self, name, section if typecode == "B" else section.cast(typecode))
+
+    @property
+    def watermark(self) -> int:
+        """updated_at (µs since epoch) of the newest row in the file."""
+        return HEADER.unpack_from(self._map, 0)[4]
+
+    def category_index(self, category_id: int) -> Optional[int]:
+        """Position of a category in the cat_* arrays, None if unknown."""
+        index = bisect.bisect_left(self.cat_ids, category_id)
+        if index < len(self.cat_ids) and self.cat_ids[index] == category_id:
+            return index
+        return None
+
+    def row_index(self, product_id: int) -> Optional[int]:
+        """Row of a product in the column arrays, None if unknown."""
+        index = bisect.bisect_left(self.ids, product_id)
+        if index < self.size and self.ids[index] == product_id:
+            return index
+        return None
+
+    def category_name(self, index: int) -> str:
+        start, end = self.cat_name_offsets[index], self.cat_name_offsets[index + 1]
+        return bytes(self.cat_names[start:end]).decode()
+
+    def product(self, row: int) -> dict:
+        """Materialize one row as the dict shape used by listing templates."""
+        start, end = self.name_offsets[row], self.name_offsets[row + 1]
+        category_index = self.category_index(self.category_ids[row])
+        return {
+            "id": self.ids[row],
+            "name": bytes(self.names[start:end]).decode(),
+            "price": self.prices[row],
+            "stock": self.stock[row],
+            "category_name": (
+                self.category_name(category_index) if category_index is not None else ""
+            ),
+        }
+
+    def listing_page(self, category_id: Optional[int], sort: str, page: int, per_page: int) -> dict:
+        """
+        Return one listing page by slicing the pre-sorted permutation arrays.
+
+        Args:
+            category_id (int, optional): Category filter
+            sort (str): One of SNAPSHOT_SORTS
+            page (int): 1-based page number
+            per_page (int): Page size
+
+        Returns:
+            dict: Same shape as CatalogService.get_listing_page()
+        """
+        if category_id:
+            index = self.category_index(category_id)
+            start = self.cat_start[index] if index is not None else 0
+            total = self.cat_count[index] if index is not None else 0
+            permutation = getattr(self, f"perm_{sort}_cat")
+        else:
+            start, total = 0, self.size
+            permutation = getattr(self, f"perm_{sort}_all")
+
+        pages = (total + per_page - 1) // per_page
+        offset = (page - 1) * per_page
+        rows = permutation[start + offset:start + min(offset + per_page, total)] if offset < total else []
+
+        return {
+            "products": [self.product(row) for row in rows],
+            "total": total,
+            "pages": pages,
+            "page": page,
+            "has_prev": page > 1,
+            "prev_num": page - 1 if page > 1 else None,
+            "prev_cursor": None,
+            "has_next": page < pages,
+            "next_num": page + 1 if page < pages else None,
+            "next_cursor": None,
+        }
+
+    def columns(self) -> dict:
+        """Copy every product column out of the file (used by the writer to merge changes)."""
+        names = [
+            bytes(self.names[self.name_offsets[row]:self.name_offsets[row + 1]]).decode()
+            for row in range(self.size)
+        ]
+        return {
+            "ids": list(self.ids),
+            "prices": list(self.prices),
+            "stock": list(self.stock),
+            "category_ids": list(self.category_ids),
+            "names": names,
+        }
+
+
+# ==================================================
+# WRITE SIDE + PROCESS-WIDE ACCESS
+# ==================================================
+class CatalogSnapshotService:
+    """Builds, refreshes and serves the memory-mapped catalog snapshot."""
+
+    _snapshot: Optional[CatalogSnapshot] = None
+    _map_lock = threading.Lock()
+
+    # Background refresh state (one refresh at a time per process)
+    _refresh_lock = threading.Lock()
+    _refresh_pending = False
+    _refresh_running = False
+
+    @staticmethod
+    def path() -> Optional[str]:
+        """Snapshot file path, None when the snapshot is disabled."""
+        return current_app.config.get("CATALOG_SNAPSHOT_PATH")
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(CatalogSnapshotService.path())
+
+    @staticmethod
+    def current() -> CatalogSnapshot:
+        """
+        Return this process's mapping of the snapshot, remapping when the file
+        has been swapped and building it the first time it is needed.
+        """
+        path = CatalogSnapshotService.path()
+        if not os.path.exists(path):
+            CatalogSnapshotService.refresh()
+
+        snapshot = CatalogSnapshotService._snapshot
+        if snapshot is None or snapshot.inode != os.stat(path).st_ino:
+            with CatalogSnapshotService._map_lock:
+                snapshot = CatalogSnapshotService._snapshot
+                if snapshot is None or snapshot.inode != os.stat(path).st_ino:
+                    try:
+                        snapshot = CatalogSnapshot(path)
+                    except ValueError:
+                        # Written by another FORMAT_VERSION (deploy): rebuild it
+                        CatalogSnapshotService.refresh()
+                        snapshot = CatalogSnapshot(path)
+                    CatalogSnapshotService._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def schedule_refresh() -> None:
+        """
+        Refresh the snapshot in a background thread.
+        Calls made while a refresh is running are coalesced into one more pass.
+        """
+        with CatalogSnapshotService._refresh_lock:
+            CatalogSnapshotService._refresh_pending = True
+            if CatalogSnapshotService._refresh_running:
+                return
+            CatalogSnapshotService._refresh_running = True
+
+        app = current_app._get_current_object()
+
+        def run():
+            while True:
+                with CatalogSnapshotService._refresh_lock:
+                    if not CatalogSnapshotService._refresh_pending:
+                        CatalogSnapshotService._refresh_running = False
+                        return
+                    CatalogSnapshotService._refresh_pending = False
+                try:
+                    with app.app_context():
+                        CatalogSnapshotService.refresh()
+                except Exception:
+                    app.logger.exception("Catalog snapshot refresh failed")
+
+        threading.Thread(target=run, name="catalog-snapshot-refresh", daemon=True).start()
+
+    @staticmethod
+    def refresh(full: bool = False) -> str:
+        """
+        Bring the snapshot file up to date with the database.
+
+        Only rows with updated_at after the snapshot watermark are read
+        (plus a count to notice deleted products). Stock-only changes are
+        patched in place; anything else, deletions and category renames
+        (categories_version) included, rewrites the file and swaps it in
+        atomically. The file lock keeps writers in
+        different processes from interleaving.
+
+        Args:
+            full (bool): Ignore the existing file and rebuild from scratch
+
+        Returns:
+            str: "built", "patched", "rewritten" or "unchanged"
+        """
+        path = CatalogSnapshotService.path()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with open(path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not full and os.path.exists(path):
+                    try:
+                        return CatalogSnapshotService._refresh_incremental(path)
+                    except ValueError:
+                        # Another FORMAT_VERSION: nothing to refresh from
+                        pass
+                CatalogSnapshotService._write(path, CatalogSnapshotService._load_all())
+                return "built"
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --------------------------------------------------
+    # Internal helpers
+    # --------------------------------------------------
+    @staticmethod
+    def _product_rows(since: Optional[datetime] = None):
+        query = db.session.query(
+            Product.id,
+            Product.name,
+            Product.price,
+            Product.stock,
+            Product.category_id,
+            Product.updated_at
+        )
+        if since is not None:
+            query = query.filter(Product.updated_at >= since)
+        return query.order_by(Product.id).yield_per(10_000)
+
+    @staticmethod
+    def _load_all() -> dict:
+        columns = {"ids": [], "prices": [], "stock": [], "category_ids": [], "names": []}
+        watermark = 0
+        for row in CatalogSnapshotService._product_rows():
+            columns["ids"].append(row.id)
+            columns["prices"].append(row.price)
+            columns["stock"].append(row.stock)
+            columns["category_ids"].append(row.category_id)
+            columns["names"].append(row.name)
+            watermark = max(watermark, _to_micros(row.updated_at))
+        columns["watermark"] = watermark
+        return columns
+
+    @staticmethod
+    def _categories_version() -> int:
+        # Imported here: catalog_service imports this module
+        from website.services.catalog_service import CatalogService
+        return CatalogService.categories_version()
+
+    @staticmethod
+    def _deleted_ids(snapshot: CatalogSnapshot, total: int, changed: list) -> set:
+        """
+        Ids in the snapshot that are no longer in the product table.
+
+        `total` is the product count taken BEFORE reading the change feed:
+        a product inserted in between can only make the count look short
+        (one extra id comparison), never hide a deletion.
+        """
+        new = sum(1 for row in changed if snapshot.row_index(row.id) is None)
+        if total >= snapshot.size + new:
+            return set()
+        live = {product_id for (product_id,) in db.session.query(Product.id).yield_per(50_000)}
+        return {product_id for product_id in snapshot.ids if product_id not in live}
+
+    @staticmethod
+    def _refresh_incremental(path: str) -> str:
+        snapshot = CatalogSnapshot(path)
+        categories_changed = snapshot.categories_version != CatalogSnapshotService._categories_version()
+        since = _from_micros(snapshot.watermark) - REFRESH_OVERLAP
+        total = db.session.query(func.count(Product.id)).scalar()
+        changed = list(CatalogSnapshotService._product_rows(since))
+        deleted = CatalogSnapshotService._deleted_ids(snapshot, total, changed)
+
+        watermark = max(
+            [snapshot.watermark] + [_to_micros(row.updated_at) for row in changed]
+        )
+
+        stock_patches = []
+        structural = []
+        for row in changed:
+            index = snapshot.row_index(row.id)
+            if index is None:
+                structural.append(row)
+                continue
+            current = snapshot.product(index)
+            if (
+                current["name"] != row.name
+                or current["price"] != row.price
+                or snapshot.category_ids[index] != row.category_id
+            ):
+                structural.append(row)
+            elif current["stock"] != row.stock:
+                stock_patches.append((index, row.stock))
+
+        if structural or deleted or categories_changed:
+            # (_write re-reads the category table)
+            columns = snapshot.columns()
+            if deleted:
+                keep = [index for index, product_id in enumerate(columns["ids"]) if product_id not in deleted]
+                for name in ("ids", "prices", "stock", "category_ids", "names"):
+                    columns[name] = [columns[name][index] for index in keep]
+            position = {product_id: index for index, product_id in enumerate(columns["ids"])}
+            for row in changed:
+                index = position.get(row.id)
+                if index is None:
+                    position[row.id] = len(columns["ids"])
+                    columns["ids"].append(row.id)
+                    columns["prices"].append(row.price)
+                    columns["stock"].append(row.stock)
+                    columns["category_ids"].append(row.category_id)
+                    columns["names"].append(row.name)
+                else:
+                    columns["prices"][index] = row.price
+                    columns["stock"][index] = row.stock
+                    columns["category_ids"][index] = row.category_id
+                    columns["names"][index] = row.name
+            columns["watermark"] = watermark
+            CatalogSnapshotService._write(path, columns)
+            return "rewritten"
+
+        if stock_patches or watermark != snapshot.watermark:
+            # Readers map the same file (MAP_SHARED) and see these writes directly
+            stock_offset = snapshot.offsets["stock"][0]
+            with open(path, "r+b") as handle:
+                for index, stock in stock_patches:
+                    handle.seek(stock_offset + index * 4)
+                    handle.write(struct.pack("=i", stock))
+                handle.seek(0)
+                header = list(HEADER.unpack(handle.read(HEADER.size)))
+                header[4] = watermark
+                handle.seek(0)
+                handle.write(HEADER.pack(*header))
+            return "patched"
+
+        return "unchanged"
+
+    @staticmethod
+    def _write(path: str, columns: dict) -> None:
+        """Serialize the columns into a new file and atomically swap it in."""
+        # Keep rows ordered by id (binary search in CatalogSnapshot.row_index)
+        order = sorted(range(len(columns["ids"])), key=columns["ids"].__getitem__)
+        ids = [columns["ids"][i] for i in order]
+        prices = [columns["prices"][i] for i in order]
+        stock = [columns["stock"][i] for i in order]
+        category_ids = [columns["category_ids"][i] for i in order]
+        names = [columns["names"][i] for i in order]
+        n = len(ids)
+
+        encoded_names = [name.encode() for name in names]
+        name_offsets = array("I", [0])
+        for encoded in encoded_names:
+            name_offsets.append(name_offsets[-1] + len(encoded))
+
+        # Stamp read before the categories: a rename committed in between
+        # leaves an older stamp in the file, so the next refresh rewrites again
+        categories_version = CatalogSnapshotService._categories_version()
+        categories = (
+            db.session.query(Category.id, Category.name).order_by(Category.id).all()
+        )
+        cat_ids = array("i", [category.id for category in categories])
+        encoded_cat_names = [category.name.encode() for category in categories]
+        cat_name_offsets = array("I", [0])
+        for encoded in encoded_cat_names:
+            cat_name_offsets.append(cat_name_offsets[-1] + len(encoded))
+
+        data = {
+            "ids": array("q", ids),
+            "prices": array("d", prices),
+            "stock": array("i", stock),
+            "category_ids": array("i", category_ids),
+            "name_offsets": name_offsets,
+            "names": b"".join(encoded_names),
+            "cat_ids": cat_ids,
+            "cat_name_offsets": cat_name_offsets,
+            "cat_names": b"".join(encoded_cat_names),
+        }
+
+        # Listing order: (key, id) ascending, descending is the exact reverse.
+        # Names sort case-insensitively, like MySQL's default collation.
+        name_keys = [name.casefold() for name in names]
+        sort_keys = {"name": name_keys, "price": prices}
+        cat_start, cat_count = array("i"), array("i")
+        for field in ("name", "price"):
+            keys = sort_keys[field]
+            ascending = sorted(range(n), key=lambda row: (keys[row], ids[row]))
+            for direction, permutation in (("asc", ascending), ("desc", ascending[::-1])):
+                # Stable sort by category keeps the listing order inside each group
+                by_category = sorted(permutation, key=category_ids.__getitem__)
+                data[f"perm_{field}_{direction}_all"] = array("i", permutation)
+                data[f"perm_{field}_{direction}_cat"] = array("i", by_category)
+
+        # Category offsets are the same for every grouped permutation
+        grouped = data["perm_name_asc_cat"]
+        for category_id in cat_ids:
+            start = bisect.bisect_left(grouped, category_id, key=category_ids.__getitem__)
+            end = bisect.bisect_right(grouped, category_id, key=category_ids.__getitem__)
+            cat_start.append(start)
+            cat_count.append(end - start)
+        data["cat_start"] = cat_start
+        data["cat_count"] = cat_count
+
+        sections = _layout(n, len(cat_ids), len(data["names"]), len(data["cat_names"]))
+        offsets = _section_offsets(sections)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".catalog-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(HEADER.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    n,
+                    len(cat_ids),
+                    columns["watermark"],
+                    len(data["names"]),
+                    len(data["cat_names"]),
+                    categories_version
+                ).ljust(HEADER_SIZE, b"\0"))
+                for name, _, _ in sections:
+                    offset = offsets[name][0]
+                    handle.write(b"\0" * (offset - handle.tell()))
+                    payload = data[name]
+                    handle.write(payload if isinstance(payload, bytes) else payload.tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+@click.command("build-catalog-snapshot")
+@click.option("--full", is_flag=True, help="Rebuild from scratch instead of refreshing.")
+@with_appcontext
+def build_catalog_snapshot_command(full):
+    """Build or refresh the memory-mapped catalog snapshot."""
+    if not CatalogSnapshotService.enabled():
+        raise click.ClickException("CATALOG_SNAPSHOT_PATH is not configured")
+    result = CatalogSnapshotService.refresh(full=full)
+    click.echo(f"Catalog snapshot {result}: {CatalogSnapshotService.path()}")
@@ -0,0 +1,58 @@
+"""
+cursor.py
+---------
+Opaque pagination cursors shared by the keyset-paginated listings.
+
+A cursor is just the sort-key values of the last row shown, packed as
+URL-safe base64 JSON. Callers must validate what they decode: a cursor
+comes straight from the query string.
+"""
+
+import base64
+import json
+from typing import Optional
+
+# Largest id a database column can hold (signed 64-bit): anything bigger
+# fails in the driver (OverflowError) instead of matching no rows
+MAX_ID = 2**63 - 1
+
+
+def encode_cursor(*values) -> str:
+    """
+    Pack JSON-serializable values into a URL-safe token.
+
+    Args:
+        *values: Sort-key values (and any tag the caller wants to check later)
+
+    Returns:
+        str: Opaque cursor
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """
+    Unpack a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str, optional): Token from the query string
+        size (int): Number of values the caller expects
+
+    Returns:
+        list | None: The values, None if missing or malformed
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def valid_id(value) -> bool:
+    """True for an int that fits an id column (bool is not an id)."""
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_ID
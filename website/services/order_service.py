@@ -1,23 +1,38 @@
 from website.models import Cart, CartItem, Order, OrderItem, Product, User
 from website import db
-from typing import Optional
+from website.services.cart_service import CartService
+from website.services.payment_service import PaymentService
+from website.services.cursor import decode_cursor, encode_cursor, valid_id
+from website.tasks import enqueue_checkout_jobs
+from datetime import datetime
+from sqlalchemy import and_, case, delete, insert, or_, update
+from sqlalchemy.orm import selectinload
+from typing import Iterable, List, Optional, Tuple
+
+
+class InsufficientStockError(Exception):
+    """Raised when a stock reservation cannot be satisfied for every line."""
 
 
 class OrderService:
     """Handles all order-related operations: calculating totals, checkout, and order creation."""
 
     @staticmethod
-    def calculate_cart_total(cart: Cart) -> float:
+    def calculate_cart_total(cart: Cart, items=None) -> float:
         """
         Calculate the total price for a cart.
         
         Args:
             cart (Cart): The user's cart
+            items (List[CartItem], optional): Cart lines already loaded with
+                their products; avoids loading cart.items a second time
         
         Returns:
             float: Total amount
         """
-        return sum(item.product.price * item.quantity for item in cart.items)
+        if items is None:
+            items = cart.items
+        return sum(item.product.price * item.quantity for item in items)
 
     @staticmethod
     def validate_cart_stock(cart: Cart) -> bool:
@@ -41,30 +56,92 @@ class OrderService:
     @staticmethod
     def clear_cart(cart: Cart) -> None:
         """
-        Delete all items from the cart.
+        Delete all items from the cart with ONE bulk DELETE
+        and reset its item_count.
+
+        Does NOT commit: the caller owns the transaction.
+        Call CartService.invalidate_item_count() after the commit.
         
         Args:
             cart (Cart)
         """
-        CartItem.query.filter_by(cart_id=cart.id).delete()
-        db.session.commit()
+        db.session.execute(
+            delete(CartItem)
+            .where(CartItem.cart_id == cart.id)
+            .execution_options(synchronize_session=False)
+        )
+        CartService.reset_item_count(cart.id)
+
+    @staticmethod
+    def reserve_stock(items: Iterable[CartItem]) -> None:
+        """
+        Atomically decrement stock for every line, or for none of them.
+
+        All lines go out as ONE conditional UPDATE:
+
+            UPDATE product
+               SET stock = stock - CASE id WHEN :id THEN :qty ... END
+             WHERE id IN (...)
+               AND stock >= CASE id WHEN :id THEN :qty ... END
+
+        The database checks and decrements each row under its row lock, so two
+        concurrent checkouts of the last unit cannot both succeed. Rows are
+        locked in primary-key (product id) order, so concurrent checkouts of
+        overlapping carts do not deadlock.
+
+        Does NOT commit: the caller owns the transaction and must roll back
+        when this raises.
+
+        Args:
+            items (Iterable[CartItem]): Cart lines to reserve
+
+        Raises:
+            InsufficientStockError if any product has less stock than requested
+        """
+        quantities = {}
+        for item in items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        if not quantities:
+            return
+
+        quantities = dict(sorted(quantities.items()))
+        requested = case(quantities, value=Product.id)
+
+        result = db.session.execute(
+            update(Product)
+            .where(Product.id.in_(list(quantities)))
+            .where(Product.stock >= requested)
+            .values(stock=Product.stock - requested)
+            .execution_options(synchronize_session=False)
+        )
+
+        if result.rowcount != len(quantities):
+            raise InsufficientStockError("Insufficient stock for one or more items")
 
     @staticmethod
     def reduce_stock(cart: Cart) -> None:
         """
         Reduce stock of all products in the cart.
+
+        Does NOT commit: the caller owns the transaction.
         
         Args:
             cart (Cart)
+
+        Raises:
+            InsufficientStockError if any item has insufficient stock
         """
-        for item in cart.items:
-            item.product.stock -= item.quantity
-        db.session.commit()
+        OrderService.reserve_stock(cart.items)
 
     @staticmethod
     def create_order_from_cart(cart: Cart) -> Optional[Order]:
         """
         Create an Order and associated OrderItems from a cart.
+
+        The order row is flushed to get its id, then every order line
+        goes out as ONE multi-row INSERT.
+
+        Does NOT commit: the caller owns the transaction.
         
         Args:
             cart (Cart)
@@ -79,46 +156,151 @@ class OrderService:
         db.session.add(order)
         db.session.flush()  # assign order.id before creating items
 
-        for item in cart.items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item.product.id,
-                quantity=item.quantity,
-                price=item.product.price
-            )
-            db.session.add(order_item)
-
-        db.session.commit()
+        db.session.execute(
+            insert(OrderItem.__table__).values([
+                {
+                    "order_id": order.id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "price": item.product.price,
+                }
+                for item in cart.items
+            ])
+        )
         return order
 
     @staticmethod
-    def checkout_cart(cart: Cart) -> Order:
+    def checkout_cart(cart: Cart, user: User) -> Order:
         """
-        Complete checkout process:
-        1. Validate stock
-        2. Reduce stock
-        3. Create Order + OrderItems
-        4. Clear cart
+        Complete checkout process in ONE transaction:
+        1. Reserve stock (one conditional UPDATE)
+        2. Create Order + OrderItems (one INSERT each)
+        3. Record the payment
+        4. Clear cart (one DELETE + item_count reset)
+        5. Queue the side work (confirmation, rollups) as background jobs
+        6. Commit once
+
+        The number of database round trips is the same for 1 line or 100,
+        as long as the cart was loaded with its items and products
+        (joinedload(Cart.items).joinedload(CartItem.product)).
+
+        On failure nothing is committed; the caller should roll back.
         
         Args:
-            cart (Cart)
+            cart (Cart): The user's cart
+            user (User): The user checking out (charged for the order)
         
         Returns:
             Order: The completed order
+
+        Raises:
+            InsufficientStockError if any item has insufficient stock
         """
         if not cart or not cart.items:
             raise Exception("Cart is empty")
 
-        # Step 1: Validate stock
-        OrderService.validate_cart_stock(cart)
-
-        # Step 2: Reduce stock
+        # Step 1: Reserve stock (atomic, fails instead of overselling)
         OrderService.reduce_stock(cart)
 
-        # Step 3: Create order and items
+        # Step 2: Create order and items
         order = OrderService.create_order_from_cart(cart)
 
+        # Step 3: Payment (added to the same transaction)
+        PaymentService.process_payment(
+            user=user,
+            amount=order.total_amount,
+            order=order,
+            commit=False
+        )
+
         # Step 4: Clear cart
         OrderService.clear_cart(cart)
 
+        # Step 5: Side work runs after the response, in a job worker; the
+        # jobs commit with the order, so they exist if and only if it does
+        enqueue_checkout_jobs(order)
+
+        # Step 6: Single commit for the whole checkout
+        db.session.commit()
+
         return order
+
+    @staticmethod
+    def latest_order(user_id: int) -> Optional[Tuple[int, datetime]]:
+        """
+        The user's newest order, for the order history ETag (see conditional.py).
+        One index-only lookup on (user_id, created_at, id).
+
+        Args:
+            user_id (int): User ID
+
+        Returns:
+            tuple | None: (order id, created_at), None when the user has no order
+        """
+        row = (
+            db.session.query(Order.id, Order.created_at)
+            .filter(Order.user_id == user_id)
+            .order_by(Order.created_at.desc(), Order.id.desc())
+            .first()
+        )
+        return tuple(row) if row else None
+
+    @staticmethod
+    def get_order_history(
+        user_id: int,
+        cursor: Optional[str] = None,
+        per_page: int = 10
+    ) -> Tuple[List[Order], Optional[str]]:
+        """
+        Return one page of a user's orders, newest first.
+
+        Pages are keyset-paginated on (created_at, id), backed by the
+        (user_id, created_at, id) index, and items, products and payments
+        are loaded with selectinload: one page costs the same fixed number
+        of queries however many orders the user has.
+
+        Args:
+            user_id (int): Whose orders
+            cursor (str, optional): Position returned by the previous page
+            per_page (int): Orders per page
+
+        Returns:
+            tuple: (orders, cursor for the next (older) page or None)
+        """
+        query = (
+            Order.query
+            .options(
+                selectinload(Order.items).selectinload(OrderItem.product),
+                selectinload(Order.payment)
+            )
+            .filter(Order.user_id == user_id)
+        )
+
+        position = decode_cursor(cursor, 2)
+        if position is not None:
+            try:
+                created_at, last_id = datetime.fromisoformat(position[0]), position[1]
+            except (TypeError, ValueError):
+                created_at = None
+            if not valid_id(last_id):
+                created_at = None
+            if created_at is not None:
+                query = query.filter(or_(
+                    Order.created_at < created_at,
+                    and_(Order.created_at == created_at, Order.id < last_id)
+                ))
+
+        orders = (
+            query
+            .order_by(Order.created_at.desc(), Order.id.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+
+        next_cursor = None
+        if len(orders) > per_page:
+            orders = orders[:per_page]
+            last = orders[-1]
+            next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+
+        return orders, next_cursor
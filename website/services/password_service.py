@@ -0,0 +1,172 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# Werkzeug's defaults for parameters a method string may leave out
+_PBKDF2_ITERATIONS = 600_000
+_SCRYPT_PARAMS = (2**15, 8, 1)
+
+
+def _parse_method(method: str) -> tuple:
+    """
+    Split a Werkzeug method string into (family, parameters).
+
+    "pbkdf2:sha256:600000" → ("pbkdf2:sha256", (600000,))
+    "scrypt:32768:8:1"     → ("scrypt", (32768, 8, 1))
+
+    Raises:
+        ValueError for a malformed method string
+    """
+    algorithm, *args = method.split(":")
+    if algorithm == "pbkdf2":
+        digest = args[0] if args else "sha256"
+        return f"pbkdf2:{digest}", (int(args[1]) if len(args) > 1 else _PBKDF2_ITERATIONS,)
+    if algorithm == "scrypt":
+        params = tuple(int(arg) for arg in args)
+        return "scrypt", params + _SCRYPT_PARAMS[len(params):]
+    return algorithm, tuple(args)
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the hashing pool is full: the request should fail fast with 503."""
+
+
+class _HashingPool:
+    """A process pool plus a bounded admission counter (running + queued jobs)."""
+
+    def __init__(self, workers: int, queue_size: int):
+        # "spawn": never fork a process that is already running threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self.slots = threading.BoundedSemaphore(queue_size)
+
+
+class PasswordService:
+    """
+    Password hashing and verification, kept off the request threads.
+
+    pbkdf2 at a production work factor burns tens to hundreds of ms of CPU.
+    Hashes are computed in a dedicated process pool of PASSWORD_HASH_WORKERS
+    processes; at most PASSWORD_HASH_QUEUE jobs may be running or waiting,
+    beyond that callers get PasswordPoolSaturated immediately instead of
+    piling up behind a login storm.
+
+    PASSWORD_HASH_WORKERS = 0 hashes inline (development, benchmarks).
+    Pool processes use the "spawn" start method: the entry module must
+    guard its startup code with `if __name__ == "__main__":`.
+    """
+
+    _pool_lock = threading.Lock()
+
+    @staticmethod
+    def hash_password(password: str) -> str:
+        """
+        Hash a password with the configured method (PASSWORD_HASH_METHOD).
+
+        Args:
+            password (str): Plain text password
+
+        Returns:
+            str: Werkzeug hash string
+
+        Raises:
+            PasswordPoolSaturated if the hashing pool is full
+        """
+        method = current_app.config["PASSWORD_HASH_METHOD"]
+        return PasswordService._run(generate_password_hash, password, method)
+
+    @staticmethod
+    def verify_password(password_hash: str, password: str) -> bool:
+        """
+        Check a plain text password against a stored hash.
+
+        Args:
+            password_hash (str): Stored hash
+            password (str): Password entered by the user
+
+        Returns:
+            bool: True if they match
+
+        Raises:
+            PasswordPoolSaturated if the hashing pool is full
+        """
+        return PasswordService._run(check_password_hash, password_hash, password)
+
+    @staticmethod
+    def needs_rehash(password_hash: str) -> bool:
+        """
+        Whether a stored hash should be replaced on next login.
+
+        Rehashing only ever strengthens a hash:
+        - same family as PASSWORD_HASH_METHOD (pbkdf2 with the same digest,
+          or scrypt) with weaker parameters: fewer pbkdf2 iterations, or
+          scrypt n / r / p all <= the configured ones (and not equal)
+        - another family only when it is listed in PASSWORD_REHASH_FROM (an
+          explicit migration, e.g. "pbkdf2:sha1"): a memory-hard scrypt hash
+          is never rewritten as pbkdf2 just because pbkdf2 is the default
+
+        Args:
+            password_hash (str): Stored hash ("method$salt$hash")
+
+        Returns:
+            bool
+        """
+        try:
+            family, params = _parse_method(password_hash.split("$", 1)[0])
+            wanted_family, wanted = _parse_method(current_app.config["PASSWORD_HASH_METHOD"])
+        except ValueError:
+            return False
+
+        if family != wanted_family:
+            return family in current_app.config["PASSWORD_REHASH_FROM"]
+        if family.startswith("pbkdf2:"):
+            return params[0] < wanted[0]
+        if family == "scrypt":
+            return params != wanted and all(have <= want for have, want in zip(params, wanted))
+        return False
+
+    # --------------------------------------------------
+    # Internal helpers
+    # --------------------------------------------------
+    @staticmethod
+    def _pool():
+        """This app's pool, created lazily in each worker process."""
+        pool = current_app.extensions.get("password_pool")
+        if pool is None:
+            with PasswordService._pool_lock:
+                pool = current_app.extensions.get("password_pool")
+                if pool is None:
+                    pool = _HashingPool(
+                        current_app.config["PASSWORD_HASH_WORKERS"],
+                        current_app.config["PASSWORD_HASH_QUEUE"]
+                    )
+                    current_app.extensions["password_pool"] = pool
+        return pool
+
+    @staticmethod
+    def _run(function, *args):
+        if not current_app.config["PASSWORD_HASH_WORKERS"]:
+            return function(*args)
+
+        pool = PasswordService._pool()
+        if not pool.slots.acquire(blocking=False):
+            raise PasswordPoolSaturated()
+
+        try:
+            future = pool.executor.submit(function, *args)
+        except BaseException:
+            pool.slots.release()
+            raise
+
+        # The slot is freed when the job finishes, even if we stop waiting
+        future.add_done_callback(lambda _: pool.slots.release())
+        try:
+            return future.result(timeout=current_app.config["PASSWORD_HASH_TIMEOUT"])
+        except TimeoutError:
+            raise PasswordPoolSaturated()
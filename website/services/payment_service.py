@@ -1,13 +1,19 @@
 from datetime import datetime
 from typing import Optional
-from website.models import Payment, User
+from flask import current_app
+from website.models import Order, Payment, User
 from website import db
 
 class PaymentService:
     """Simulates payment processing for testing without Razorpay."""
 
     @staticmethod
-    def process_payment(user: User, amount: float) -> Payment:
+    def process_payment(
+        user: User,
+        amount: float,
+        order: Optional[Order] = None,
+        commit: bool = True
+    ) -> Payment:
         """
         Simulate a payment for a user.
         Creates a Payment record in the database.
@@ -15,6 +21,9 @@ class PaymentService:
         Args:
             user (User): The user making the payment
             amount (float): Amount to "charge"
+            order (Order, optional): The order being paid for (sets Payment.order_id)
+            commit (bool): Commit immediately; pass False to leave the
+                commit to a surrounding transaction (e.g. checkout)
 
         Returns:
             Payment: The created payment record
@@ -22,14 +31,19 @@ class PaymentService:
         # Create a payment record
         payment = Payment(
             user_id=user.id,
+            order_id=order.id if order is not None else None,
             amount=amount,
             status="SUCCESS",  # Always succeed for testing
             created_at=datetime.utcnow()
         )
         db.session.add(payment)
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
-        print(f"[PaymentService] Payment of ₹{amount:.2f} recorded for {user.email}")
+        current_app.logger.info(
+            "payment of %.2f recorded", amount,
+            extra={"user_id": user.id, "order_id": payment.order_id, "amount": amount}
+        )
         return payment
 
     @staticmethod
@@ -44,7 +58,7 @@ class PaymentService:
             "currency": currency,
             "status": "created"
         }
-        print(f"[PaymentService] Created test order: {order}")
+        current_app.logger.info("created test payment order %s", order["id"], extra={"amount": amount})
         return order
 
     @staticmethod
@@ -52,5 +66,7 @@ class PaymentService:
         """
         Simulate payment verification (always True for testing).
         """
-        print(f"[PaymentService] Verified payment {payment_id} for order {order_id}")
+        current_app.logger.info(
+            "verified payment %s", payment_id, extra={"payment_id": payment_id, "order_id": order_id}
+        )
         return True
@@ -1,6 +1,14 @@
+import math
 from typing import List, Optional
-from website.models import Product
+from website.models import Category, Product
 from website import db
+from website.routing import replica_reads
+from website.services.catalog_service import CatalogService, PER_PAGE, SORT_OPTIONS
+from website.services.search_index import SearchIndexService, tokenize
+from website.services.suggest_index import SuggestIndexService
+
+# Sort options of the search page: relevance first, then the listing ones
+SEARCH_SORTS = ("relevance",) + tuple(SORT_OPTIONS)
 
 
 class ProductService:
@@ -8,8 +16,9 @@ class ProductService:
 
     @staticmethod
     def get_all_products() -> List[Product]:
-        """Return all products from the database."""
-        return Product.query.all()
+        """Return all products from the database (replica when configured)."""
+        with replica_reads():
+            return Product.query.all()
 
     @staticmethod
     def get_product_by_id(product_id: int) -> Optional[Product]:
@@ -22,7 +31,8 @@ class ProductService:
         Returns:
             Product | None
         """
-        return Product.query.get(product_id)
+        with replica_reads():
+            return db.session.get(Product, product_id)
 
     @staticmethod
     def create_product(
@@ -54,6 +64,46 @@ class ProductService:
         )
         db.session.add(product)
         db.session.commit()
+
+        # New product → cached listings for its category are stale
+        CatalogService.bump_catalog_version([category_id], membership_changed=True)
+
+        # Searchable / suggested right away in this worker (others catch up shortly)
+        SearchIndexService.index_product(product)
+        SuggestIndexService.add_product(product)
+        return product
+
+    @staticmethod
+    def update_product(product_id: int, **changes) -> Optional[Product]:
+        """
+        Update an existing product (admin edit).
+
+        Args:
+            product_id (int): Product ID
+            **changes: Columns to change (name, price, stock, category_id, description)
+
+        Returns:
+            Product | None: The updated product, None if it does not exist
+        """
+        product = Product.query.get(product_id)
+        if product is None:
+            return None
+
+        # Both the old and the new category listings are affected
+        touched_categories = {product.category_id}
+
+        for field in ("name", "price", "stock", "category_id", "description"):
+            if field in changes:
+                setattr(product, field, changes[field])
+        touched_categories.add(product.category_id)
+
+        db.session.commit()
+
+        CatalogService.bump_catalog_version(
+            touched_categories,
+            membership_changed=len(touched_categories) > 1
+        )
+        SearchIndexService.index_product(product)
         return product
 
     @staticmethod
@@ -67,4 +117,83 @@ class ProductService:
         Returns:
             List[Product]: Products in the category
         """
-        return Product.query.filter_by(category_id=category_id).all()
+        with replica_reads():
+            return Product.query.filter_by(category_id=category_id).all()
+
+    @staticmethod
+    def search(
+        query: str,
+        category_id: Optional[int] = None,
+        sort: str = "relevance",
+        page: int = 1,
+        per_page: int = PER_PAGE
+    ) -> dict:
+        """
+        Full-text search over product name and description (BM25 ranking).
+        Every word of the query must match.
+
+        Args:
+            query (str): Words typed by the user
+            category_id (int, optional): Category filter
+            sort (str): One of SEARCH_SORTS (unknown → relevance)
+            page (int): 1-based page number
+            per_page (int): Results per page
+
+        Returns:
+            dict: products (id, name, price, category_name), total, pages,
+            page, has_prev / prev_num, has_next / next_num, warming_up
+            (True, and no results, until this worker's index is built)
+        """
+        sort = sort if sort in SEARCH_SORTS else "relevance"
+        page = page if page and page > 0 else 1
+
+        index = SearchIndexService.current()
+        if index is None:
+            # First build still running in the background
+            return {
+                "products": [], "total": 0, "pages": 0, "page": page,
+                "has_prev": False, "prev_num": None, "has_next": False, "next_num": None,
+                "warming_up": True,
+            }
+
+        ids, total = index.search(
+            tokenize(query),
+            category_id=category_id,
+            sort=sort,
+            offset=(page - 1) * per_page,
+            limit=per_page
+        )
+
+        # Details of the page's products only, in one query, in ranked order
+        products = []
+        if ids:
+            with replica_reads():
+                rows = (
+                    db.session.query(Product.id, Product.name, Product.price, Category.name.label("category_name"))
+                    .join(Category, Product.category_id == Category.id)
+                    .filter(Product.id.in_(ids))
+                    .all()
+                )
+            by_id = {row.id: row for row in rows}
+            products = [
+                {
+                    "id": by_id[product_id].id,
+                    "name": by_id[product_id].name,
+                    "price": by_id[product_id].price,
+                    "category_name": by_id[product_id].category_name,
+                }
+                for product_id in ids if product_id in by_id
+            ]
+
+        pages = math.ceil(total / per_page)
+        return {
+            "products": products,
+            "total": total,
+            "pages": pages,
+            "page": page,
+            "has_prev": page > 1,
+            "prev_num": page - 1,
+            "has_next": page < pages,
+            "next_num": page + 1,
+            "warming_up": False,
+        }
@@ -0,0 +1,368 @@
+"""
+rollup_service.py
+-----------------
+Sales rollups for reporting: daily units / revenue per product and per
+category, maintained incrementally from the order lines.
+
+Why:
+- a report straight from OrderItem aggregates every order line ever
+  placed; it gets slower every day
+- the rollup tables (DailyProductSales, DailyCategorySales) hold one row
+  per (day, product) / (day, category) with sales: a report over a date
+  range reads O(days × products) rows, however long the history
+
+How it stays current (catch-up from a high-water mark):
+- RollupState.last_order_id: every order with id <= it is in the rollups
+- catch_up() aggregates the order lines of the orders after it, in
+  windows of ROLLUP_BATCH_ORDERS orders, and adds them to the rollup rows
+  with one dialect upsert per table (INSERT ... ON CONFLICT / ON DUPLICATE
+  KEY UPDATE units = units + new units); one transaction per window
+- it runs as a background job a moment after checkouts (rollups.catch_up,
+  see tasks.py) and from `flask rollups catch-up` (cron); reports never
+  run it, they show how far the rollups go instead (freshness())
+
+Why not inside checkout:
+- every checkout selling a popular product would update the same
+  (today, product) row: concurrent checkouts would queue on that row lock
+
+Correctness:
+- order ids are assigned before commit, so a transaction still running
+  can leave a gap below an id that is already visible. The catch-up only
+  moves past orders older than ROLLUP_SETTLE_SECONDS (longer than any
+  checkout transaction), so no gap is skipped for good
+- each window first moves the high-water mark with a conditional UPDATE
+  (... WHERE last_order_id = <the value read>). Two catch-ups racing on
+  the same window: the second updates 0 rows and rolls back, so nothing
+  is counted twice
+- `flask rollups rebuild` empties the tables and recomputes from scratch
+  (e.g. after backfilling orders, or when products changed category)
+"""
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select, update
+
+from website import db
+from website.models import (
+    Category, DailyCategorySales, DailyProductSales, Order, OrderItem, Product, RollupState
+)
+
+ROLLUP_NAME = "sales"
+
+
+def _upsert_increment(model, rows: List[dict], keys: tuple, amounts: tuple) -> None:
+    """
+    INSERT rows; on an existing key add the amounts to the stored ones.
+
+    Args:
+        model: Rollup model
+        rows (List[dict]): Column → value
+        keys (tuple): Primary key column names
+        amounts (tuple): Columns to increment
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect.name
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        statement = statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in amounts}
+        )
+    else:
+        # SQLite and PostgreSQL share the ON CONFLICT syntax
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: table.c[name] + statement.excluded[name] for name in amounts}
+        )
+    db.session.execute(statement, rows)
+
+
+def _bounds(start: Optional[date], end: Optional[date], column):
+    """WHERE clauses for [start, end] on a Date column."""
+    clauses = []
+    if start is not None:
+        clauses.append(column >= start)
+    if end is not None:
+        clauses.append(column <= end)
+    return clauses
+
+
+class RollupService:
+    """Maintains the sales rollups and answers the reports from them."""
+
+    # --------------------------------------------------
+    # Maintenance
+    # --------------------------------------------------
+    @staticmethod
+    def high_water_mark() -> int:
+        """Last order id included in the rollups (creates the state row on first use)."""
+        state = db.session.get(RollupState, ROLLUP_NAME)
+        if state is None:
+            db.session.add(RollupState(name=ROLLUP_NAME, last_order_id=0))
+            try:
+                db.session.commit()
+            except Exception:
+                # Created concurrently by another worker
+                db.session.rollback()
+            state = db.session.get(RollupState, ROLLUP_NAME)
+        return state.last_order_id
+
+    @staticmethod
+    def catch_up(max_batches: Optional[int] = None) -> int:
+        """
+        Roll up the orders placed since the high-water mark.
+
+        Args:
+            max_batches (int, optional): Stop after this many windows
+
+        Returns:
+            int: Orders rolled up by this call
+        """
+        batch = current_app.config.get("ROLLUP_BATCH_ORDERS", 50_000)
+        settle = current_app.config.get("ROLLUP_SETTLE_SECONDS", 30)
+        rolled = batches = 0
+
+        while max_batches is None or batches < max_batches:
+            low = RollupService.high_water_mark()
+
+            # Newest order old enough that every order below it has committed
+            ready = db.session.scalar(
+                select(func.max(Order.id))
+                .where(Order.id > low, Order.created_at <= datetime.utcnow() - timedelta(seconds=settle))
+            )
+            db.session.rollback()
+            if ready is None:
+                break
+            high = min(ready, low + batch)
+
+            # Claim the window: moves the mark only if nobody else did
+            claimed = db.session.execute(
+                update(RollupState)
+                .where(RollupState.name == ROLLUP_NAME, RollupState.last_order_id == low)
+                .values(last_order_id=high, updated_at=datetime.utcnow())
+            ).rowcount
+            if not claimed:
+                db.session.rollback()
+                continue
+
+            RollupService._roll_window(low, high)
+            db.session.commit()
+
+            rolled += high - low
+            batches += 1
+
+        return rolled
+
+    @staticmethod
+    def _roll_window(low: int, high: int) -> None:
+        """Add the order lines of orders low < id <= high to the rollups (no commit)."""
+        day = func.date(Order.created_at, type_=db.Date)
+        lines = db.session.execute(
+            select(
+                day.label("day"),
+                OrderItem.product_id,
+                Product.category_id,
+                func.sum(OrderItem.quantity).label("units"),
+                func.sum(OrderItem.quantity * OrderItem.price).label("revenue"),
+                func.count(func.distinct(Order.id)).label("orders"),
+            )
+            .join(Order, OrderItem.order_id == Order.id)
+            .join(Product, OrderItem.product_id == Product.id)
+            .where(Order.id > low, Order.id <= high)
+            .group_by(day, OrderItem.product_id, Product.category_id)
+        ).all()
+
+        per_category = {}
+        for line in lines:
+            key = (line.day, line.category_id)
+            units, revenue = per_category.get(key, (0, 0.0))
+            per_category[key] = (units + int(line.units), revenue + float(line.revenue))
+
+        _upsert_increment(
+            DailyProductSales,
+            [
+                {"day": line.day, "product_id": line.product_id, "units": int(line.units),
+                 "revenue": float(line.revenue), "orders": int(line.orders)}
+                for line in lines
+            ],
+            keys=("day", "product_id"),
+            amounts=("units", "revenue", "orders"),
+        )
+        _upsert_increment(
+            DailyCategorySales,
+            [
+                {"day": day_, "category_id": category_id, "units": units, "revenue": revenue}
+                for (day_, category_id), (units, revenue) in per_category.items()
+            ],
+            keys=("day", "category_id"),
+            amounts=("units", "revenue"),
+        )
+
+    @staticmethod
+    def rebuild() -> int:
+        """
+        Empty the rollups and recompute them from every order.
+
+        Returns:
+            int: Orders rolled up
+        """
+        RollupService.high_water_mark()
+        db.session.execute(delete(DailyProductSales))
+        db.session.execute(delete(DailyCategorySales))
+        db.session.execute(
+            update(RollupState)
+            .where(RollupState.name == ROLLUP_NAME)
+            .values(last_order_id=0, updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return RollupService.catch_up()
+
+    # --------------------------------------------------
+    # Reports (rollup tables only)
+    # --------------------------------------------------
+    @staticmethod
+    def freshness() -> dict:
+        """
+        How far the rollups go (read only: reports never catch up).
+
+        Returns:
+            dict: {"order_id": high-water mark,
+                   "order_placed_at": when that order was placed,
+                   "rolled_up_at": when the mark last moved}
+                   (timestamps ISO 8601 UTC, None before the first catch-up)
+        """
+        state = db.session.get(RollupState, ROLLUP_NAME)
+        mark = state.last_order_id if state else 0
+        placed_at = db.session.scalar(select(Order.created_at).where(Order.id == mark)) if mark else None
+        return {
+            "order_id": mark,
+            "order_placed_at": placed_at.isoformat() if placed_at else None,
+            "rolled_up_at": state.updated_at.isoformat() if state and state.updated_at else None,
+        }
+
+    @staticmethod
+    def revenue_by_day(start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+        """
+        Units and revenue per day over [start, end].
+
+        Args:
+            start (date, optional): First day included
+            end (date, optional): Last day included
+
+        Returns:
+            List[dict]: [{"day", "units", "revenue"}] by day
+        """
+        rows = db.session.execute(
+            select(
+                DailyCategorySales.day,
+                func.sum(DailyCategorySales.units).label("units"),
+                func.sum(DailyCategorySales.revenue).label("revenue"),
+            )
+            .where(*_bounds(start, end, DailyCategorySales.day))
+            .group_by(DailyCategorySales.day)
+            .order_by(DailyCategorySales.day)
+        )
+        return [
+            {"day": row.day.isoformat(), "units": int(row.units), "revenue": round(float(row.revenue), 2)}
+            for row in rows
+        ]
+
+    @staticmethod
+    def top_products(start: Optional[date] = None, end: Optional[date] = None, limit: int = 20) -> List[dict]:
+        """
+        Best-selling products (by units) over [start, end].
+
+        Args:
+            start (date, optional): First day included
+            end (date, optional): Last day included
+            limit (int): Number of products
+
+        Returns:
+            List[dict]: [{"product_id", "name", "units", "revenue", "orders"}]
+        """
+        totals = (
+            select(
+                DailyProductSales.product_id,
+                func.sum(DailyProductSales.units).label("units"),
+                func.sum(DailyProductSales.revenue).label("revenue"),
+                func.sum(DailyProductSales.orders).label("orders"),
+            )
+            .where(*_bounds(start, end, DailyProductSales.day))
+            .group_by(DailyProductSales.product_id)
+            .order_by(func.sum(DailyProductSales.units).desc(), DailyProductSales.product_id)
+            .limit(limit)
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(totals, Product.name)
+            .join(Product, Product.id == totals.c.product_id)
+            .order_by(totals.c.units.desc(), totals.c.product_id)
+        )
+        return [
+            {"product_id": row.product_id, "name": row.name, "units": int(row.units),
+             "revenue": round(float(row.revenue), 2), "orders": int(row.orders)}
+            for row in rows
+        ]
+
+    @staticmethod
+    def sales_by_category(start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+        """
+        Units and revenue per category over [start, end].
+
+        Args:
+            start (date, optional): First day included
+            end (date, optional): Last day included
+
+        Returns:
+            List[dict]: [{"category_id", "name", "units", "revenue"}], highest revenue first
+        """
+        rows = db.session.execute(
+            select(
+                DailyCategorySales.category_id,
+                Category.name,
+                func.sum(DailyCategorySales.units).label("units"),
+                func.sum(DailyCategorySales.revenue).label("revenue"),
+            )
+            .join(Category, Category.id == DailyCategorySales.category_id)
+            .where(*_bounds(start, end, DailyCategorySales.day))
+            .group_by(DailyCategorySales.category_id, Category.name)
+            .order_by(func.sum(DailyCategorySales.revenue).desc())
+        )
+        return [
+            {"category_id": row.category_id, "name": row.name, "units": int(row.units),
+             "revenue": round(float(row.revenue), 2)}
+            for row in rows
+        ]
+
+
+# ==================================================
+# CLI: flask --app run rollups rebuild | catch-up
+# ==================================================
+rollups_cli = AppGroup("rollups", help="Maintain the sales rollup tables.")
+
+
+@rollups_cli.command("catch-up")
+@click.option("--max-batches", type=int, help="Stop after this many windows of orders.")
+def catch_up_command(max_batches):
+    """Roll up the orders placed since the last run."""
+    rolled = RollupService.catch_up(max_batches=max_batches)
+    click.echo(f"Rolled up {rolled} order ids (high-water mark {RollupService.high_water_mark()})")
+
+
+@rollups_cli.command("rebuild")
+def rebuild_command():
+    """Recompute the rollups from every order."""
+    rolled = RollupService.rebuild()
+    click.echo(f"Rebuilt rollups from {rolled} order ids (high-water mark {RollupService.high_water_mark()})")
@@ -0,0 +1,679 @@
+"""
+search_index.py
+---------------
+In-process inverted index for product search, ranked with BM25.
+
+Why not SQL:
+- LIKE '%term%' over name / description cannot use an index and
+  scans the whole product table on every search
+
+Layout (per worker, built from the catalog on first use):
+- every product version gets an internal document number
+- per document, parallel arrays: product id, category id, price,
+  indexed length, live flag
+- per term, a posting list: array of document numbers (ascending) plus
+  a parallel array of precomputed BM25 term weights ("impacts"), so a
+  query only multiplies by the term's idf and adds up
+- name tokens count NAME_WEIGHT times: a match in the name ranks above
+  a match in the description
+- "dense" terms (in at least DENSE_MIN documents), the live documents
+  and each category also get a bitmap (1 bit per document): matching
+  several common terms is then one big-integer AND, done in C. Dense
+  terms also keep their frequency per document (1 byte), so scoring a
+  match needs no binary search
+
+Query plan (every term must match):
+- the rarest term is short → walk its postings, test the others
+  (bitmap bit or binary search), score each match
+- all terms are common → AND the bitmaps (with the category and live
+  bitmaps); the count is a popcount; few matches (or a deep page) →
+  score / sort them all, otherwise only the page is materialized:
+    relevance  walk the rarest term's postings by decreasing impact and
+               stop once no remaining document can beat the page
+               (threshold algorithm)
+    price/name walk a global permutation of documents in that order and
+               keep the ones whose bit is set
+
+Keeping it fresh:
+- ProductService.create_product / update_product update the index of
+  the worker that handled the write, immediately
+- every worker catches up with the others' writes at most every
+  SEARCH_REFRESH_SECONDS, reading only rows whose Product.updated_at
+  moved (same change feed as the catalog snapshot). A search only
+  starts the catch-up: it runs in the background thread, and searches
+  meanwhile use the index as it is
+- an updated product gets a new document number; the old one is marked
+  dead and skipped. When dead documents exceed REBUILD_DEAD_RATIO of the
+  index, it is rebuilt from scratch
+- stock-only changes (checkout) do not touch the index structures
+
+Builds never run inside a request either: the first one (1M products: ~36 s)
+and the dead-document rebuilds run in a background thread. Meanwhile
+searches use the previous index, or get a "warming up" answer before
+the first build is done. SEARCH_WARM_ON_START builds it in create_app
+instead: with gunicorn --preload the master builds it once before the
+fork and every worker starts with it (copy-on-write).
+
+Cost: about 150 bytes per product, 8 bytes per (term, product) posting,
+9N/8 bytes per dense term and N/8 bytes per category.
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from operator import neg
+from array import array
+from itertools import chain
+from bisect import bisect_left
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from website import db
+from website.models import Product
+
+# Letters and digits; everything else separates tokens
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words too common in product text to help ranking
+STOP_WORDS = frozenset({"a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"})
+
+# A name token counts as this many description tokens
+NAME_WEIGHT = 3
+
+# BM25 parameters (standard values)
+K1 = 1.2
+B = 0.75
+
+# Terms in at least this many documents also get a bitmap
+DENSE_MIN = 4096
+
+# Matches up to this many are scored and sorted directly
+SMALL_RESULT = 512
+
+# Terms with a smaller idf than this are matched but not scored
+MIN_WEIGHT = 0.01
+
+# Re-sort the global price / name orders once this many documents moved
+MAX_UNSORTED = 20_000
+
+# Re-read this much history on every catch-up (rows committed out of order)
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+# Changed rows applied per hold of the index lock during a catch-up
+CATCH_UP_CHUNK = 1000
+
+# Rebuild (in the background) once this share of the documents is dead
+REBUILD_DEAD_RATIO = 0.25
+
+# After a failed background build, wait this long before trying again
+BUILD_RETRY_SECONDS = 30
+
+# Maps every non-zero byte to 1 (then bytes.find, i.e. memchr, skips the
+# empty parts of a bitmap in C), and the set bits of each byte value
+_NONZERO = bytes([0] + [1] * 255)
+_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase search terms.
+
+    Args:
+        text (str): Product name, description or a query
+
+    Returns:
+        List[str]: Terms in order (duplicates kept, stop words removed)
+    """
+    if not text:
+        return []
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def _set_bit(bitmap: bytearray, doc: int) -> None:
+    byte = doc >> 3
+    if byte >= len(bitmap):
+        bitmap.extend(bytes(byte - len(bitmap) + 1024))
+    bitmap[byte] |= 1 << (doc & 7)
+
+
+def _clear_bit(bitmap: bytearray, doc: int) -> None:
+    byte = doc >> 3
+    if byte < len(bitmap):
+        bitmap[byte] &= ~(1 << (doc & 7)) & 0xFF
+
+
+def _has_bit(bitmap, doc: int) -> bool:
+    byte = doc >> 3
+    return byte < len(bitmap) and bitmap[byte] >> (doc & 7) & 1
+
+
+def _docs_of(bits: bytes) -> List[int]:
+    """Document numbers of the set bits, ascending."""
+    docs = []
+    find = bits.translate(_NONZERO).find
+    byte = find(1)
+    while byte >= 0:
+        base = byte << 3
+        docs.extend([base + bit for bit in _BITS[bits[byte]]])
+        byte = find(1, byte + 1)
+    return docs
+
+
+class _Term:
+    """Posting list of one term."""
+
+    __slots__ = ("docs", "impacts", "max_impact", "bitmap", "tfs", "by_impact")
+
+    def __init__(self):
+        self.docs = array("l")
+        self.impacts = array("f")
+        self.max_impact = 0.0
+        # Dense terms only: 1 bit per document, and the term frequency per document
+        self.bitmap = None
+        self.tfs = None
+        # Posting positions by decreasing impact (built lazily); positions
+        # appended since then form a short unsorted tail
+        self.by_impact = None
+
+    def sort_by_impact(self) -> array:
+        if self.by_impact is None or len(self.docs) - len(self.by_impact) > len(self.docs) // 8:
+            self.by_impact = array("l", sorted(
+                range(len(self.docs)), key=self.impacts.__getitem__, reverse=True
+            ))
+        return self.by_impact
+
+    def impact_of(self, doc: int) -> float:
+        position = bisect_left(self.docs, doc)
+        return self.impacts[position]
+
+
+class SearchIndex:
+    """The inverted index itself (one per worker process)."""
+
+    def __init__(self):
+        # Per document (document number = position)
+        self.product_ids = array("l")
+        self.categories = array("l")
+        self.prices = array("d")
+        self.lengths = array("f")
+        self.norms = array("f")
+        self.live = bytearray()
+        self.names = []
+        self.text_hashes = array("q")
+
+        # Bitmaps: live documents, documents per category
+        self.live_bitmap = bytearray()
+        self.category_bitmaps = {}
+
+        # Term → _Term
+        self.postings = {}
+
+        # Product id → live document number
+        self.doc_of = {}
+        self.live_count = 0
+        self.total_length = 0.0
+
+        # Global sort orders (built lazily) and documents not placed in them yet
+        self.orders = {}
+        self.unsorted = set()
+
+        # Newest Product.updated_at indexed, and when we last looked for more
+        self.watermark = None
+        self.checked_at = 0.0
+
+        self.lock = threading.RLock()
+
+    # --------------------------------------------------
+    # Writing
+    # --------------------------------------------------
+    def upsert(self, product_id: int, name: str, description: Optional[str],
+               category_id: int, price: float) -> None:
+        """
+        Index a new product or the new version of an existing one.
+
+        Args:
+            product_id (int): Product ID
+            name (str): Product name
+            description (str, optional): Product description
+            category_id (int): Category ID
+            price (float): Current price
+        """
+        with self.lock:
+            text_hash = hash((name, description))
+            doc = self.doc_of.get(product_id)
+
+            if doc is not None:
+                if self.text_hashes[doc] == text_hash:
+                    # Same text: filters and sort keys change in place
+                    if self.categories[doc] != category_id:
+                        self._move_category(doc, category_id)
+                    if self.prices[doc] != price:
+                        self.prices[doc] = price
+                        self.unsorted.add(doc)
+                    return
+                self._retire(doc)
+
+            self._append(product_id, name, description, category_id, price, text_hash)
+
+    def _append(self, product_id, name, description, category_id, price, text_hash) -> None:
+        doc = len(self.product_ids)
+
+        frequencies = {}
+        for term in tokenize(name):
+            frequencies[term] = frequencies.get(term, 0) + NAME_WEIGHT
+        for term in tokenize(description):
+            frequencies[term] = frequencies.get(term, 0) + 1
+        length = float(sum(frequencies.values()))
+
+        # Length normalization against the current average document length
+        self.live_count += 1
+        self.total_length += length
+        norm = K1 * (1 - B + B * length / (self.total_length / self.live_count))
+
+        self.product_ids.append(product_id)
+        self.categories.append(category_id)
+        self.prices.append(price)
+        self.lengths.append(length)
+        self.norms.append(norm)
+        self.live.append(1)
+        self.names.append(name.lower())
+        self.text_hashes.append(text_hash)
+        _set_bit(self.live_bitmap, doc)
+        _set_bit(self.category_bitmaps.setdefault(category_id, bytearray()), doc)
+
+        self.doc_of[product_id] = doc
+        if self.orders:
+            self.unsorted.add(doc)
+
+        for term, frequency in frequencies.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = _Term()
+            impact = frequency * (K1 + 1) / (frequency + norm)
+            entry.docs.append(doc)
+            entry.impacts.append(impact)
+            # The stored (float32) value: the bound must equal the best real score
+            entry.max_impact = max(entry.max_impact, entry.impacts[-1])
+
+            if entry.bitmap is not None:
+                _set_bit(entry.bitmap, doc)
+                if doc >= len(entry.tfs):
+                    entry.tfs.extend(bytes(doc - len(entry.tfs) + 8192))
+                entry.tfs[doc] = min(frequency, 255)
+            elif len(entry.docs) >= DENSE_MIN:
+                self._make_dense(entry)
+
+    def _make_dense(self, entry: _Term) -> None:
+        entry.bitmap = bytearray()
+        entry.tfs = bytearray(len(self.product_ids))
+        norms = self.norms
+        for doc, impact in zip(entry.docs, entry.impacts):
+            _set_bit(entry.bitmap, doc)
+            # Invert impact = tf * (K1 + 1) / (tf + norm)
+            entry.tfs[doc] = min(round(impact * norms[doc] / (K1 + 1 - impact)), 255)
+
+    def _retire(self, doc: int) -> None:
+        self.live[doc] = 0
+        _clear_bit(self.live_bitmap, doc)
+        self.live_count -= 1
+        self.total_length -= self.lengths[doc]
+        self.unsorted.discard(doc)
+
+    def _move_category(self, doc: int, category_id: int) -> None:
+        _clear_bit(self.category_bitmaps[self.categories[doc]], doc)
+        _set_bit(self.category_bitmaps.setdefault(category_id, bytearray()), doc)
+        self.categories[doc] = category_id
+
+    @property
+    def dead_ratio(self) -> float:
+        total = len(self.product_ids)
+        return (total - self.live_count) / total if total else 0.0
+
+    # --------------------------------------------------
+    # Reading
+    # --------------------------------------------------
+    def search(
+        self,
+        terms: Iterable[str],
+        category_id: Optional[int] = None,
+        sort: str = "relevance",
+        offset: int = 0,
+        limit: int = 10
+    ) -> Tuple[List[int], int]:
+        """
+        Find the products containing every term.
+
+        Args:
+            terms (Iterable[str]): Tokenized query
+            category_id (int, optional): Category filter
+            sort (str): "relevance" or one of CatalogService.SORT_OPTIONS
+            offset (int): Results to skip (pagination)
+            limit (int): Results to return
+
+        Returns:
+            (List[int], int): Product ids of the page, total number of matches
+        """
+        terms = set(terms)
+        if not terms:
+            return [], 0
+
+        with self.lock:
+            entries = [self.postings.get(term) for term in terms]
+            if any(entry is None for entry in entries) or not self.live_count:
+                return [], 0
+            if category_id and category_id not in self.category_bitmaps:
+                return [], 0
+
+            # Rarest term first; idf from document frequency. Postings still
+            # hold dead documents (until the next rebuild), so df can exceed
+            # the live count: capped there, every weight stays > 0 (a
+            # negative one would break the bound _top_relevance prunes with)
+            entries.sort(key=lambda entry: len(entry.docs))
+            n = self.live_count
+            weights = []
+            for entry in entries:
+                df = min(len(entry.docs), n)
+                weights.append(math.log(1 + (n - df + 0.5) / (df + 0.5)))
+
+            if entries[0].bitmap is None:
+                docs = self._scan_rarest(entries, category_id)
+                total = len(docs)
+                page = self._sort_small(docs, entries, weights, sort, offset + limit)
+            else:
+                bits, total = self._and_bitmaps(entries, category_id)
+                # A walk visits about (wanted × walked list / matches) documents;
+                # materializing every match costs about `total`
+                walked = len(entries[0].docs) if sort == "relevance" else len(self.product_ids)
+                if total <= SMALL_RESULT or (offset + limit) * walked >= total * total:
+                    page = self._sort_small(_docs_of(bits), entries, weights, sort, offset + limit)
+                elif sort == "relevance":
+                    page = self._top_relevance(bits, entries, weights, offset + limit)
+                else:
+                    page = self._walk_order(bits, sort, offset + limit)
+
+            return [self.product_ids[doc] for doc in page[offset:offset + limit]], total
+
+    def _scan_rarest(self, entries, category_id) -> List[int]:
+        """Live documents of the rarest (sparse) term that contain every other term."""
+        live, categories = self.live, self.categories
+        others = entries[1:]
+        matches = []
+        for doc in entries[0].docs:
+            if not live[doc] or (category_id and categories[doc] != category_id):
+                continue
+            for entry in others:
+                if entry.bitmap is not None:
+                    if not _has_bit(entry.bitmap, doc):
+                        break
+                else:
+                    position = bisect_left(entry.docs, doc)
+                    if position == len(entry.docs) or entry.docs[position] != doc:
+                        break
+            else:
+                matches.append(doc)
+        return matches
+
+    def _and_bitmaps(self, entries, category_id) -> Tuple[bytes, int]:
+        """AND of the (all dense) terms' bitmaps, + live, + category: (bits, popcount)."""
+        size = len(self.live_bitmap)
+        result = int.from_bytes(self.live_bitmap, "little")
+        if category_id:
+            result &= int.from_bytes(self.category_bitmaps[category_id], "little")
+        for entry in entries:
+            result &= int.from_bytes(entry.bitmap, "little")
+        return result.to_bytes(size, "little"), result.bit_count()
+
+    def _scores(self, docs, entries, weights) -> List[float]:
+        """BM25 score of each document, one term at a time (tight loops)."""
+        scores = [0.0] * len(docs)
+        for entry, weight in zip(entries, weights):
+            if weight < MIN_WEIGHT:
+                # In (nearly) every product: filters, but cannot change the order
+                continue
+            if entry.tfs is not None:
+                # Dense: impact from the frequency and the document's norm, no search
+                tfs, norms, scale = entry.tfs, self.norms, weight * (K1 + 1)
+                scores = [
+                    score + scale * tfs[doc] / (tfs[doc] + norms[doc])
+                    for score, doc in zip(scores, docs)
+                ]
+            else:
+                postings, impacts = entry.docs, entry.impacts
+                scores = [
+                    score + weight * impacts[bisect_left(postings, doc)]
+                    for score, doc in zip(scores, docs)
+                ]
+        return scores
+
+    def _sort_key(self, field: str):
+        """Ascending key for "price" / "name" (product id breaks ties); _desc sorts reverse it."""
+        if field == "price":
+            return lambda doc: (self.prices[doc], self.product_ids[doc])
+        return lambda doc: (self.names[doc], self.product_ids[doc])
+
+    def _sort_small(self, docs, entries, weights, sort: str, count: int) -> List[int]:
+        """First `count` of a small match list, fully scored / sorted."""
+        if sort != "relevance":
+            field, direction = sort.rsplit("_", 1)
+            pick = heapq.nlargest if direction == "desc" else heapq.nsmallest
+            return pick(count, docs, key=self._sort_key(field))
+
+        # Relevance: best score first, the product indexed first on ties
+        ranked = heapq.nlargest(count, zip(self._scores(docs, entries, weights), map(neg, docs)))
+        return [-doc for _, doc in ranked]
+
+    def _top_relevance(self, bits, entries, weights, count: int) -> List[int]:
+        """
+        Threshold algorithm: walk the rarest term by decreasing impact.
+        Once even the best remaining document of that term, with the best
+        possible impact in every other term, cannot beat the current page,
+        nothing further down can either (equal impacts are visited in
+        document order, so ties come out as in the small-result path).
+        """
+        driver, driver_weight = entries[0], weights[0]
+        others = list(zip(entries[1:], weights[1:]))
+        rest_bound = sum(weight * entry.max_impact for entry, weight in others)
+
+        by_impact = driver.sort_by_impact()
+        tail = range(len(by_impact), len(driver.docs))
+
+        best = []  # min-heap of (score, -doc)
+        for position in chain(tail, by_impact):
+            upper = driver_weight * driver.impacts[position] + rest_bound
+            if len(best) == count and upper <= best[0][0] and position not in tail:
+                break
+            doc = driver.docs[position]
+            if not _has_bit(bits, doc):
+                continue
+            score = driver_weight * driver.impacts[position] + sum(
+                weight * entry.impact_of(doc) for entry, weight in others
+            )
+            item = (score, -doc)
+            if len(best) < count:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+        return [-doc for _, doc in sorted(best, reverse=True)]
+
+    def _walk_order(self, bits, sort: str, count: int) -> List[int]:
+        """First `count` matches in price / name order, from the global permutation."""
+        field = sort.rsplit("_", 1)[0]
+        if field not in self.orders or len(self.unsorted) > MAX_UNSORTED:
+            self._build_orders()
+        order = self.orders[field]
+        descending = sort.endswith("_desc")
+
+        picked = []
+        walk = reversed(order) if descending else order
+        for doc in walk:
+            if _has_bit(bits, doc) and doc not in self.unsorted:
+                picked.append(doc)
+                if len(picked) == count:
+                    break
+
+        # Documents added / repriced since the order was built: merge them in
+        late = [doc for doc in self.unsorted if _has_bit(bits, doc)]
+        if late:
+            key = self._sort_key(field)
+            merged = heapq.merge(picked, sorted(late, key=key, reverse=descending), key=key, reverse=descending)
+            picked = list(merged)[:count]
+        return picked
+
+    def _build_orders(self) -> None:
+        live_docs = [doc for doc in range(len(self.product_ids)) if self.live[doc]]
+        self.orders = {
+            "price": array("l", sorted(live_docs, key=self._sort_key("price"))),
+            "name": array("l", sorted(live_docs, key=self._sort_key("name"))),
+        }
+        self.unsorted = set()
+
+
+class SearchIndexService:
+    """Owns the per-worker index: build, incremental updates, catch-up."""
+
+    # Held for the whole build (one at a time per process)
+    _build_lock = threading.Lock()
+
+    # monotonic() before which no new background build starts (after a failure)
+    _retry_at = 0.0
+
+    @staticmethod
+    def current() -> Optional[SearchIndex]:
+        """
+        Return this worker's index, caught up with other workers' writes
+        at most every SEARCH_REFRESH_SECONDS.
+
+        Missing or too many dead documents (build), or not checked for
+        SEARCH_REFRESH_SECONDS (catch-up): the work is started in the
+        background and the request goes on with what there is (never
+        waits for it, never reads the change feed itself).
+
+        Returns:
+            SearchIndex | None: None until the first build is done
+        """
+        app = current_app._get_current_object()
+        index = app.extensions.get("search_index")
+        if index is None or index.dead_ratio > REBUILD_DEAD_RATIO:
+            SearchIndexService._in_background(app, rebuild=True)
+        elif time.monotonic() - index.checked_at > app.config.get("SEARCH_REFRESH_SECONDS", 5):
+            SearchIndexService._in_background(app, rebuild=False)
+        return index
+
+    @staticmethod
+    def warm() -> None:
+        """
+        Build the index in the calling thread, if there is none yet.
+        Called by create_app when SEARCH_WARM_ON_START is set (gunicorn
+        --preload: built once in the master, inherited by every worker).
+        """
+        with SearchIndexService._build_lock:
+            if current_app.extensions.get("search_index") is None:
+                current_app.extensions["search_index"] = SearchIndexService._build()
+
+    @staticmethod
+    def index_product(product: Product) -> None:
+        """
+        Apply a committed create / update to this worker's index right away.
+        Other workers pick it up on their next catch-up.
+
+        Args:
+            product (Product): The saved product
+        """
+        index = current_app.extensions.get("search_index")
+        if index is not None:
+            index.upsert(product.id, product.name, product.description,
+                         product.category_id, product.price)
+
+    # --------------------------------------------------
+    # Internal helpers
+    # --------------------------------------------------
+    @staticmethod
+    def _rows(since=None):
+        query = db.session.query(
+            Product.id, Product.name, Product.description,
+            Product.category_id, Product.price, Product.updated_at
+        )
+        if since is not None:
+            query = query.filter(Product.updated_at >= since)
+            # Changed rows only: let the updated_at index drive the scan
+            return query.yield_per(10_000)
+        return query.order_by(Product.id).yield_per(10_000)
+
+    @staticmethod
+    def _apply(index: SearchIndex, rows) -> None:
+        for row in rows:
+            index.upsert(row.id, row.name, row.description, row.category_id, row.price)
+            if row.updated_at is not None and (index.watermark is None or row.updated_at > index.watermark):
+                index.watermark = row.updated_at
+
+    @staticmethod
+    def _in_background(app, rebuild: bool) -> None:
+        """
+        Start a build (rebuild=True) or a catch-up of the current index,
+        unless one of them is running or a build failed moments ago.
+        One background thread per process at a time: a catch-up never
+        races the swap of a new index.
+        """
+        if time.monotonic() < SearchIndexService._retry_at:
+            return
+        if not SearchIndexService._build_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                with app.app_context():
+                    try:
+                        if rebuild:
+                            index = SearchIndexService._build()
+                            # Writes committed while the build was reading
+                            SearchIndexService._catch_up(index)
+                            app.extensions["search_index"] = index
+                        else:
+                            SearchIndexService._catch_up(app.extensions["search_index"])
+                    except Exception:
+                        if rebuild:
+                            SearchIndexService._retry_at = time.monotonic() + BUILD_RETRY_SECONDS
+                        app.logger.exception("search index %s failed; keeping the previous one",
+                                             "build" if rebuild else "catch-up")
+                    finally:
+                        db.session.remove()
+            finally:
+                SearchIndexService._build_lock.release()
+
+        name = "search-index-build" if rebuild else "search-index-catch-up"
+        threading.Thread(target=run, name=name, daemon=True).start()
+
+    @staticmethod
+    def _build() -> SearchIndex:
+        index = SearchIndex()
+        started = time.perf_counter()
+        SearchIndexService._apply(index, SearchIndexService._rows())
+        index._build_orders()
+        for entry in index.postings.values():
+            if entry.bitmap is not None:
+                entry.sort_by_impact()
+        index.checked_at = time.monotonic()
+        current_app.logger.info(
+            "search index built: %d products, %d terms in %.1fs",
+            index.live_count, len(index.postings), time.perf_counter() - started
+        )
+        return index
+
+    @staticmethod
+    def _catch_up(index: SearchIndex) -> None:
+        # Background thread (or a build): the change feed is read without
+        # the index lock, then applied CATCH_UP_CHUNK rows at a time so
+        # searches wait for one chunk at most, not for a bulk update
+        try:
+            since = index.watermark - REFRESH_OVERLAP if index.watermark else None
+            rows = SearchIndexService._rows(since).all()
+            for start in range(0, len(rows), CATCH_UP_CHUNK):
+                with index.lock:
+                    SearchIndexService._apply(index, rows[start:start + CATCH_UP_CHUNK])
+        finally:
+            index.checked_at = time.monotonic()
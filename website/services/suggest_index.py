@@ -0,0 +1,366 @@
+"""
+suggest_index.py
+----------------
+Typeahead suggestions for the search box: product names completing what
+the user typed, most sold first.
+
+Why not SQL:
+- one query per keystroke (LIKE 'wir%' + a sales aggregate) is far too
+  much database work for a box that fires on every key press
+
+Layout (per worker, built from the catalog on first use):
+- keys: every word start of every product name, lowercased
+  ("Wireless Headphones 7" → "wireless headphones 7", "headphones 7", "7"),
+  sorted, stored in one bytes blob + an offsets array (no per-key objects)
+- the keys completing a prefix are one contiguous range, found with two
+  binary searches
+- weights: units sold per product (OrderItem), one per key
+- a segment tree holding, for every node, the position of the heaviest
+  key below it: the top K of any range comes out of a small heap of
+  sub-ranges, O(K log n), however many names share the prefix
+- display names: one blob + offsets, looked up by product id (ids are
+  sorted, binary search)
+
+Keeping it fresh:
+- ProductService.create_product adds the new product to this worker's
+  index right away (a small sorted "delta" searched next to the arrays)
+- every SUGGEST_REFRESH_SECONDS the index is rebuilt in a background
+  thread (new sales reorder the suggestions, other workers' new products
+  and renamed products appear); requests keep using the previous index
+  meanwhile
+
+Builds never run inside a request: the first one (1M products: ~12 s)
+runs in a background thread too, and suggestions are empty until it is
+done. SUGGEST_WARM_ON_START builds it in create_app instead (gunicorn
+--preload: once in the master, before the fork).
+"""
+
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from typing import List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+
+from website import db
+from website.models import OrderItem, Product
+
+# Suggestions returned by default / at most
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Seconds before a failed build is tried again
+BUILD_RETRY_SECONDS = 30
+
+# Bytes never present in UTF-8: upper bound of every key with a prefix
+_AFTER = b"\xff"
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace (keys and queries alike)."""
+    return " ".join(text.lower().split())
+
+
+def _word_starts(name: str):
+    """Yield the name from each word onwards."""
+    words = normalize(name).split(" ")
+    for start in range(len(words)):
+        if words[start]:
+            yield " ".join(words[start:])
+
+
+class _Keys:
+    """Sequence view over the sorted keys blob (for bisect)."""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: bytes, offsets: array):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position: int) -> bytes:
+        return self.blob[self.offsets[position]:self.offsets[position + 1]]
+
+
+class SuggestIndex:
+    """Sorted keys + weights + range top-K (one per worker process)."""
+
+    def __init__(self, entries, weights: dict, names: dict):
+        """
+        Args:
+            entries: (key bytes, product id) pairs
+            weights (dict): product id → units sold
+            names (dict): product id → display name
+        """
+        entries = sorted(entries)
+        self.key_offsets = array("I", [0])
+        self.key_products = array("l")
+        blob = bytearray()
+        for key, product_id in entries:
+            blob += key
+            self.key_offsets.append(len(blob))
+            self.key_products.append(product_id)
+        self.keys = _Keys(bytes(blob), self.key_offsets)
+        self.weights = weights
+
+        # Display names, by ascending product id
+        self.product_ids = array("l", sorted(names))
+        self.name_offsets = array("I", [0])
+        names_blob = bytearray()
+        for product_id in self.product_ids:
+            names_blob += names[product_id].encode()
+            self.name_offsets.append(len(names_blob))
+        self.names = bytes(names_blob)
+
+        # Products added since the build: (key, product id) sorted, id → name
+        self.delta = []
+        self.delta_names = {}
+
+        self._build_tree()
+        self.built_at = time.monotonic()
+
+    def _build_tree(self) -> None:
+        """tree[node] = key position with the largest weight below node (leftmost on ties)."""
+        size = 1
+        while size < max(len(self.key_products), 1):
+            size *= 2
+        self.size = size
+
+        weights, products = self.weights, self.key_products
+        self.key_weights = array("l", [weights.get(product_id, 0) for product_id in products])
+        self.key_weights.extend([-1] * (size - len(products)))
+
+        tree = array("l", [0]) * (2 * size)
+        tree[size:] = array("l", range(size))
+        key_weights = self.key_weights
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if key_weights[left] >= key_weights[right] else right
+        self.tree = tree
+
+    # --------------------------------------------------
+    # Writing
+    # --------------------------------------------------
+    def add(self, product_id: int, name: str) -> None:
+        """Make a new product suggestible (no sales yet)."""
+        self.delta_names[product_id] = name
+        for key in _word_starts(name):
+            insort(self.delta, (key.encode(), product_id))
+
+    # --------------------------------------------------
+    # Reading
+    # --------------------------------------------------
+    def _heaviest(self, lo: int, hi: int) -> int:
+        """Position of the heaviest key in [lo, hi) (leftmost on ties)."""
+        tree, key_weights = self.tree, self.key_weights
+        best = -1
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                candidate = tree[lo]
+                if best < 0 or key_weights[candidate] > key_weights[best] or (
+                    key_weights[candidate] == key_weights[best] and candidate < best
+                ):
+                    best = candidate
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                candidate = tree[hi]
+                if best < 0 or key_weights[candidate] > key_weights[best] or (
+                    key_weights[candidate] == key_weights[best] and candidate < best
+                ):
+                    best = candidate
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def name_of(self, product_id: int) -> str:
+        row = bisect_left(self.product_ids, product_id)
+        if row < len(self.product_ids) and self.product_ids[row] == product_id:
+            return self.names[self.name_offsets[row]:self.name_offsets[row + 1]].decode()
+        return self.delta_names.get(product_id, "")
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        """
+        Top `limit` products whose name (or a word of it onwards) starts
+        with prefix, most sold first, then alphabetically.
+
+        Args:
+            prefix (str): What the user typed so far
+            limit (int): Number of suggestions
+
+        Returns:
+            List[dict]: [{"id": ..., "name": ...}]
+        """
+        prefix = normalize(prefix).encode()
+        if not prefix:
+            return []
+
+        # Range of keys completing the prefix
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _AFTER, lo)
+
+        # Pop ranges by their heaviest key; each pop yields one key and
+        # splits its range in two
+        picked, seen = [], set()
+        heap = []
+
+        def push(start: int, end: int) -> None:
+            if start < end:
+                position = self._heaviest(start, end)
+                heapq.heappush(heap, (-self.key_weights[position], self.keys[position], position, start, end))
+
+        push(lo, hi)
+        while heap and len(picked) < limit:
+            negative_weight, key, position, start, end = heapq.heappop(heap)
+            product_id = self.key_products[position]
+            if product_id not in seen:
+                seen.add(product_id)
+                picked.append((negative_weight, key, product_id))
+            push(start, position)
+            push(position + 1, end)
+
+        # New products (not sold yet) from the delta, merged in order
+        start = bisect_left(self.delta, (prefix,))
+        for key, product_id in self.delta[start:]:
+            if not key.startswith(prefix):
+                break
+            if product_id not in seen:
+                seen.add(product_id)
+                picked.append((0, key, product_id))
+        picked.sort()
+
+        return [
+            {"id": product_id, "name": self.name_of(product_id)}
+            for _, _, product_id in picked[:limit]
+        ]
+
+
+class SuggestIndexService:
+    """Owns the per-worker suggestion index: build, additions, refresh."""
+
+    # Held for the whole build (one at a time per process)
+    _build_lock = threading.Lock()
+
+    # monotonic() before which no new background build starts (after a failure)
+    _retry_at = 0.0
+
+    @staticmethod
+    def current() -> Optional[SuggestIndex]:
+        """
+        Return this worker's index; start a background build when there is
+        none yet or it is older than SUGGEST_REFRESH_SECONDS. Never waits
+        for the build.
+
+        Returns:
+            SuggestIndex | None: None until the first build is done
+        """
+        index = current_app.extensions.get("suggest_index")
+        refresh = current_app.config.get("SUGGEST_REFRESH_SECONDS", 600)
+        if index is None or time.monotonic() - index.built_at > refresh:
+            SuggestIndexService._build_in_background(current_app._get_current_object())
+        return index
+
+    @staticmethod
+    def warm() -> None:
+        """
+        Build the index in the calling thread, if there is none yet.
+        Called by create_app when SUGGEST_WARM_ON_START is set (gunicorn
+        --preload: built once in the master, inherited by every worker).
+        """
+        with SuggestIndexService._build_lock:
+            if current_app.extensions.get("suggest_index") is None:
+                current_app.extensions["suggest_index"] = SuggestIndexService._build()
+
+    @staticmethod
+    def suggest(prefix: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        """
+        Completions for the search box.
+
+        Args:
+            prefix (str): What the user typed so far
+            limit (int): Number of suggestions (capped at MAX_LIMIT)
+
+        Returns:
+            List[dict]: [{"id": ..., "name": ...}], most sold first
+                        ([] until this worker's index is built)
+        """
+        limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+        index = SuggestIndexService.current()
+        # Still warming up: no suggestions rather than a wait on every keystroke
+        if index is None:
+            return []
+        return index.suggest(prefix, limit)
+
+    @staticmethod
+    def add_product(product: Product) -> None:
+        """
+        Make a just-created product suggestible in this worker.
+        Other workers pick it up at their next rebuild.
+
+        Args:
+            product (Product): The saved product
+        """
+        index = current_app.extensions.get("suggest_index")
+        if index is not None:
+            index.add(product.id, product.name)
+
+    # --------------------------------------------------
+    # Internal helpers
+    # --------------------------------------------------
+    @staticmethod
+    def _build() -> SuggestIndex:
+        started = time.perf_counter()
+        weights = {
+            product_id: int(sold or 0)
+            for product_id, sold in db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .group_by(OrderItem.product_id)
+        }
+        names = {}
+        entries = []
+        for product_id, name in db.session.query(Product.id, Product.name).yield_per(10_000):
+            names[product_id] = name
+            entries.extend((key.encode(), product_id) for key in _word_starts(name))
+
+        index = SuggestIndex(entries, weights, names)
+        current_app.logger.info(
+            "suggest index built: %d products, %d keys in %.1fs",
+            len(names), len(entries), time.perf_counter() - started
+        )
+        return index
+
+    @staticmethod
+    def _build_in_background(app) -> None:
+        """Start a build unless one is running (or failed moments ago); swaps it in when done."""
+        if time.monotonic() < SuggestIndexService._retry_at:
+            return
+        if not SuggestIndexService._build_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                with app.app_context():
+                    try:
+                        previous = app.extensions.get("suggest_index")
+                        index = SuggestIndexService._build()
+                        # Products added here while the build was reading
+                        for product_id, name in (previous.delta_names.items() if previous else ()):
+                            if not index.name_of(product_id):
+                                index.add(product_id, name)
+                        app.extensions["suggest_index"] = index
+                    except Exception:
+                        SuggestIndexService._retry_at = time.monotonic() + BUILD_RETRY_SECONDS
+                        app.logger.exception("suggest index build failed; keeping the previous one")
+                    finally:
+                        db.session.remove()
+            finally:
+                SuggestIndexService._build_lock.release()
+
+        threading.Thread(target=run, name="suggest-index-build", daemon=True).start()
@@ -0,0 +1,115 @@
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from website.models import User
+from website import cache, db
+
+
+# Cache key for the identity snapshot of one user
+USER_KEY = "user:{user_id}"
+
+
+class UserSnapshot:
+    """
+    Slim, cacheable stand-in for the User model as `current_user`.
+
+    Holds only what requests read from the logged-in user (no password
+    hash, no relationships) and implements the Flask-Login user interface.
+    """
+
+    __slots__ = ("id", "email", "first_name")
+
+    def __init__(self, id: int, email: str, first_name: Optional[str]):
+        self.id = id
+        self.email = email
+        self.first_name = first_name
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(user.id, user.email, user.first_name)
+
+    # Flask-Login interface
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def get_id(self) -> str:
+        return str(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id and hasattr(other, "get_id")
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<UserSnapshot {self.email}>"
+
+
+class UserService:
+    """Loads the logged-in user for Flask-Login without a query per request."""
+
+    @staticmethod
+    def load_user(user_id: int) -> Optional[UserSnapshot]:
+        """
+        Return the identity snapshot for a user id, from cache when possible.
+
+        Args:
+            user_id (int): ID stored in the session
+
+        Returns:
+            UserSnapshot | None: None if the user no longer exists
+        """
+        timeout = current_app.config.get("USER_CACHE_TIMEOUT", 60)
+
+        def load():
+            user = db.session.get(User, user_id)
+            return UserSnapshot.from_user(user) if user else None
+
+        if not timeout:
+            return load()
+
+        # Kept out of the per-worker L1 so an invalidation applies everywhere
+        return cache.get_or_load(
+            USER_KEY.format(user_id=user_id),
+            load,
+            timeout=timeout,
+            local=False
+        )
+
+    @staticmethod
+    def invalidate_user(user_id: int) -> None:
+        """
+        Drop a cached snapshot (password or profile changed).
+
+        Args:
+            user_id (int): User ID
+        """
+        cache.delete(USER_KEY.format(user_id=user_id))
+
+
+# --------------------------------------------------
+# Automatic invalidation
+# --------------------------------------------------
+# Any ORM update/delete of a User (password change, profile edit, ...)
+# drops its snapshot once the transaction commits
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _remember_changed_user(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        UserService.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("changed_user_ids", None)
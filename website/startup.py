@@ -0,0 +1,148 @@
+"""
+startup.py
+----------
+Application startup: how long it takes, and what it can skip.
+
+Cold start (import + create_app) is paid by every worker process and
+every CLI / seed script, and decides how fast new instances join when
+autoscaling. This module holds:
+
+- StartupProfile: wall time per create_app phase
+      python run.py --profile-startup
+      FLASK_ENV=production python run.py --profile-startup
+  (python -X importtime run.py --profile-startup breaks imports down per module)
+- the Jinja bytecode cache (JINJA_BYTECODE_CACHE_DIR): compiled templates
+  are stored on disk, so a new process loads them instead of parsing and
+  compiling every template again on its first requests
+- precompile_templates(): compiles every template once at startup
+  (JINJA_PRECOMPILE, production) or at deploy time:
+      flask --app run templates compile
+- the `flask db` commands (Flask-Migrate): alembic is imported only when
+  one of them runs, never by a web worker
+
+Schema: DB_CREATE_ALL = True (development) creates missing tables on
+boot; production leaves the schema to the migrations in migrations/:
+    flask --app run db upgrade            (apply migrations: every deploy)
+    flask --app run db migrate -m "..."   (new revision after a model change)
+    flask --app run db stamp 502407e8f6f3 (once, on a database created by
+                                           create_all before migrations existed:
+                                           the baseline revision; then upgrade)
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache
+
+
+class StartupProfile:
+    """Wall time per startup phase, in the order they ran."""
+
+    def __init__(self):
+        self.phases = []
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    @property
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.phases)
+
+    def report(self) -> str:
+        """Table of the phases: milliseconds and share of the total."""
+        total = self.total or 1
+        lines = [f"{'phase':<22}{'ms':>9}{'share':>8}"]
+        for name, seconds in self.phases:
+            lines.append(f"{name:<22}{seconds * 1000:>9.1f}{seconds / total:>8.0%}")
+        lines.append(f"{'total':<22}{self.total * 1000:>9.1f}")
+        return "\n".join(lines)
+
+
+def setup_templates(app) -> None:
+    """Attach the bytecode cache; compile every template when JINJA_PRECOMPILE is set."""
+    directory = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    if app.config.get("JINJA_PRECOMPILE"):
+        precompile_templates(app)
+
+
+def precompile_templates(app) -> int:
+    """
+    Load (compile, or read from the bytecode cache) every template of the app.
+
+    Compiled templates stay in the environment's cache: in a preloaded
+    master process (gunicorn --preload) every forked worker inherits them.
+
+    Returns:
+        int: Number of templates loaded
+    """
+    names = app.jinja_env.list_templates(extensions=("html",))
+    # Keep them all: the default LRU (400) could evict some
+    if app.jinja_env.cache is not None and app.jinja_env.cache.capacity < len(names):
+        app.jinja_env.cache.capacity = len(names)
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def migrations_directory(app) -> str:
+    """migrations/ next to the website package (independent of the cwd)."""
+    return os.path.join(os.path.dirname(app.root_path), "migrations")
+
+
+class MigrateCommands(click.Group):
+    """
+    `flask db ...` without importing Flask-Migrate at startup.
+
+    The real command group (flask_migrate.cli.db) is loaded, and Migrate
+    attached to the app, the first time a subcommand is looked up.
+    """
+
+    def _commands(self) -> click.Group:
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_commands
+
+        from website import db
+
+        if "migrate" not in current_app.extensions:
+            Migrate(current_app, db, directory=migrations_directory(current_app))
+        return db_commands
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+
+migrate_cli = MigrateCommands("db", help="Database migrations (Flask-Migrate / alembic).")
+
+
+templates_cli = AppGroup("templates", help="Jinja templates.")
+
+
+@templates_cli.command("compile")
+def compile_templates_command():
+    """Compile every template into the bytecode cache (run at deploy time)."""
+    if not current_app.config.get("JINJA_BYTECODE_CACHE_DIR"):
+        raise click.ClickException("JINJA_BYTECODE_CACHE_DIR is not set: nothing would be kept")
+    started = time.perf_counter()
+    count = precompile_templates(current_app)
+    click.echo(
+        f"Compiled {count} templates into {current_app.config['JINJA_BYTECODE_CACHE_DIR']} "
+        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
@@ -0,0 +1,70 @@
+"""
+tasks.py
+--------
+Background job handlers (see jobs.py), imported by create_app so every
+process that enqueues or works knows them.
+
+Handlers run at least once: each one must be safe to run again.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from website import db
+from website.jobs import enqueue, enqueue_once, job
+from website.models import Order, User
+from website.services.rollup_service import RollupService
+
+# Rollup catch-ups are coalesced into one job per slot of this many
+# seconds (a divisor of 60)
+CATCH_UP_SLOT_SECONDS = 10
+
+
+def _slot_end(moment: datetime) -> datetime:
+    """moment rounded up to the next CATCH_UP_SLOT_SECONDS boundary."""
+    seconds = moment.second + (moment.microsecond > 0)
+    slots = -(-seconds // CATCH_UP_SLOT_SECONDS)
+    return moment.replace(second=0, microsecond=0) + timedelta(seconds=slots * CATCH_UP_SLOT_SECONDS)
+
+
+@job("orders.send_confirmation")
+def send_order_confirmation(order_id: int) -> None:
+    """
+    Order confirmation for the customer.
+
+    Stand-in for the email: the app has no mail backend yet, so the
+    message is logged. A real sender should record that it sent (e.g. a
+    flag on the order) to stay idempotent across retries.
+    """
+    order = db.session.get(Order, order_id)
+    if order is None:
+        return
+    user = db.session.get(User, order.user_id)
+    current_app.logger.info(
+        "order confirmation: order %s for %s, total %.2f",
+        order.id, user.email if user else order.user_id, order.total_amount
+    )
+
+
+@job("rollups.catch_up")
+def catch_up_rollups() -> None:
+    """Add the newly settled orders to the sales rollups (idempotent: high-water mark)."""
+    RollupService.catch_up()
+
+
+def enqueue_checkout_jobs(order: Order) -> None:
+    """
+    Side work of a checkout, added to its transaction (no commit).
+
+    - the confirmation, as soon as a worker is free
+    - the rollup catch-up once the order has settled (the catch-up does
+      not move past orders younger than ROLLUP_SETTLE_SECONDS). Its run
+      time is rounded up to the next CATCH_UP_SLOT_SECONDS slot and the
+      job keyed by the slot: every checkout of a slot shares one job,
+      which still runs after all of their orders have settled
+    """
+    enqueue("orders.send_confirmation", order_id=order.id)
+
+    run_at = _slot_end(datetime.utcnow() + timedelta(seconds=current_app.config.get("ROLLUP_SETTLE_SECONDS", 30) + 1))
+    enqueue_once(f"rollups.catch_up:{run_at:%Y%m%dT%H%M%S}", "rollups.catch_up", run_at)
@@ -5,11 +5,23 @@
 # Blueprint → helps organize routes into modules
 # render_template → renders HTML pages
 # request → reads query parameters from URL (?category=1&page=2 etc.)
-from flask import Blueprint, render_template, request
+# jsonify → JSON responses (search box suggestions)
+from flask import Blueprint, jsonify, render_template, request
 
-# Database models
-from .models import Product, Category
-from . import cache
+# Catalog listing (cached per category / sort / page)
+from website.services.catalog_service import CatalogService
+
+# Full-text product search
+from website.services.product_service import ProductService
+
+# Search box typeahead (in-process prefix index)
+from website.services.suggest_index import SuggestIndexService
+
+# Read-only route → may read from the replica (see routing.py)
+from website.routing import use_replica
+
+# ETag / Last-Modified → 304 for unchanged pages (see conditional.py)
+from website.conditional import conditional
 
 
 # ==================================================
@@ -22,14 +34,30 @@ views = Blueprint("views", __name__)
 # ==================================================
 # HOME PAGE / PRODUCT LISTING
 # ==================================================
+def listing_validator():
+    """ETag source of the home page: version stamps of the listed category and of the category menu."""
+    category_id, _, _ = CatalogService.normalize_listing_args(
+        request.args.get("category", type=int), None, None
+    )
+    parts, last_modified = CatalogService.listing_validator(category_id)
+    return parts + (CatalogService.categories_version(),), last_modified
+
+
 @views.route("/")
-@cache.cached(timeout=60)
+@use_replica
+@conditional(listing_validator)
 def home():
     """
     Home page that displays products with:
     - Category filtering
     - Sorting
     - Pagination
+
+    The listing itself comes from CatalogService, which caches each
+    (category, sort, page) combination separately.
+
+    A repeat visit with nothing changed in the category gets an empty
+    304 before any of this runs (@conditional).
     """
 
     # ----------------------------------------------
@@ -37,70 +65,39 @@ def home():
     # ----------------------------------------------
     # Example URL:
     # /?category=2&sort=price_desc&page=3
-
-    # Selected category ID (None if not provided)
-    category_id = request.args.get("category", type=int)
-
-    # Sorting option (default: name_asc)
-    sort = request.args.get("sort", default="name_asc")
-
-    # Current page number (default: page 1)
-    page = request.args.get("page", default=1, type=int)
-
-    # Number of products per page
-    per_page = 6
-
-
-    # ----------------------------------------------
-    # BASE PRODUCT QUERY
-    # ----------------------------------------------
-    # Start with all products
-    query = Product.query
-
-
-    # ----------------------------------------------
-    # FILTER BY CATEGORY (if selected)
-    # ----------------------------------------------
-    if category_id:
-        query = query.filter_by(category_id=category_id)
-
-
-    # ----------------------------------------------
-    # SORTING LOGIC
-    # ----------------------------------------------
-    # User-selected sorting option
-    if sort == "price_asc":
-        query = query.order_by(Product.price.asc())
-
-    elif sort == "price_desc":
-        query = query.order_by(Product.price.desc())
-
-    elif sort == "name_desc":
-        query = query.order_by(Product.name.desc())
-
-    else:
-        # Default sorting: name ascending
-        query = query.order_by(Product.name.asc())
+    #
+    # Values are normalized so equivalent URLs share one cache entry
+    # (unknown sort → name_asc, page < 1 → 1, category 0 → all)
+    category_id, sort, page = CatalogService.normalize_listing_args(
+        request.args.get("category", type=int),
+        request.args.get("sort"),
+        request.args.get("page", type=int)
+    )
 
 
     # ----------------------------------------------
-    # PAGINATION
+    # PRODUCTS FOR THIS PAGE (cached)
     # ----------------------------------------------
-    # paginate() automatically limits results and calculates pages
-    pagination = query.paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
+    # Returns products plus pagination info
+    # (total, pages, has_prev/has_next, prev/next page numbers and cursors)
+    #
+    # ?cursor=... is the opaque keyset position emitted by the
+    # Prev / Next links; page only drives the "Page X of Y" label
+    pagination = CatalogService.get_listing_page(
+        category_id,
+        sort,
+        page,
+        cursor=request.args.get("cursor")
     )
 
-    # Total number of pages (safe fallback for empty results)
-    total_pages = pagination.pages if pagination.total > 0 else 0
-
 
     # ----------------------------------------------
     # FETCH ALL CATEGORIES (for sidebar / filter menu)
     # ----------------------------------------------
-    categories = Category.query.order_by(Category.name.asc()).all()
+    # The menu is a cached template fragment keyed by categories_version;
+    # `categories` is only used when that fragment is rendered
+    categories = CatalogService.get_categories()
+    categories_version = CatalogService.categories_version()
 
 
     # ----------------------------------------------
@@ -110,17 +107,86 @@ def home():
         "home.html",
 
         # Products for current page
-        products=pagination.items,
+        products=pagination["products"],
 
-        # All categories (for filter UI)
+        # All categories (for filter UI) and their version (fragment key)
         categories=categories,
+        categories_version=categories_version,
 
-        # Pagination object (has next, prev, pages, total)
+        # Pagination info (has next, prev, pages, total)
         pagination=pagination,
 
         # Keep selected values for UI state
         selected_category=category_id,
         selected_sort=sort,
-        page=page,
-        total_pages=total_pages
+        page=pagination["page"],
+        total_pages=pagination["pages"]
     )
+
+
+# ==================================================
+# PRODUCT SEARCH
+# ==================================================
+@views.route("/search")
+@use_replica
+def search():
+    """
+    Full-text search over product names and descriptions.
+
+    Example URL:
+    /search?q=wireless+headphones&category=5&sort=price_asc&page=2
+
+    Results come from the in-process inverted index (BM25 ranking),
+    never from a LIKE scan; only the products shown are read from the DB.
+    """
+    query = request.args.get("q", "").strip()
+    category_id, _, page = CatalogService.normalize_listing_args(
+        request.args.get("category", type=int),
+        None,
+        request.args.get("page", type=int)
+    )
+    sort = request.args.get("sort", "relevance")
+
+    results = None
+    if query:
+        results = ProductService.search(query, category_id=category_id, sort=sort, page=page)
+
+    html = render_template(
+        "search.html",
+        query=query,
+        results=results,
+        categories=CatalogService.get_categories(),
+        categories_version=CatalogService.categories_version(),
+        selected_category=category_id,
+        selected_sort=sort
+    )
+
+    # This worker's index is still being built (in the background): a
+    # normal page with a notice that reloads itself, never kept by a cache
+    if results and results["warming_up"]:
+        return html, {"Cache-Control": "no-store"}
+    return html
+
+
+# ==================================================
+# SEARCH BOX SUGGESTIONS (typeahead)
+# ==================================================
+@views.route("/api/suggest")
+def suggest():
+    """
+    Product names completing what the user typed, most sold first.
+    Called on every keystroke, so it never touches the database:
+    answers come from the in-process prefix index (suggest_index.py).
+
+    Example URL:
+    /api/suggest?q=wirel&limit=5
+
+    Response:
+    {"query": "wirel", "suggestions": [{"id": 7, "name": "Wireless Mouse"}, ...]}
+    """
+    query = request.args.get("q", "")
+    suggestions = SuggestIndexService.suggest(query, request.args.get("limit", type=int))
+    response = jsonify({"query": query, "suggestions": suggestions})
+    # Not personal: the browser may reuse it while the user retypes
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response